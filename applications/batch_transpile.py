@@ -0,0 +1,269 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Process-parallel batch transpilation.
+
+Pass managers hold live, unpicklable state, so workers are sent a
+:class:`TranspileSpec` describing the preset pass manager (optimization
+level, seed, layout/routing methods and an optional dynamical-decoupling
+scheduling stage) and build it themselves.  The backend target is shipped
+once per worker and circuits travel as QPY bytes.  Results stream back as
+they finish.
+
+Seeds that are not fixed in a spec are derived from a base seed and the task
+index, so results do not depend on the number of workers or on the order in
+which tasks complete.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field, replace
+import io
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from qiskit import qpy
+from qiskit.circuit import QuantumCircuit
+from qiskit.circuit.library.standard_gates import get_standard_gate_name_mapping
+from qiskit.transpiler import CouplingMap, PassManager, Target
+from qiskit.transpiler.passes import (
+    ALAPScheduleAnalysis,
+    ConstrainedReschedule,
+    PadDynamicalDecoupling,
+)
+from qiskit.transpiler.preset_passmanagers import generate_preset_pass_manager
+
+from transpile_cache import TranspileCache
+
+
+@dataclass(frozen=True)
+class TranspileSpec:
+    """Picklable description of a transpilation pass manager"""
+
+    optimization_level: int = 1
+    """Preset optimization level"""
+
+    seed_transpiler: Optional[int] = None
+    """Transpiler seed, derived from the batch seed if ``None``"""
+
+    dd_sequence: Optional[Tuple[str, ...]] = None
+    """Names of the dynamical-decoupling gates, e.g. ``("x", "x")``. Requires a target."""
+
+    dd_spacing: Optional[Tuple[float, ...]] = None
+    """Fraction of the idle time between the dynamical-decoupling gates"""
+
+    options: Dict = field(default_factory=dict)
+    """Further keyword arguments of ``generate_preset_pass_manager``"""
+
+    def build(
+        self,
+        target: Optional[Target] = None,
+        basis_gates: Optional[List[str]] = None,
+        coupling_map: Optional[List[List[int]]] = None,
+    ) -> PassManager:
+        """Build the pass manager described by this spec.
+
+        Args:
+            target: Backend target.
+            basis_gates: Basis gates, if no target is given.
+            coupling_map: Coupling map, if no target is given.
+
+        Returns:
+            The staged pass manager.
+
+        Raises:
+            ValueError: If dynamical decoupling is requested without a target.
+        """
+        if coupling_map is not None and not isinstance(coupling_map, CouplingMap):
+            coupling_map = CouplingMap(coupling_map)
+        pm = generate_preset_pass_manager(
+            self.optimization_level,
+            target=target,
+            basis_gates=basis_gates,
+            coupling_map=coupling_map,
+            seed_transpiler=self.seed_transpiler,
+            **self.options,
+        )
+        if self.dd_sequence:
+            if target is None:
+                raise ValueError("Dynamical decoupling requires a backend target.")
+            gates = get_standard_gate_name_mapping()
+            pm.scheduling = PassManager(
+                [
+                    ALAPScheduleAnalysis(target=target),
+                    ConstrainedReschedule(target.acquire_alignment, target.pulse_alignment),
+                    PadDynamicalDecoupling(
+                        target=target,
+                        dd_sequence=[gates[name] for name in self.dd_sequence],
+                        spacing=list(self.dd_spacing) if self.dd_spacing else None,
+                    ),
+                ]
+            )
+        return pm
+
+
+def _dumps(circuit: QuantumCircuit) -> bytes:
+    buf = io.BytesIO()
+    qpy.dump(circuit, buf)
+    return buf.getvalue()
+
+
+def _loads(data: bytes) -> QuantumCircuit:
+    return qpy.load(io.BytesIO(data))[0]
+
+
+# Per-process state set by the pool initializer
+_WORKER_CONTEXT: Dict = {}
+
+
+def _init_worker(target, basis_gates, coupling_map):
+    _WORKER_CONTEXT.update(target=target, basis_gates=basis_gates, coupling_map=coupling_map)
+
+
+def _run_task(index: int, data: bytes, spec: TranspileSpec) -> Tuple[int, bytes, float]:
+    start = time.perf_counter()
+    pm = spec.build(**_WORKER_CONTEXT)
+    out = _dumps(pm.run(_loads(data)))
+    return index, out, time.perf_counter() - start
+
+
+def _seeded_specs(specs: Sequence[TranspileSpec], seed: Optional[int]) -> List[TranspileSpec]:
+    """Fill in missing transpiler seeds from a base seed and the task index."""
+    seeds = np.random.SeedSequence(seed).generate_state(len(specs))
+    return [
+        spec if spec.seed_transpiler is not None else replace(spec, seed_transpiler=int(s))
+        for spec, s in zip(specs, seeds)
+    ]
+
+
+class BatchTranspiler:
+    """Fans transpilation tasks out over a process pool.
+
+    Example::
+
+        batch = BatchTranspiler(target=backend.target, max_workers=4, seed=1234)
+        tasks = [(ansatz, TranspileSpec(level, dd_sequence=("x", "x")))
+                 for ansatz in ansatze for level in (1, 2, 3)]
+        for index, circuit in batch.iter_transpile(tasks):
+            ...
+    """
+
+    def __init__(
+        self,
+        target: Optional[Target] = None,
+        basis_gates: Optional[List[str]] = None,
+        coupling_map: Optional[List[List[int]]] = None,
+        max_workers: Optional[int] = None,
+        seed: Optional[int] = None,
+        cache: Optional[TranspileCache] = None,
+    ):
+        """
+        Args:
+            target: Backend target, e.g. ``backend.target``.
+            basis_gates: Basis gates, if no target is given.
+            coupling_map: Coupling map, if no target is given.
+            max_workers: Number of worker processes, defaults to the number of CPUs.
+            seed: Base seed for specs without ``seed_transpiler``.
+            cache: Optional transpile cache consulted before submitting tasks.
+        """
+        self.target = target
+        self.basis_gates = basis_gates
+        self.coupling_map = coupling_map
+        self.max_workers = max_workers
+        self.seed = seed
+        self.cache = cache
+        self.timings: Dict[int, float] = {}
+
+    def _cache_options(self, spec: TranspileSpec) -> Dict:
+        return {
+            "spec": spec,
+            "target": self.target,
+            "basis_gates": self.basis_gates,
+            "coupling_map": self.coupling_map,
+        }
+
+    def iter_transpile(
+        self, tasks: Sequence[Tuple[QuantumCircuit, TranspileSpec]]
+    ) -> Iterator[Tuple[int, QuantumCircuit]]:
+        """Transpile ``(circuit, spec)`` tasks, yielding results as they finish.
+
+        Args:
+            tasks: Pairs of circuit and transpile spec.
+
+        Yields:
+            The task index and the transpiled circuit, in completion order.
+        """
+        specs = _seeded_specs([spec for _, spec in tasks], self.seed)
+        pending = []
+        for index, ((circuit, _), spec) in enumerate(zip(tasks, specs)):
+            cached = self.cache.get(circuit, **self._cache_options(spec)) if self.cache else None
+            if cached is not None:
+                yield index, cached
+            else:
+                pending.append((index, _dumps(circuit), spec))
+        if not pending:
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(self.target, self.basis_gates, self.coupling_map),
+        ) as executor:
+            futures = [executor.submit(_run_task, *task) for task in pending]
+            for future in as_completed(futures):
+                index, data, elapsed = future.result()
+                self.timings[index] = elapsed
+                circuit = _loads(data)
+                if self.cache:
+                    self.cache.put(tasks[index][0], circuit, **self._cache_options(specs[index]))
+                yield index, circuit
+
+    def transpile(
+        self, tasks: Sequence[Tuple[QuantumCircuit, TranspileSpec]]
+    ) -> List[QuantumCircuit]:
+        """Transpile ``(circuit, spec)`` tasks and return the results in task order.
+
+        Args:
+            tasks: Pairs of circuit and transpile spec.
+
+        Returns:
+            The transpiled circuits.
+        """
+        out: List[Optional[QuantumCircuit]] = [None] * len(tasks)
+        for index, circuit in self.iter_transpile(tasks):
+            out[index] = circuit
+        return out
+
+
+def benchmark(
+    tasks: Sequence[Tuple[QuantumCircuit, TranspileSpec]],
+    workers: Sequence[int] = (1, 2, 4, 8),
+    **kwargs,
+) -> Dict[int, float]:
+    """Measure transpilation throughput for different numbers of workers.
+
+    Args:
+        tasks: Pairs of circuit and transpile spec.
+        workers: Worker counts to compare.
+        kwargs: Further arguments of :class:`BatchTranspiler` (without a cache).
+
+    Returns:
+        Circuits per second for every worker count, including pool start-up.
+    """
+    throughput = {}
+    for num in workers:
+        batch = BatchTranspiler(max_workers=num, **kwargs)
+        start = time.perf_counter()
+        batch.transpile(tasks)
+        throughput[num] = len(tasks) / (time.perf_counter() - start)
+    return throughput
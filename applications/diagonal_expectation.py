@@ -0,0 +1,312 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Expectation values of diagonal (Z-only) operators computed directly from
+Sampler quasi-distributions or raw counts.
+
+The Ising Hamiltonians returned by ``qubo_to_sparse_pauli_op`` only contain
+``I`` and ``Z`` terms, so every measured outcome is an eigenstate and the
+energy of outcome ``b`` is ``sum_k c_k (-1)^{popcount(b & z_k)}``.  Outcomes
+and z-masks are packed into 64-bit words so the parities are evaluated with
+bitwise operations over all outcomes at once.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from qiskit.circuit import QuantumCircuit
+from qiskit.exceptions import QiskitError
+from qiskit.quantum_info import SparsePauliOp
+from qiskit.result import QuasiDistribution
+
+# Maximum number of (outcome, term) parities held in memory at once.
+_CHUNK_ELEMENTS = 1 << 22
+
+
+def _pack_bits(bits: np.ndarray) -> np.ndarray:
+    """Pack a boolean array of shape (num_rows, num_bits) into uint64 words,
+    little-endian in both bit and word order."""
+    num_rows, num_bits = bits.shape
+    num_words = max(1, -(-num_bits // 64))
+    padded = np.zeros((num_rows, num_words * 64), dtype=bool)
+    padded[:, :num_bits] = bits
+    packed = np.packbits(padded.reshape(num_rows, num_words, 8, 8), axis=-1, bitorder="little")
+    return packed.reshape(num_rows, num_words * 8).view("<u8").astype(np.uint64, copy=False)
+
+
+def _parity(words: np.ndarray) -> np.ndarray:
+    """Parity of the number of set bits of every element of a uint64 array."""
+    words = words ^ (words >> np.uint64(32))
+    words ^= words >> np.uint64(16)
+    words ^= words >> np.uint64(8)
+    words ^= words >> np.uint64(4)
+    words &= np.uint64(0xF)
+    return (np.uint64(0x6996) >> words) & np.uint64(1)
+
+
+def diagonal_terms(operator: SparsePauliOp) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the packed z-masks and real coefficients of a diagonal operator.
+
+    Args:
+        operator: Operator consisting only of ``I`` and ``Z`` Paulis.
+
+    Returns:
+        A ``(num_terms, num_words)`` uint64 array of z-masks and the real
+        coefficients of the terms.
+
+    Raises:
+        QiskitError: If the operator contains ``X`` or ``Y`` Paulis.
+    """
+    if np.any(operator.paulis.x):
+        raise QiskitError("Operator is not diagonal, it contains X or Y Paulis.")
+    # A Z-only Pauli has no phase other than the one stored in the coefficient
+    phases = (-1j) ** operator.paulis.phase
+    coeffs = np.real_if_close(operator.coeffs * phases)
+    if np.iscomplexobj(coeffs):
+        raise QiskitError("Operator has complex coefficients and is not Hermitian.")
+    return _pack_bits(operator.paulis.z), coeffs.astype(float)
+
+
+def outcome_words(outcomes, num_qubits: int) -> np.ndarray:
+    """Pack integer-encoded measurement outcomes into uint64 words.
+
+    Args:
+        outcomes: Sequence of non-negative integers with bit ``i`` holding qubit ``i``.
+        num_qubits: The number of qubits spanned by the outcomes.
+
+    Returns:
+        A ``(num_outcomes, num_words)`` uint64 array.
+    """
+    num_words = max(1, -(-num_qubits // 64))
+    if num_words == 1:
+        return np.asarray(outcomes, dtype=np.uint64).reshape(-1, 1)
+    mask = (1 << 64) - 1
+    return np.array(
+        [[(int(k) >> (64 * w)) & mask for w in range(num_words)] for k in outcomes],
+        dtype=np.uint64,
+    ).reshape(-1, num_words)
+
+
+def diagonal_energies(
+    operator: SparsePauliOp,
+    outcomes,
+    offset: float = 0.0,
+) -> np.ndarray:
+    """Evaluate a diagonal operator on a batch of computational basis states.
+
+    Args:
+        operator: Operator consisting only of ``I`` and ``Z`` Paulis.
+        outcomes: Integer-encoded basis states, or an already packed array as
+            returned by :func:`outcome_words`.
+        offset: Constant added to every energy, e.g. the offset returned by
+            ``qubo_to_sparse_pauli_op``.
+
+    Returns:
+        The energy of every outcome.
+    """
+    masks, coeffs = diagonal_terms(operator)
+    words = np.asarray(outcomes)
+    if words.dtype != np.uint64 or words.ndim != 2:
+        words = outcome_words(outcomes, operator.num_qubits)
+
+    energies = np.empty(words.shape[0], dtype=float)
+    chunk = max(1, _CHUNK_ELEMENTS // max(1, masks.shape[0]))
+    for start in range(0, words.shape[0], chunk):
+        block = words[start : start + chunk]
+        # parity(a) ^ parity(b) == parity(a ^ b), so reduce the words first
+        acc = np.bitwise_xor.reduce(block[:, None, :] & masks[None, :, :], axis=2)
+        signs = 1.0 - 2.0 * _parity(acc)
+        energies[start : start + chunk] = signs @ coeffs
+    return energies + offset
+
+
+def distribution_arrays(
+    dist: Union[QuasiDistribution, Dict[Union[int, str], float]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Split a quasi-distribution or a counts dictionary into outcomes and weights.
+
+    Args:
+        dist: A Sampler quasi-distribution or counts keyed by integers, bitstrings
+            or hexadecimal strings.
+
+    Returns:
+        The integer-encoded outcomes (as an object array so that more than 64
+        qubits are supported) and the normalized weights.
+    """
+    outcomes = []
+    weights = np.empty(len(dist), dtype=float)
+    for idx, (key, val) in enumerate(dist.items()):
+        if isinstance(key, str):
+            key = key.replace(" ", "")
+            key = int(key, 16) if key.startswith("0x") else int(key, 2)
+        outcomes.append(int(key))
+        weights[idx] = val
+    total = weights.sum()
+    if total != 0:
+        weights /= total
+    return np.array(outcomes, dtype=object), weights
+
+
+def cvar(energies: np.ndarray, probabilities: np.ndarray, alpha: float = 1.0) -> float:
+    """Conditional value at risk: the mean of the lowest ``alpha`` fraction of the distribution.
+
+    Args:
+        energies: Energy of every outcome.
+        probabilities: Probability of every outcome.
+        alpha: Tail fraction in ``(0, 1]``.  ``alpha=1`` is the expectation value.
+
+    Returns:
+        The CVaR-alpha of the distribution.
+
+    Raises:
+        QiskitError: If alpha is not in ``(0, 1]``.
+    """
+    if not 0 < alpha <= 1:
+        raise QiskitError(f"alpha must be in (0, 1], got {alpha}")
+    order = np.argsort(energies, kind="stable")
+    energies = energies[order]
+    probabilities = probabilities[order]
+    cumulative = np.cumsum(probabilities)
+    # Take whole outcomes until the tail is filled and a fraction of the last one
+    below = np.concatenate(([0.0], cumulative[:-1]))
+    weights = np.clip(alpha - below, 0.0, probabilities)
+    return float(weights @ energies / alpha)
+
+
+def gibbs(energies: np.ndarray, probabilities: np.ndarray, eta: float = 1.0) -> float:
+    """Gibbs objective ``-log(E[exp(-eta * E)]) / eta``, which weights low energies
+    exponentially and tends to the minimum for large ``eta``.
+
+    Args:
+        energies: Energy of every outcome.
+        probabilities: Probability of every outcome.
+        eta: Inverse temperature.
+
+    Returns:
+        The Gibbs objective of the distribution.
+    """
+    shift = energies.min()
+    weights = probabilities * np.exp(-eta * (energies - shift))
+    return float(shift - np.log(weights.sum()) / eta)
+
+
+@dataclass
+class DistributionEnergies:
+    """Energies of the outcomes of a sampled distribution"""
+
+    outcomes: np.ndarray
+    """Integer-encoded outcomes"""
+
+    probabilities: np.ndarray
+    """Normalized weight of every outcome"""
+
+    energies: np.ndarray
+    """Energy of every outcome, including the offset"""
+
+    num_qubits: int
+    """Number of qubits of the operator"""
+
+    def expectation_value(self) -> float:
+        """Returns the expectation value of the operator."""
+        return float(self.probabilities @ self.energies)
+
+    def cvar(self, alpha: float = 1.0) -> float:
+        """Returns the CVaR-alpha of the distribution."""
+        return cvar(self.energies, self.probabilities, alpha)
+
+    def best(self) -> Tuple[str, float]:
+        """Returns the lowest energy outcome as a bitstring together with its energy."""
+        idx = int(np.argmin(self.energies))
+        return format(int(self.outcomes[idx]), f"0{self.num_qubits}b"), float(self.energies[idx])
+
+
+def evaluate_distribution(
+    dist: Union[QuasiDistribution, Dict[Union[int, str], float]],
+    operator: SparsePauliOp,
+    offset: float = 0.0,
+) -> DistributionEnergies:
+    """Evaluate a diagonal operator on every outcome of a sampled distribution.
+
+    Args:
+        dist: A Sampler quasi-distribution or a counts dictionary.
+        operator: Operator consisting only of ``I`` and ``Z`` Paulis.
+        offset: Constant added to every energy.
+
+    Returns:
+        The outcomes, weights and energies of the distribution.
+    """
+    outcomes, probabilities = distribution_arrays(dist)
+    words = outcome_words(outcomes, operator.num_qubits)
+    energies = diagonal_energies(operator, words, offset)
+    return DistributionEnergies(outcomes, probabilities, energies, operator.num_qubits)
+
+
+class SamplerCost:
+    """Cost function evaluating a diagonal Hamiltonian from a single Sampler job.
+
+    The same distribution yields both the cost value and the candidate
+    solutions, so no separate Estimator call is needed.  It can be used in
+    place of the notebooks' ``cost_func``::
+
+        cost = SamplerCost(ansatz, hamiltonian, sampler, offset=offset, alpha=0.25)
+        res = minimize_spsa(cost, x0, maxiter=100)
+        bitstring, energy = cost.best_outcome
+    """
+
+    def __init__(
+        self,
+        ansatz: QuantumCircuit,
+        hamiltonian: SparsePauliOp,
+        sampler,
+        offset: float = 0.0,
+        alpha: float = 1.0,
+        aggregation: Optional[Callable[[np.ndarray, np.ndarray], float]] = None,
+    ):
+        """
+        Args:
+            ansatz: Parameterized ansatz circuit. Measurements are added if missing.
+            hamiltonian: Diagonal operator, laid out on the qubits of the ansatz.
+            sampler: Sampler primitive instance.
+            offset: Constant added to every energy.
+            alpha: CVaR tail fraction, ``1`` gives the expectation value.
+            aggregation: Optional ``f(energies, probabilities) -> float`` used
+                instead of CVaR, e.g. ``functools.partial(gibbs, eta=2)``.
+        """
+        if ansatz.num_clbits == 0:
+            ansatz = ansatz.measure_all(inplace=False)
+        self.ansatz = ansatz
+        self.hamiltonian = hamiltonian
+        self.sampler = sampler
+        self.offset = offset
+        self.alpha = alpha
+        self.aggregation = aggregation
+        self.nfev = 0
+        self.last_distribution = None
+        self.last_energies = None
+        self.best_outcome = (None, np.inf)
+        # Validate once here rather than on every evaluation
+        diagonal_terms(hamiltonian)
+
+    def __call__(self, params, *args) -> float:
+        dist = self.sampler.run(self.ansatz, parameter_values=params).result().quasi_dists[0]
+        self.nfev += 1
+        result = evaluate_distribution(dist, self.hamiltonian, self.offset)
+        self.last_distribution = dist
+        self.last_energies = result
+        best = result.best()
+        if best[1] < self.best_outcome[1]:
+            self.best_outcome = best
+        if self.aggregation is not None:
+            return self.aggregation(result.energies, result.probabilities)
+        return result.cvar(self.alpha)
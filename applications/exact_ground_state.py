@@ -0,0 +1,355 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Exact reference energies without building dense matrices.
+
+The diagonal of a Z-only operator is computed in chunks of ``2**chunk_qubits``
+basis states.  Inside a chunk the high qubits are fixed, so each term only
+contributes a sign times a Walsh function of the low qubits, and the whole
+chunk is obtained from a single fast Walsh-Hadamard transform of the folded
+coefficients.  Chunks are independent and are processed on a thread pool.
+
+General operators are applied to a statevector matrix-free: a Pauli with
+x-mask ``x`` and z-mask ``z`` maps amplitude ``j ^ x`` to ``j`` with sign
+``(-1)^{|j & z|}``.  The ground state is then found with Lanczos or LOBPCG,
+which only need matrix-vector products.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.linalg import eigh_tridiagonal
+from scipy.sparse.linalg import LinearOperator, lobpcg
+
+from qiskit.exceptions import QiskitError
+from qiskit.quantum_info import SparsePauliOp
+
+from diagonal_expectation import diagonal_terms, _pack_bits, _parity
+
+
+def _walsh_hadamard(vec: np.ndarray) -> np.ndarray:
+    """In-place fast Walsh-Hadamard transform, ``out[i] = sum_m (-1)^{|i & m|} vec[m]``."""
+    size = vec.shape[0]
+    half = 1
+    while half < size:
+        view = vec.reshape(-1, 2, half)
+        upper = view[:, 0, :].copy()
+        view[:, 0, :] += view[:, 1, :]
+        np.subtract(upper, view[:, 1, :], out=view[:, 1, :])
+        half *= 2
+    return vec
+
+
+class _DiagonalChunks:
+    """Folds the terms of a diagonal operator into per-chunk Walsh coefficients."""
+
+    def __init__(self, operator: SparsePauliOp, offset: float, chunk_qubits: int):
+        num_qubits = operator.num_qubits
+        if num_qubits > 63:
+            raise QiskitError(f"Too many qubits for an exact diagonal: {num_qubits}")
+        masks, coeffs = diagonal_terms(operator)
+        masks = masks[:, 0]
+        self.num_qubits = num_qubits
+        self.low_qubits = min(num_qubits, chunk_qubits)
+        self.chunk_size = 1 << self.low_qubits
+        self.num_chunks = 1 << (num_qubits - self.low_qubits)
+        self.low_masks = (masks & np.uint64(self.chunk_size - 1)).astype(np.intp)
+        self.high_masks = masks >> np.uint64(self.low_qubits)
+        self.coeffs = coeffs
+        self.offset = offset
+
+    def diagonal(self, chunk: int) -> np.ndarray:
+        """Return the diagonal entries ``chunk * chunk_size ... (chunk + 1) * chunk_size - 1``."""
+        signs = 1.0 - 2.0 * _parity(self.high_masks & np.uint64(chunk))
+        folded = np.bincount(self.low_masks, weights=signs * self.coeffs, minlength=self.chunk_size)
+        # The identity term has an all-zero mask and lands in folded[0]
+        folded[0] += self.offset
+        return _walsh_hadamard(folded)
+
+
+def _num_threads(num_threads: Optional[int]) -> int:
+    return num_threads if num_threads else os.cpu_count() or 1
+
+
+def ising_diagonal(
+    operator: SparsePauliOp,
+    offset: float = 0.0,
+    chunk_qubits: int = 20,
+    num_threads: Optional[int] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Compute the full diagonal of a Z-only operator.
+
+    Args:
+        operator: Operator consisting only of ``I`` and ``Z`` Paulis, e.g. the
+            Ising Hamiltonian returned by ``qubo_to_sparse_pauli_op``.
+        offset: Constant added to every diagonal entry.
+        chunk_qubits: Each work item covers ``2**chunk_qubits`` basis states,
+            which bounds the temporary memory per thread.
+        num_threads: Number of threads, defaults to the number of CPUs.
+        out: Optional float array (e.g. a ``np.memmap``) of length ``2**n`` to
+            write the diagonal into.
+
+    Returns:
+        The diagonal, with entry ``i`` the energy of basis state ``i``
+        (bit ``j`` of ``i`` is qubit ``j``).
+    """
+    chunks = _DiagonalChunks(operator, offset, chunk_qubits)
+    if out is None:
+        out = np.empty(1 << chunks.num_qubits, dtype=float)
+
+    def work(chunk):
+        start = chunk * chunks.chunk_size
+        out[start : start + chunks.chunk_size] = chunks.diagonal(chunk)
+
+    with ThreadPoolExecutor(_num_threads(num_threads)) as executor:
+        list(executor.map(work, range(chunks.num_chunks)))
+    return out
+
+
+def ising_minimum(
+    operator: SparsePauliOp,
+    offset: float = 0.0,
+    chunk_qubits: int = 20,
+    num_threads: Optional[int] = None,
+) -> Tuple[float, int]:
+    """Find the minimum diagonal entry of a Z-only operator without storing the diagonal.
+
+    Args:
+        operator: Operator consisting only of ``I`` and ``Z`` Paulis.
+        offset: Constant added to every diagonal entry.
+        chunk_qubits: Each work item covers ``2**chunk_qubits`` basis states.
+        num_threads: Number of threads, defaults to the number of CPUs.
+
+    Returns:
+        The ground-state energy and the index of the (first) basis state
+        attaining it. ``format(index, f"0{n}b")`` gives the bitstring.
+    """
+    chunks = _DiagonalChunks(operator, offset, chunk_qubits)
+
+    def work(chunk):
+        diag = chunks.diagonal(chunk)
+        idx = int(np.argmin(diag))
+        return diag[idx], chunk * chunks.chunk_size + idx
+
+    with ThreadPoolExecutor(_num_threads(num_threads)) as executor:
+        results = list(executor.map(work, range(chunks.num_chunks)))
+    value, index = min(results, key=lambda item: (item[0], item[1]))
+    return float(value), index
+
+
+class SparsePauliMatvec:
+    """Matrix-free product of a ``SparsePauliOp`` with statevectors.
+
+    Terms are grouped by their x-mask so each group costs one gather of the
+    input vector.  The output is split into blocks of ``2**block_qubits``
+    amplitudes that are computed on a thread pool; the signs of the low
+    qubits are tabulated once, so the diagonal of a group on a block is a
+    single small matrix product.
+    """
+
+    def __init__(
+        self,
+        operator: SparsePauliOp,
+        block_qubits: int = 16,
+        num_threads: Optional[int] = None,
+    ):
+        """
+        Args:
+            operator: The operator to apply.
+            block_qubits: Each work item computes ``2**block_qubits`` output amplitudes.
+            num_threads: Number of threads, defaults to the number of CPUs.
+
+        Raises:
+            QiskitError: If the operator has more than 63 qubits.
+        """
+        num_qubits = operator.num_qubits
+        if num_qubits > 63:
+            raise QiskitError(f"Too many qubits for a statevector: {num_qubits}")
+        paulis = operator.paulis
+        x_masks = _pack_bits(paulis.x)[:, 0]
+        z_masks = _pack_bits(paulis.z)[:, 0]
+        # P = (-i)^(phase + |x & z|) Z^z X^x, with Y = -i Z X absorbed in the phase
+        num_y = np.sum(paulis.x & paulis.z, axis=1)
+        coeffs = operator.coeffs * (-1j) ** ((paulis.phase + num_y) % 4)
+        self.dtype = float if np.allclose(coeffs.imag, 0) else complex
+        coeffs = coeffs.real if self.dtype is float else coeffs
+
+        # Keep the cached low-qubit sign tables (num_terms x block_size) around 256 MB
+        max_block = max(6, 25 - int(np.ceil(np.log2(max(1, len(coeffs))))))
+        low_qubits = min(num_qubits, block_qubits, max_block)
+        low_mask = np.uint64((1 << low_qubits) - 1)
+        low_index = np.arange(1 << low_qubits, dtype=np.uint64)
+
+        order = np.argsort(x_masks, kind="stable")
+        x_masks, z_masks, coeffs = x_masks[order], z_masks[order], coeffs[order]
+        unique_x, starts = np.unique(x_masks, return_index=True)
+        bounds = np.append(starts, len(x_masks))
+        self.groups = []
+        for k, x_mask in enumerate(unique_x):
+            z_group = z_masks[bounds[k] : bounds[k + 1]]
+            # Signs of the low qubits are the same for every block
+            low_signs = 1.0 - 2.0 * _parity(low_index[None, :] & (z_group[:, None] & low_mask))
+            x_low = x_mask & low_mask
+            perm = (low_index ^ x_low).astype(np.intp) if x_low else None
+            self.groups.append(
+                (
+                    int(x_mask >> np.uint64(low_qubits)),
+                    z_group >> np.uint64(low_qubits),
+                    coeffs[bounds[k] : bounds[k + 1]],
+                    low_signs,
+                    perm,
+                )
+            )
+        self.num_qubits = num_qubits
+        self.dim = 1 << num_qubits
+        self.low_qubits = low_qubits
+        self.block_size = 1 << low_qubits
+        self.num_threads = _num_threads(num_threads)
+
+    def _block(self, vec: np.ndarray, out: np.ndarray, block: int) -> None:
+        acc = np.zeros(self.block_size, dtype=out.dtype)
+        for x_high, z_high, coeffs, low_signs, perm in self.groups:
+            high_signs = 1.0 - 2.0 * _parity(z_high & np.uint64(block))
+            diag = (coeffs * high_signs) @ low_signs
+            src = (block ^ x_high) << self.low_qubits
+            segment = vec[src : src + self.block_size]
+            acc += diag * (segment[perm] if perm is not None else segment)
+        start = block << self.low_qubits
+        out[start : start + self.block_size] = acc
+
+    def __call__(
+        self,
+        vec: np.ndarray,
+        out: Optional[np.ndarray] = None,
+        num_threads: Optional[int] = None,
+    ) -> np.ndarray:
+        """Return ``operator @ vec``.
+
+        Args:
+            vec: Statevector of length ``2**n``, qubit ``j`` being bit ``j`` of the index.
+            out: Optional output array.
+            num_threads: Number of threads for this product, defaults to :attr:`num_threads`.
+
+        Returns:
+            The product of the operator and the vector.
+        """
+        vec = np.asarray(vec).reshape(-1)
+        if out is None:
+            out = np.empty(self.dim, dtype=np.result_type(self.dtype, vec.dtype))
+        num_threads = num_threads or self.num_threads
+        blocks = range(self.dim // self.block_size)
+        if num_threads == 1 or len(blocks) == 1:
+            for block in blocks:
+                self._block(vec, out, block)
+        else:
+            with ThreadPoolExecutor(num_threads) as executor:
+                list(executor.map(lambda block: self._block(vec, out, block), blocks))
+        return out
+
+    def linear_operator(self) -> LinearOperator:
+        """Returns the operator as a SciPy ``LinearOperator``."""
+
+        def matmat(mat):
+            return np.stack([self(col) for col in np.asarray(mat).T], axis=1)
+
+        return LinearOperator((self.dim, self.dim), matvec=self, matmat=matmat, dtype=self.dtype)
+
+
+def _lanczos(matvec, start, tol, maxiter):
+    """Lanczos recurrence keeping three vectors; returns the lowest Ritz value
+    and the tridiagonal coefficients needed to rebuild its Ritz vector."""
+    alphas, betas = [], []
+    prev = np.zeros_like(start)
+    vec = start / np.linalg.norm(start)
+    beta = 0.0
+    energy = np.inf
+    for _ in range(maxiter):
+        work = matvec(vec)
+        alpha = np.vdot(vec, work).real
+        work -= alpha * vec + beta * prev
+        alphas.append(alpha)
+        beta = np.linalg.norm(work)
+        evals = eigh_tridiagonal(alphas, betas, eigvals_only=True, select="i", select_range=(0, 0))
+        converged = abs(evals[0] - energy) < tol * max(1.0, abs(evals[0]))
+        energy = evals[0]
+        if converged or beta < tol:
+            break
+        betas.append(beta)
+        prev, vec = vec, work / beta
+    return energy, np.array(alphas), np.array(betas[: len(alphas) - 1])
+
+
+def lanczos_ground_state(
+    operator: SparsePauliOp,
+    offset: float = 0.0,
+    method: str = "lanczos",
+    tol: float = 1e-10,
+    maxiter: int = 500,
+    return_state: bool = False,
+    seed: Optional[int] = None,
+    num_threads: Optional[int] = None,
+) -> Tuple[float, Optional[np.ndarray]]:
+    """Ground-state energy of a Hermitian ``SparsePauliOp`` without a dense matrix.
+
+    Memory is a few statevectors, so exact references are feasible up to
+    roughly 26 qubits on a workstation.
+
+    Args:
+        operator: Hermitian operator, e.g. a Heisenberg Hamiltonian.
+        offset: Constant added to the energy.
+        method: ``"lanczos"`` (three-vector recurrence) or ``"lobpcg"``.
+        tol: Relative convergence tolerance on the energy.
+        maxiter: Maximum number of iterations.
+        return_state: Also return the ground state. For Lanczos this costs a
+            second pass of the recurrence.
+        seed: Seed for the random starting vector.
+        num_threads: Number of threads used by the matrix-vector product.
+
+    Returns:
+        The ground-state energy and, if requested, the ground state.
+
+    Raises:
+        QiskitError: If the method is not supported.
+    """
+    matvec = SparsePauliMatvec(operator, num_threads=num_threads)
+    rng = np.random.default_rng(seed)
+    start = rng.standard_normal(matvec.dim)
+    if matvec.dtype is complex:
+        start = start + 1j * rng.standard_normal(matvec.dim)
+
+    if method == "lobpcg":
+        evals, evecs = lobpcg(
+            matvec.linear_operator(), start.reshape(-1, 1), tol=tol, maxiter=maxiter, largest=False
+        )
+        state = evecs[:, 0] if return_state else None
+        return float(evals[0]) + offset, state
+    if method != "lanczos":
+        raise QiskitError(f"Unsupported method: {method}")
+
+    energy, alphas, betas = _lanczos(matvec, start, tol, maxiter)
+    state = None
+    if return_state:
+        _, ritz = eigh_tridiagonal(alphas, betas, select="i", select_range=(0, 0))
+        # Replay the recurrence and accumulate the Ritz vector
+        prev = np.zeros_like(start)
+        vec = start / np.linalg.norm(start)
+        state = ritz[0, 0] * vec
+        for k in range(1, len(alphas)):
+            work = matvec(vec)
+            work -= alphas[k - 1] * vec + (betas[k - 2] if k > 1 else 0.0) * prev
+            prev, vec = vec, work / betas[k - 1]
+            state += ritz[k, 0] * vec
+        state /= np.linalg.norm(state)
+    return float(energy) + offset, state
@@ -0,0 +1,153 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Golden-section and batched k-section minimization over an interval.
+
+The search of ``GoldenRatio.ipynb`` with one Estimator job per round::
+
+    def mermin(thetas):
+        job = estimator.run([qc_ibm] * len(thetas), [mermin_ibm] * len(thetas),
+                            [[theta] for theta in thetas])
+        return job.result().values
+
+    res = minimize_golden(mermin, (0, 2 * np.pi), sections=4, batched=True)
+"""
+
+import numpy as np
+from scipy.optimize import OptimizeResult
+
+GOLDEN_RATIO = (np.sqrt(5) + 1) / 2
+
+
+def _evaluator(func, args, batched, memo, counts):
+    """Return a function evaluating the points missing from the memo in one call."""
+
+    def evaluate(points):
+        missing = [x for x in dict.fromkeys(float(x) for x in points) if x not in memo]
+        if missing:
+            if batched:
+                values = np.asarray(func(np.asarray(missing), *args), dtype=float)
+            else:
+                values = [func(x, *args) for x in missing]
+            memo.update(zip(missing, (float(v) for v in values)))
+            counts["nfev"] += len(missing)
+            counts["ncalls"] += 1
+        return np.array([memo[float(x)] for x in points])
+
+    return evaluate
+
+
+def minimize_golden(func, bracket, args=(), tol=1e-1, maxiter=100, sections=1,
+                    batched=False, memo=None, callback=None):
+    """
+    Minimization of a scalar function of one variable on an interval by
+    golden-section search, or by k-section search in batches.
+
+    Golden-section search keeps one interior point between iterations, so
+    every iteration costs one new evaluation and shrinks the bracket by the
+    golden ratio.  With ``sections=k > 1`` every round instead evaluates ``k``
+    new points in one call: together with the best point of the previous round,
+    which is the center of the new bracket, they form a uniform grid of ``k + 1``
+    interior points, and the bracket shrinks to the two grid cells around the
+    best of them, i.e., by ``(k + 2) / 2`` per round.  This trades evaluations for
+    round trips, which dominate when every call is a primitive job.
+
+    Parameters:
+        func (callable): The objective function to be minimized.
+
+                          ``fun(x, *args) -> float``
+
+                          or, if ``batched``,
+
+                          ``fun(xs, *args) -> ndarray``
+
+                          evaluating the 1-D array of points ``xs`` in one call,
+                          e.g., one Estimator job with one parameter set per point.
+
+        bracket (tuple): The interval ``(a, b)`` to search.
+
+        tol (float): Width of the bracket at which the search stops. Optional.
+
+        maxiter (int): Maximum number of rounds. Optional.
+
+        sections (int): Number of new points per round. ``1`` is golden-section
+                        search, odd values above one are rounded down to even,
+                        so that the center of the bracket lies on the grid.
+                        Optional.
+
+        batched (bool): Whether ``func`` evaluates an array of points. Optional.
+
+        memo (dict): Table of known values by point, updated in place and never
+                     re-evaluated, e.g., to share evaluations between searches.
+                     Optional.
+
+        callback (callable): Function that accepts the current bracket ``(a, b)``
+                             after every round. Optional.
+
+    Returns:
+        OptimizeResult: Solution in SciPy Optimization format, with the best
+        evaluated point, the final ``bracket``, the number of calls of ``func``,
+        ``ncalls``, and the known ``evaluations`` as rows of point and value,
+        sorted by point.
+    """
+    lo, hi = sorted(float(x) for x in bracket)
+    memo = {} if memo is None else memo
+    counts = {"nfev": 0, "ncalls": 0}
+    evaluate = _evaluator(func, args, batched, memo, counts)
+    nit = 0
+
+    if sections <= 1:
+        c = hi - (hi - lo) / GOLDEN_RATIO
+        d = lo + (hi - lo) / GOLDEN_RATIO
+        fc, fd = evaluate([c, d])
+        while hi - lo > tol and nit < maxiter:
+            # Keep the better interior point, it is an interior point of the new bracket
+            if fc < fd:
+                hi, d, fd = d, c, fc
+                c = hi - (hi - lo) / GOLDEN_RATIO
+                fc = evaluate([c])[0]
+            else:
+                lo, c, fc = c, d, fd
+                d = lo + (hi - lo) / GOLDEN_RATIO
+                fd = evaluate([d])[0]
+            nit += 1
+            if callback is not None:
+                callback((lo, hi))
+        candidates = [c, d]
+    else:
+        num_points = sections if sections % 2 == 0 else sections - 1
+        # The first round has no center yet
+        grid = np.linspace(lo, hi, sections + 2)[1:-1]
+        while True:
+            values = evaluate(grid)
+            best = int(np.argmin(values))
+            center = grid[best]
+            step = grid[1] - grid[0] if len(grid) > 1 else (hi - lo) / 2
+            lo, hi = center - step, center + step
+            nit += 1
+            if callback is not None:
+                callback((lo, hi))
+            if hi - lo <= tol or nit >= maxiter:
+                break
+            # Offsets from the exact center, so its value comes from the memo
+            offsets = np.arange(-(num_points // 2), num_points // 2 + 1)
+            grid = center + offsets * (2 * step / (num_points + 2))
+        candidates = list(grid)
+
+    x = min(candidates, key=lambda point: memo[float(point)])
+    # An array, as SciPy cannot print a result holding a dict with float keys
+    evaluations = np.array(sorted(memo.items()), dtype=float).reshape(-1, 2)
+    return OptimizeResult(fun=memo[float(x)], x=float(x), bracket=(lo, hi), nit=nit,
+                          nfev=counts["nfev"], ncalls=counts["ncalls"],
+                          evaluations=evaluations,
+                          message='Optimization terminated successfully.',
+                          success=True)
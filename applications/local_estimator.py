@@ -0,0 +1,229 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Local Estimator evaluating Pauli operators matrix-free on statevectors.
+
+Every distinct ``(circuit, parameter values)`` pair of a call is simulated to a
+statevector once, however many observables are measured on it.  Gates are applied
+in place: one-qubit gates as a broadcast 2x2 product over a ``(high, 2, low)``
+view of the statevector, CNOTs as a swap of two slices, and other gates by
+contracting their tensor with the qubit axes.  Observables are
+applied with :class:`~exact_ground_state.SparsePauliMatvec`, which groups terms
+by x-mask so each group costs one gather of the statevector, and
+``<psi|H|psi>`` is a single inner product with ``H|psi>``.  The same product
+gives ``<psi|H^2|psi> = ||H|psi>||^2``, so shot noise is emulated without
+squaring the operator.  Distinct states are processed on a thread pool.
+
+It is a drop-in for the ``estimator`` of the notebooks' ``cost_func``::
+
+    estimator = LocalEstimator(options={"shots": 5000, "seed": 42})
+    res = minimize_spsa(cost_func, x0=params, args=(ansatz, hamiltonian, estimator))
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from qiskit.circuit import QuantumCircuit
+from qiskit.circuit.exceptions import CircuitError
+from qiskit.exceptions import QiskitError
+from qiskit.primitives import BaseEstimator, EstimatorResult
+from qiskit.primitives.primitive_job import PrimitiveJob
+from qiskit.primitives.utils import _circuit_key, _observable_key, init_observable
+from qiskit.quantum_info import SparsePauliOp
+
+from exact_ground_state import SparsePauliMatvec, _num_threads
+
+# Instructions that do not change the state
+_SKIPPED = {"barrier", "delay", "id"}
+
+
+def _apply_matrix(psi: np.ndarray, matrix: np.ndarray, qubits: List[int], num_qubits: int):
+    """Apply a gate matrix, with ``qubits[0]`` its least significant bit, in place."""
+    if len(qubits) == 1:
+        view = psi.reshape(-1, 2, 1 << qubits[0])
+        view[...] = np.matmul(matrix, view)
+        return
+    num_gate = len(qubits)
+    tensor = psi.reshape([2] * num_qubits)
+    # Axis n - 1 - q is qubit q; the gate axes run from its most significant bit down
+    state_axes = [num_qubits - 1 - q for q in reversed(qubits)]
+    gate = matrix.reshape([2] * (2 * num_gate))
+    result = np.tensordot(gate, tensor, axes=(list(range(num_gate, 2 * num_gate)), state_axes))
+    tensor[...] = np.moveaxis(result, list(range(num_gate)), state_axes)
+
+
+def _apply_cx(psi: np.ndarray, control: int, target: int, num_qubits: int):
+    """Swap the target halves of the amplitudes with the control set, in place."""
+    tensor = psi.reshape([2] * num_qubits)
+    index = [slice(None)] * num_qubits
+    index[num_qubits - 1 - control] = 1
+    controlled = tensor[tuple(index)]
+    axis = num_qubits - 1 - target
+    if control > target:
+        axis -= 1
+    controlled[...] = np.flip(controlled, axis=axis).copy()
+
+
+def _evolve(psi: np.ndarray, circuit: QuantumCircuit, qubits: List[int], num_qubits: int):
+    """Apply a bound circuit acting on ``qubits`` of the state, in place.
+
+    Global phases do not change expectation values and are dropped.
+    """
+    for instruction in circuit.data:
+        operation = instruction.operation
+        if operation.name in _SKIPPED:
+            continue
+        targets = [qubits[circuit.find_bit(qubit).index] for qubit in instruction.qubits]
+        if instruction.clbits or operation.name in ("measure", "reset"):
+            raise QiskitError(f"Cannot simulate non-unitary instruction: {operation.name}")
+        if operation.name == "cx":
+            _apply_cx(psi, targets[0], targets[1], num_qubits)
+            continue
+        try:
+            matrix = operation.to_matrix()
+        except (AttributeError, CircuitError, QiskitError, TypeError):
+            if operation.definition is None:
+                raise QiskitError(f"Cannot simulate instruction: {operation.name}") from None
+            _evolve(psi, operation.definition, targets, num_qubits)
+            continue
+        _apply_matrix(psi, np.asarray(matrix, dtype=complex), targets, num_qubits)
+
+
+def _statevector(circuit: QuantumCircuit) -> np.ndarray:
+    """Simulate a bound circuit from the all-zero state."""
+    num_qubits = circuit.num_qubits
+    psi = np.zeros(1 << num_qubits, dtype=complex)
+    psi[0] = 1
+    _evolve(psi, circuit, list(range(num_qubits)), num_qubits)
+    return psi
+
+
+class LocalEstimator(BaseEstimator):
+    """Estimator simulating circuits locally and applying observables matrix-free.
+
+    Run options:
+
+    - ``shots``: If given, every value gets Gaussian noise with the variance of a
+      ``shots``-shot estimate, as in the reference ``Estimator``.
+    - ``seed``: Seed or generator of the noise.
+    """
+
+    def __init__(
+        self,
+        options: Optional[Dict] = None,
+        num_threads: Optional[int] = None,
+        max_cached_observables: int = 32,
+    ):
+        """
+        Args:
+            options: Default run options.
+            num_threads: Number of threads, defaults to the number of CPUs.
+            max_cached_observables: Number of prepared observables kept between calls.
+        """
+        super().__init__(options=options)
+        self._num_threads = _num_threads(num_threads)
+        self._max_cached = max_cached_observables
+        self._matvecs: "OrderedDict[Tuple, SparsePauliMatvec]" = OrderedDict()
+
+    def _matvec(self, observable: SparsePauliOp) -> SparsePauliMatvec:
+        key = _observable_key(observable)
+        matvec = self._matvecs.get(key)
+        if matvec is None:
+            matvec = SparsePauliMatvec(observable, num_threads=self._num_threads)
+            self._matvecs[key] = matvec
+            if len(self._matvecs) > self._max_cached:
+                self._matvecs.popitem(last=False)
+        else:
+            self._matvecs.move_to_end(key)
+        return matvec
+
+    def _run(
+        self,
+        circuits: Tuple[QuantumCircuit, ...],
+        observables: Tuple[Any, ...],
+        parameter_values: Tuple[Tuple[float, ...], ...],
+        **run_options,
+    ) -> PrimitiveJob:
+        job = PrimitiveJob(self._call, circuits, observables, parameter_values, **run_options)
+        job.submit()
+        return job
+
+    def _call(
+        self,
+        circuits: Sequence[QuantumCircuit],
+        observables: Sequence[Any],
+        parameter_values: Sequence[Sequence[float]],
+        **run_options,
+    ) -> EstimatorResult:
+        shots = run_options.pop("shots", None)
+        seed = run_options.pop("seed", None)
+        rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+        # One state per distinct circuit and parameter values, one matvec per observable
+        state_index: Dict[Tuple, int] = {}
+        states: List[Tuple[QuantumCircuit, Tuple[float, ...]]] = []
+        tasks: List[List[Tuple[int, SparsePauliMatvec]]] = []
+        for position, (circuit, values, observable) in enumerate(
+            zip(circuits, parameter_values, observables)
+        ):
+            observable = init_observable(observable)
+            if len(values) != circuit.num_parameters:
+                raise QiskitError(
+                    f"The number of values ({len(values)}) does not match "
+                    f"the number of parameters ({circuit.num_parameters})."
+                )
+            if circuit.num_qubits != observable.num_qubits:
+                raise QiskitError(
+                    f"The number of qubits of a circuit ({circuit.num_qubits}) does not match "
+                    f"the number of qubits of a observable ({observable.num_qubits})."
+                )
+            key = (_circuit_key(circuit), tuple(values))
+            if key not in state_index:
+                state_index[key] = len(states)
+                states.append((circuit, tuple(values)))
+                tasks.append([])
+            tasks[state_index[key]].append((position, self._matvec(observable)))
+
+        means = np.empty(len(circuits), dtype=complex)
+        squares = np.empty(len(circuits))
+        # Thread over states when there are several, otherwise inside the products
+        inner_threads = 1 if len(states) > 1 else self._num_threads
+
+        def work(index):
+            circuit, values = states[index]
+            if values:
+                circuit = circuit.assign_parameters(values)
+            psi = _statevector(circuit)
+            for position, matvec in tasks[index]:
+                product = matvec(psi, num_threads=inner_threads)
+                means[position] = np.vdot(psi, product)
+                squares[position] = np.vdot(product, product).real
+
+        if len(states) > 1 and self._num_threads > 1:
+            with ThreadPoolExecutor(min(self._num_threads, len(states))) as executor:
+                list(executor.map(work, range(len(states))))
+        else:
+            for index in range(len(states)):
+                work(index)
+
+        values = np.real_if_close(means)
+        metadata: List[Dict[str, Any]] = [{} for _ in range(len(circuits))]
+        if shots is not None:
+            variances = np.maximum(squares - np.abs(means) ** 2, 0)
+            values = rng.normal(np.real(means), np.sqrt(variances / shots))
+            for metadatum, variance in zip(metadata, variances):
+                metadatum["variance"] = float(variance)
+                metadatum["shots"] = shots
+        return EstimatorResult(values, metadata)
@@ -0,0 +1,375 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Measurement grouping of Pauli operators.
+
+The terms of an operator are partitioned into sets that can be measured with a
+single basis change, by greedy coloring of the graph whose edges join terms
+that do not commute qubit-wise (or, optionally, do not commute at all).  Terms
+are colored in order of decreasing weight, which tends to visit high-degree
+vertices first, and each term takes the first color none of whose terms it
+conflicts with.  The graph itself is never built: for qubit-wise commuting
+groups a term only has to be compared with the per-qubit basis of every group,
+and for general commuting groups with the packed symplectic vectors of the
+terms colored so far.
+
+Every group gets a basis-change circuit after which all its terms are ``Z``
+strings up to a sign, so the expectation value of every term is recovered from
+one set of counts per group::
+
+    plan = MeasurementPlan(SparsePauliOp.from_list([("XXY", 1), ("XYX", 1), ("YXX", 1), ("YYY", -1)]))
+    counts = backend.run(plan.circuits(state), shots=4000).result().get_counts()
+    mermin = plan.expectation_value(counts)
+"""
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from qiskit.circuit import QuantumCircuit
+from qiskit.quantum_info import SparsePauliOp
+from qiskit.result import QuasiDistribution
+
+from diagonal_expectation import (
+    _CHUNK_ELEMENTS,
+    _pack_bits,
+    _parity,
+    distribution_arrays,
+    outcome_words,
+)
+
+
+def _qubit_wise_groups(z: np.ndarray, x: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """Greedily color terms, given as packed symplectic words, into qubit-wise commuting sets."""
+    colors = np.empty(len(order), dtype=np.int64)
+    # Per-qubit basis of every group, so a term is compared with groups, not terms
+    basis_z = np.zeros((len(order), z.shape[1]), dtype=np.uint64)
+    basis_x = np.zeros((len(order), z.shape[1]), dtype=np.uint64)
+    num_colors = 0
+    for term in order:
+        group_z = basis_z[:num_colors]
+        group_x = basis_x[:num_colors]
+        conflict = ((group_z | group_x) & (z[term] | x[term])) & (
+            (group_z ^ z[term]) | (group_x ^ x[term])
+        )
+        free = np.flatnonzero(~conflict.any(axis=1))
+        color = free[0] if len(free) > 0 else num_colors
+        if color == num_colors:
+            num_colors += 1
+        colors[term] = color
+        basis_z[color] |= z[term]
+        basis_x[color] |= x[term]
+    return colors
+
+
+def _commuting_groups(z: np.ndarray, x: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """Greedily color terms, given as packed symplectic words, into commuting sets."""
+    # Terms in coloring order, so the colored ones are always a prefix
+    z = z[order]
+    x = x[order]
+    ordered_colors = np.empty(len(order), dtype=np.int64)
+    num_colors = 0
+    for step in range(len(order)):
+        # Paulis anticommute when the symplectic product has odd parity
+        product = np.bitwise_xor.reduce((x[:step] & z[step]) ^ (z[:step] & x[step]), axis=1)
+        conflicts = np.bincount(
+            ordered_colors[:step], weights=_parity(product), minlength=num_colors
+        )
+        free = np.flatnonzero(conflicts == 0)
+        color = free[0] if len(free) > 0 else num_colors
+        if color == num_colors:
+            num_colors += 1
+        ordered_colors[step] = color
+    colors = np.empty(len(order), dtype=np.int64)
+    colors[order] = ordered_colors
+    return colors
+
+
+def _qubit_wise_gates(z: np.ndarray, x: np.ndarray) -> List[Tuple[str, Tuple[int, ...]]]:
+    """Rotate the per-qubit basis of qubit-wise commuting Paulis onto ``Z``."""
+    basis_z = z.any(axis=0)
+    basis_x = x.any(axis=0)
+    gates = []
+    for qubit in np.flatnonzero(basis_x).tolist():
+        if basis_z[qubit]:
+            gates.append(("sdg", (qubit,)))
+        gates.append(("h", (qubit,)))
+    return gates
+
+
+def _independent_rows(z: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Return a basis of the GF(2) row space of ``[x | z]``."""
+    rows = np.hstack([x, z]).astype(np.uint8)
+    basis = []
+    for row in rows:
+        for pivot, vector in basis:
+            if row[pivot]:
+                row = row ^ vector
+        nonzero = np.flatnonzero(row)
+        if len(nonzero) > 0:
+            basis.append((nonzero[0], row))
+    num_qubits = z.shape[1]
+    if not basis:
+        return np.zeros((0, 2 * num_qubits), dtype=np.uint8)
+    return np.array([vector for _, vector in basis], dtype=np.uint8)
+
+
+def _reduce_x(generators: np.ndarray, num_qubits: int) -> List[int]:
+    """Bring the x block of the generators to reduced row echelon form in place.
+
+    Returns:
+        The pivot column of every row with a nonzero x block, in row order. These
+        rows are moved to the top.
+    """
+    pivots = []
+    row = 0
+    for col in range(num_qubits):
+        candidates = np.flatnonzero(generators[row:, col]) + row
+        if len(candidates) == 0:
+            continue
+        generators[[row, candidates[0]]] = generators[[candidates[0], row]]
+        others = np.flatnonzero(generators[:, col])
+        others = others[others != row]
+        generators[others] ^= generators[row]
+        pivots.append(col)
+        row += 1
+        if row == len(generators):
+            break
+    return pivots
+
+
+def _diagonalize(
+    z: np.ndarray, x: np.ndarray
+) -> Tuple[List[Tuple[str, Tuple[int, ...]]], np.ndarray, np.ndarray]:
+    """Clifford gates mapping commuting Paulis, given as boolean arrays, onto ``Z`` strings.
+
+    The independent generators are brought to the form ``X_{p_i}`` on distinct qubits
+    ``p_i``: Hadamards give the x block full rank, CNOTs clear it outside the pivots,
+    CZs and phase gates clear the z block. Final Hadamards turn them into ``Z_{p_i}``.
+    Every product of the generators is then a ``Z`` string as well. The Paulis are
+    conjugated along with the generators, tracking their signs as in a stabilizer tableau.
+
+    Returns:
+        The gates, and the ``Z`` strings and signs of the Paulis after them.
+    """
+    num_qubits = z.shape[1]
+    gates: List[Tuple[str, Tuple[int, ...]]] = []
+    paulis_x = x.astype(np.uint8)
+    paulis_z = z.astype(np.uint8)
+    signs = np.zeros(len(z), dtype=np.uint8)
+    generators = _independent_rows(z, x)
+    if len(generators) == 0:
+        return gates, z, np.ones(len(z))
+    # Views of the x and z blocks, row operations on the generators act on both
+    xs = generators[:, :num_qubits]
+    zs = generators[:, num_qubits:]
+
+    def hadamard(qubit):
+        gates.append(("h", (qubit,)))
+        signs[:] ^= paulis_x[:, qubit] & paulis_z[:, qubit]
+        for gx, gz in ((xs, zs), (paulis_x, paulis_z)):
+            gx[:, qubit], gz[:, qubit] = gz[:, qubit].copy(), gx[:, qubit].copy()
+
+    def cnot(control, target):
+        gates.append(("cx", (control, target)))
+        signs[:] ^= (
+            paulis_x[:, control]
+            & paulis_z[:, target]
+            & (paulis_x[:, target] ^ paulis_z[:, control] ^ 1)
+        )
+        for gx, gz in ((xs, zs), (paulis_x, paulis_z)):
+            gx[:, target] ^= gx[:, control]
+            gz[:, control] ^= gz[:, target]
+
+    def cz(first, second):
+        gates.append(("cz", (first, second)))
+        signs[:] ^= (
+            paulis_x[:, first]
+            & paulis_x[:, second]
+            & (paulis_z[:, first] ^ paulis_z[:, second])
+        )
+        for gx, gz in ((xs, zs), (paulis_x, paulis_z)):
+            gz[:, second] ^= gx[:, first]
+            gz[:, first] ^= gx[:, second]
+
+    def phase(qubit):
+        gates.append(("s", (qubit,)))
+        signs[:] ^= paulis_x[:, qubit] & paulis_z[:, qubit]
+        for gx, gz in ((xs, zs), (paulis_x, paulis_z)):
+            gz[:, qubit] ^= gx[:, qubit]
+
+    # Full rank x block: pure z rows get a Hadamard on pivots outside the x pivots
+    x_pivots = _reduce_x(generators, num_qubits)
+    num_x = len(x_pivots)
+    if num_x < len(generators):
+        free = np.setdiff1d(np.arange(num_qubits), x_pivots)
+        z_rows = zs[num_x:][:, free].copy()
+        z_pivots = _reduce_x(z_rows, len(free))
+        for pivot in z_pivots:
+            hadamard(int(free[pivot]))
+    pivots = _reduce_x(generators, num_qubits)
+
+    # Clear the x block outside the pivots
+    for row, pivot in enumerate(pivots):
+        for col in np.flatnonzero(xs[row]).tolist():
+            if col != pivot:
+                cnot(pivot, col)
+    # Clear the z block: off the pivots, between pivots, then on the own pivot
+    pivot_set = set(pivots)
+    for row, pivot in enumerate(pivots):
+        for col in np.flatnonzero(zs[row]).tolist():
+            if col not in pivot_set:
+                cz(pivot, col)
+    for row, pivot in enumerate(pivots):
+        for other in range(row + 1, len(pivots)):
+            if zs[row, pivots[other]]:
+                cz(pivot, pivots[other])
+        if zs[row, pivot]:
+            phase(pivot)
+    for pivot in pivots:
+        hadamard(pivot)
+    return gates, paulis_z.astype(bool), 1.0 - 2.0 * signs
+
+
+def _expectations(words: np.ndarray, weights: np.ndarray, masks: np.ndarray) -> np.ndarray:
+    """Mean of ``(-1)^{popcount(outcome & mask)}`` for every mask over weighted outcomes."""
+    values = np.zeros(masks.shape[0])
+    chunk = max(1, _CHUNK_ELEMENTS // max(1, masks.shape[0]))
+    for start in range(0, words.shape[0], chunk):
+        block = words[start : start + chunk]
+        acc = np.bitwise_xor.reduce(block[:, None, :] & masks[None, :, :], axis=2)
+        values += weights[start : start + chunk] @ (1.0 - 2.0 * _parity(acc))
+    return values
+
+
+@dataclass
+class MeasurementGroup:
+    """Terms of an operator measured together"""
+
+    indices: np.ndarray
+    """Indices of the terms in the operator"""
+
+    num_qubits: int
+    """Number of qubits of the operator"""
+
+    gates: List[Tuple[str, Tuple[int, ...]]]
+    """Basis change applied before measuring all qubits, as gate names and qubits"""
+
+    masks: np.ndarray
+    """Packed ``Z`` masks of the terms after the basis change"""
+
+    signs: np.ndarray
+    """Signs of the terms after the basis change"""
+
+    @cached_property
+    def circuit(self) -> QuantumCircuit:
+        """Returns the basis change circuit, built on first use."""
+        circuit = QuantumCircuit(self.num_qubits)
+        for name, qubits in self.gates:
+            getattr(circuit, name)(*qubits)
+        return circuit
+
+
+class MeasurementPlan:
+    """Partition of the terms of an operator into simultaneously measurable groups."""
+
+    def __init__(self, operator: SparsePauliOp, qubit_wise: bool = True):
+        """
+        Args:
+            operator: The operator to measure.
+            qubit_wise: Group qubit-wise commuting terms, measured with single-qubit
+                rotations. Otherwise group commuting terms, measured after a Clifford
+                circuit, which gives fewer groups at the cost of two-qubit gates.
+        """
+        self.operator = operator
+        self.num_qubits = operator.num_qubits
+        self.qubit_wise = qubit_wise
+        # Move Pauli phases into the coefficients, so terms are Hermitian Paulis
+        self.coeffs = operator.coeffs * (-1j) ** operator.paulis.phase
+        z_bits = operator.paulis.z
+        x_bits = operator.paulis.x
+        identity = ~(z_bits.any(axis=1) | x_bits.any(axis=1))
+        self.identity = np.flatnonzero(identity)
+        """Indices of the identity terms, which need no measurement"""
+
+        terms = np.flatnonzero(~identity)
+        z = _pack_bits(z_bits[terms])
+        x = _pack_bits(x_bits[terms])
+        weight = (z_bits[terms] | x_bits[terms]).sum(axis=1)
+        order = np.lexsort((-np.abs(self.coeffs[terms]), -weight))
+        if qubit_wise:
+            colors = _qubit_wise_groups(z, x, order)
+        else:
+            colors = _commuting_groups(z, x, order)
+
+        self.groups: List[MeasurementGroup] = []
+        """The measurement groups"""
+        for color in range(colors.max() + 1 if len(colors) > 0 else 0):
+            members = terms[colors == color]
+            self.groups.append(self._group(members, z_bits[members], x_bits[members]))
+
+    def _group(self, members: np.ndarray, z: np.ndarray, x: np.ndarray) -> MeasurementGroup:
+        if self.qubit_wise:
+            gates = _qubit_wise_gates(z, x)
+            return MeasurementGroup(
+                members, self.num_qubits, gates, _pack_bits(z | x), np.ones(len(members))
+            )
+        gates, diagonal, signs = _diagonalize(z, x)
+        return MeasurementGroup(members, self.num_qubits, gates, _pack_bits(diagonal), signs)
+
+    def circuits(self, circuit: QuantumCircuit) -> List[QuantumCircuit]:
+        """Return the circuits measuring every group of the state prepared by a circuit.
+
+        Args:
+            circuit: Circuit preparing the state, without measurements.
+
+        Returns:
+            One circuit per group, measuring all qubits after the basis change.
+        """
+        circuits = []
+        for group in self.groups:
+            measured = circuit.compose(group.circuit)
+            measured.measure_all()
+            circuits.append(measured)
+        return circuits
+
+    def term_expectation_values(
+        self, dists: Sequence[Union[QuasiDistribution, Dict[Union[int, str], float]]]
+    ) -> np.ndarray:
+        """Return the expectation value of every Pauli term, without its coefficient.
+
+        Args:
+            dists: Counts or quasi-distributions of the circuits of :meth:`circuits`,
+                in the same order.
+
+        Returns:
+            The expectation value of every term of the operator.
+
+        Raises:
+            ValueError: If the number of distributions and groups differ.
+        """
+        if len(dists) != len(self.groups):
+            raise ValueError(f"Got {len(dists)} distributions for {len(self.groups)} groups.")
+        values = np.ones(len(self.coeffs))
+        for group, dist in zip(self.groups, dists):
+            outcomes, weights = distribution_arrays(dist)
+            words = outcome_words(outcomes, self.num_qubits)
+            values[group.indices] = group.signs * _expectations(words, weights, group.masks)
+        return values
+
+    def expectation_value(
+        self, dists: Sequence[Union[QuasiDistribution, Dict[Union[int, str], float]]]
+    ) -> float:
+        """Return the expectation value of the operator, see :meth:`term_expectation_values`."""
+        return float(np.real(self.coeffs @ self.term_expectation_values(dists)))
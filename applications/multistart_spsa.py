@@ -0,0 +1,208 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Multi-start SPSA with successive halving under a shared evaluation budget.
+
+All starts iterate in lockstep, so the perturbed points of every active start
+form one batch per iteration: one primitive call with ``batched=True``, or a
+map over a process pool.  The budget is split evenly between rungs; after each
+rung only the best ``1/eta`` of the starts continue, so later rungs give the
+survivors more iterations each::
+
+    def energy(xs):
+        job = estimator.run([ansatz] * len(xs), [hamiltonian] * len(xs), xs.tolist())
+        return job.result().values
+
+    x0 = 2 * np.pi * np.random.default_rng(1).random((9, ansatz.num_parameters))
+    res = minimize_spsa_multistart(energy, x0, budget=3000, batched=True)
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import math
+
+import numpy as np
+from scipy.optimize import OptimizeResult
+
+from spsa import _precondition, _update_hessian
+
+
+def _rungs(num_starts, eta):
+    """Number of starts active in every rung, down to a single start."""
+    active = [num_starts]
+    while active[-1] > 1:
+        # At least one start is pruned, ceil(2 / eta) is 2 for eta < 2
+        active.append(min(active[-1] - 1, math.ceil(active[-1] / eta)))
+    return active
+
+
+def minimize_spsa_multistart(func, x0, args=(), budget=1000, eta=3,
+                             a=1.0, alpha=0.602, c=0.2, gamma=0.101,
+                             second_order=False, regularization=0.5,
+                             hessian_delay=0, resamplings=1, window=5,
+                             batched=False, max_workers=1, executor=None,
+                             seed=None, callback=None):
+    """
+    Minimization of a scalar function from several starting points by SPSA,
+    pruning poor starts by successive halving.
+
+    Parameters:
+        func (callable): The objective function to be minimized.
+
+                          ``fun(x, *args) -> float``
+
+                          or, if ``batched``,
+
+                          ``fun(xs, *args) -> ndarray``
+
+                          evaluating the rows of the 2-D array ``xs`` in one
+                          call.  Without ``batched`` it must be picklable for
+                          a process pool.
+
+        x0 (ndarray): Initial guesses, one row per start.
+
+        budget (int): Total number of function evaluations of all starts,
+                      including the final evaluation at the returned point.
+
+        eta (int): Only the best ``1/eta`` of the starts survive a rung.
+                   Optional.
+
+        a, alpha, c, gamma (float): SPSA gains, see :func:`minimize_spsa`.
+                                    Optional.
+
+        second_order, regularization, hessian_delay, resamplings: See
+            :func:`minimize_spsa`. Optional.
+
+        window (int): Number of last iterations whose average of the perturbed
+                      values ranks a start, which costs no extra evaluations.
+                      Optional.
+
+        batched (bool): Whether ``func`` evaluates a 2-D array of points.
+                        Optional.
+
+        max_workers (int): Number of worker processes evaluating the points if
+                           ``func`` is not batched. Optional.
+
+        executor (Executor): Executor mapping ``func`` over the points instead
+                             of a process pool. Optional.
+
+        seed (int): Seed of the independent random streams of the starts.
+                    Optional.
+
+        callback (callable): Function that accepts the indices of the active
+                             starts and their parameter vectors after every
+                             iteration. Optional.
+
+    Returns:
+        OptimizeResult: Solution in SciPy Optimization format with the best
+        start and ``func`` evaluated once at it, plus the final parameters
+        ``xs`` of all starts, their ``scores``, i.e., the windowed means of
+        their perturbed values used for ranking, and the indices of the starts
+        active in every rung, ``rungs``.
+
+    Raises:
+        ValueError: If ``eta`` is not greater than one, or if the budget does
+            not cover one iteration of all starts in every rung.
+    """
+    if eta <= 1:
+        raise ValueError(f"eta must be greater than one, got {eta}.")
+    xs = np.array(x0, dtype=float)
+    num_starts, num_params = xs.shape
+    rngs = [np.random.default_rng(child)
+            for child in np.random.SeedSequence(seed).spawn(num_starts)]
+    points_per_sample = 4 if second_order else 2
+    evals_per_iter = resamplings * points_per_sample
+
+    active_counts = _rungs(num_starts, eta)
+    # One evaluation is kept for the value at the returned point
+    rung_budget = (budget - 1) // len(active_counts)
+    if rung_budget < num_starts * evals_per_iter:
+        raise ValueError(
+            f"A budget of {budget} evaluations cannot give each of the {len(active_counts)} "
+            f"rungs one iteration of all {num_starts} starts "
+            f"({num_starts * evals_per_iter} evaluations)."
+        )
+    iterations = [rung_budget // (count * evals_per_iter) for count in active_counts]
+    A = 0.01 * sum(iterations)
+
+    pool = None
+    if not batched and executor is None and max_workers != 1:
+        pool = executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    def evaluate(points):
+        if batched:
+            return np.asarray(func(points, *args), dtype=float)
+        if executor is None:
+            return np.array([func(point, *args) for point in points])
+        fixed = [[arg] * len(points) for arg in args]
+        return np.fromiter(executor.map(func, points, *fixed), dtype=float,
+                           count=len(points))
+
+    hessians = np.tile(np.identity(num_params), (num_starts, 1, 1))
+    levels = np.full((num_starts, window), np.nan)
+    active = np.arange(num_starts)
+    rungs = []
+    nfev = 0
+    kk = 0
+    try:
+        for rung, (count, rung_iterations) in enumerate(zip(active_counts, iterations)):
+            if rung > 0:
+                scores = np.nanmean(levels[active], axis=1)
+                active = active[np.argsort(scores, kind="stable")[:count]]
+            rungs.append(active.copy())
+            for _ in range(rung_iterations):
+                ak = a * (kk+1.0+A)**-alpha
+                ck = c * (kk+1.0)**-gamma
+                # Bernoulli perturbations from every start's own stream
+                deltas = np.array([2*rngs[i].integers(2, size=(resamplings, num_params))-1
+                                   for i in active])
+                centers = xs[active][:, None, :]
+                shifted = [centers + ck*deltas, centers - ck*deltas]
+                if second_order:
+                    deltas2 = np.array([2*rngs[i].integers(2, size=(resamplings, num_params))-1
+                                        for i in active])
+                    shifted += [centers + ck*deltas + ck*deltas2,
+                                centers - ck*deltas + ck*deltas2]
+                points = np.stack(shifted, axis=2).reshape(-1, num_params)
+                values = evaluate(points).reshape(len(active), resamplings, points_per_sample)
+                nfev += len(points)
+
+                f_plus, f_minus = values[:, :, 0], values[:, :, 1]
+                grads = np.mean((f_plus - f_minus)[:, :, None] / (2*ck*deltas), axis=1)
+                levels[active, kk % window] = np.mean((f_plus + f_minus) / 2, axis=1)
+                for row, i in enumerate(active):
+                    grad = grads[row]
+                    if second_order:
+                        curvatures = ((values[row, :, 2] - f_plus[row])
+                                      - (values[row, :, 3] - f_minus[row])) / (2*ck*ck)
+                        for sample in range(resamplings):
+                            _update_hessian(hessians[i], deltas[row, sample],
+                                            deltas2[row, sample], curvatures[sample],
+                                            kk*resamplings + sample)
+                        if kk >= hessian_delay:
+                            grad = _precondition(hessians[i], grad, regularization)
+                    xs[i] -= ak*grad
+                kk += 1
+                if callback is not None:
+                    callback(active, xs[active])
+
+        scores = np.nanmean(levels, axis=1)
+        best = active[np.argmin(scores[active])]
+        fun = evaluate(xs[best][None, :])[0]
+        nfev += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return OptimizeResult(fun=fun, x=xs[best], nit=kk, nfev=nfev,
+                          xs=xs, scores=scores, rungs=rungs,
+                          message='Optimization terminated successfully.',
+                          success=True)
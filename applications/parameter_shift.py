@@ -0,0 +1,234 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Batched parameter-shift gradients of an Estimator expectation value.
+
+For a gate ``exp(-i g P / 2)`` with a Pauli generator ``P`` the expectation value
+satisfies ``dE/dg = (E(g + pi/2) - E(g - pi/2)) / 2`` exactly.  A parameter of
+the circuit may appear in several gates and inside expressions (transpiled
+circuits have ``rz(theta + pi/2)``), so every parameterized gate gets its own
+parameter ``g_k = expr_k(theta)`` and the chain rule gives
+``dE/dtheta = sum_k dexpr_k/dtheta dE/dg_k``.  All ``2K`` shifted parameter sets,
+plus the unshifted one, are submitted as one Estimator call, so the value and the
+exact gradient cost one round trip::
+
+    gradient = ParameterShiftGradient(estimator, ansatz, hamiltonian)
+    res = scipy.optimize.minimize(gradient.value_and_gradient, x0, jac=True,
+                                  method="L-BFGS-B")
+
+With ``num_coordinates=m`` only ``m`` random parameters are differentiated per
+call, which cuts the circuits per call from ``2K`` to about ``2Km/n`` for ``n``
+parameters; the partial derivatives are scaled by ``n/m``, so the gradient stays
+unbiased for stochastic gradient descent.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from qiskit.circuit import (
+    CircuitInstruction,
+    Parameter,
+    ParameterExpression,
+    ParameterVector,
+    QuantumCircuit,
+)
+from qiskit.primitives import BaseEstimator
+from qiskit.quantum_info import SparsePauliOp
+
+# Gates whose parameters all enter as exp(-i g P / 2), up to a global phase
+_SHIFTABLE = frozenset(
+    {"rx", "ry", "rz", "p", "u1", "u2", "u3", "u", "rxx", "ryy", "rzz", "rzx"}
+)
+
+
+def _is_parameterized(param) -> bool:
+    return isinstance(param, ParameterExpression) and bool(param.parameters)
+
+
+def _shiftable_circuit(circuit: QuantumCircuit) -> QuantumCircuit:
+    """Decompose parameterized gates until all follow the parameter-shift rule."""
+    while True:
+        names = {
+            instruction.operation.name
+            for instruction in circuit.data
+            if instruction.operation.name not in _SHIFTABLE
+            and any(_is_parameterized(param) for param in instruction.operation.params)
+        }
+        if not names:
+            return circuit
+        for instruction in circuit.data:
+            operation = instruction.operation
+            if operation.name in names and operation.definition is None:
+                raise ValueError(
+                    f"The parameterized instruction {operation.name} has no "
+                    "parameter-shift rule and no definition."
+                )
+        circuit = circuit.decompose(gates_to_decompose=list(names))
+
+
+class ParameterShiftGradient:
+    """Exact gradients of ``<psi(theta)|H|psi(theta)>`` from one batched Estimator call."""
+
+    def __init__(
+        self,
+        estimator: BaseEstimator,
+        circuit: QuantumCircuit,
+        observable: SparsePauliOp,
+        num_coordinates: Optional[int] = None,
+        seed: Optional[int] = None,
+        **run_options,
+    ):
+        """
+        Args:
+            estimator: The Estimator.
+            circuit: The parameterized circuit, with parameters in the order of
+                ``circuit.parameters``.
+            observable: The observable.
+            num_coordinates: Number of random parameters differentiated per call,
+                defaults to all.
+            seed: Seed of the random coordinates.
+            run_options: Options of ``estimator.run``.
+
+        Raises:
+            ValueError: If a parameterized instruction can not be differentiated.
+        """
+        self.estimator = estimator
+        self.observable = observable
+        self.parameters = list(circuit.parameters)
+        self.num_parameters = len(self.parameters)
+        self.num_coordinates = num_coordinates
+        self.run_options = run_options
+        self._rng = np.random.default_rng(seed)
+
+        circuit = _shiftable_circuit(circuit)
+        expressions: List[ParameterExpression] = []
+        for instruction in circuit.data:
+            expressions.extend(p for p in instruction.operation.params if _is_parameterized(p))
+        gate_params = ParameterVector("g", len(expressions))
+
+        shifted = circuit.copy_empty_like()
+        if _is_parameterized(shifted.global_phase):
+            # A global phase does not change expectation values
+            shifted.global_phase = 0
+        position = 0
+        for instruction in circuit.data:
+            operation = instruction.operation
+            if any(_is_parameterized(param) for param in operation.params):
+                operation = operation.copy()
+                params = []
+                for param in operation.params:
+                    if _is_parameterized(param):
+                        param = gate_params[position]
+                        position += 1
+                    params.append(param)
+                operation.params = params
+            shifted._append(CircuitInstruction(operation, instruction.qubits, instruction.clbits))
+        self.circuit = shifted
+        """The circuit with one parameter per parameterized gate"""
+        self.expressions = expressions
+        """Expression of every gate parameter in the circuit parameters"""
+
+        index = {param: j for j, param in enumerate(self.parameters)}
+        # Gate parameters that are plain circuit parameters are copied, not bound
+        self._plain = np.array(
+            [isinstance(expr, Parameter) for expr in expressions], dtype=bool
+        )
+        self._plain_source = np.array(
+            [index[expr] for expr in expressions if isinstance(expr, Parameter)], dtype=int
+        )
+        rows, cols, constants = [], [], []
+        self._variable: List[Tuple[int, int, ParameterExpression]] = []
+        for k, expr in enumerate(expressions):
+            for param in expr.parameters:
+                derivative = expr.gradient(param)
+                if _is_parameterized(derivative):
+                    self._variable.append((k, index[param], derivative))
+                else:
+                    rows.append(k)
+                    cols.append(index[param])
+                    constants.append(float(np.real(complex(derivative))))
+        self._constant_jacobian = csr_matrix(
+            (constants, (rows, cols)), shape=(len(expressions), self.num_parameters)
+        )
+
+    def _bind(self, expr: ParameterExpression, values: Dict[Parameter, float]) -> float:
+        bound = expr.bind({param: values[param] for param in expr.parameters})
+        return float(np.real(complex(bound)))
+
+    def gate_values(self, x: np.ndarray) -> np.ndarray:
+        """Values of the gate parameters at circuit parameters ``x``."""
+        x = np.asarray(x, dtype=float)
+        out = np.empty(len(self.expressions))
+        out[self._plain] = x[self._plain_source]
+        if not self._plain.all():
+            values = dict(zip(self.parameters, x))
+            for k in np.flatnonzero(~self._plain):
+                out[k] = self._bind(self.expressions[k], values)
+        return out
+
+    def jacobian(self, x: np.ndarray) -> csr_matrix:
+        """Derivatives of the gate parameters by the circuit parameters at ``x``."""
+        if not self._variable:
+            return self._constant_jacobian
+        values = dict(zip(self.parameters, np.asarray(x, dtype=float)))
+        rows, cols, data = zip(
+            *((k, j, self._bind(derivative, values)) for k, j, derivative in self._variable)
+        )
+        variable = csr_matrix((data, (rows, cols)), shape=self._constant_jacobian.shape)
+        return self._constant_jacobian + variable
+
+    def value_and_gradient(self, x: np.ndarray) -> Tuple[float, np.ndarray]:
+        """Return the expectation value and its gradient from one Estimator call.
+
+        Args:
+            x: Values of the circuit parameters.
+
+        Returns:
+            The expectation value and the gradient, which is an unbiased estimate
+            on random coordinates if ``num_coordinates`` is set.
+        """
+        x = np.asarray(x, dtype=float)
+        gates = self.gate_values(x)
+        jacobian = self.jacobian(x)
+        scale = 1.0
+        if self.num_coordinates is not None and self.num_coordinates < self.num_parameters:
+            coordinates = self._rng.choice(
+                self.num_parameters, size=self.num_coordinates, replace=False
+            )
+            mask = np.zeros(self.num_parameters)
+            mask[coordinates] = 1
+            jacobian = jacobian.multiply(mask[None, :]).tocsr()
+            jacobian.eliminate_zeros()
+            scale = self.num_parameters / self.num_coordinates
+        shifted = np.flatnonzero(np.diff(jacobian.indptr))
+        num = len(shifted)
+
+        # Row 0 is unshifted, rows 1..num are shifted up, the rest down
+        values = np.tile(gates, (2 * num + 1, 1))
+        values[1 + np.arange(num), shifted] += np.pi / 2
+        values[1 + num + np.arange(num), shifted] -= np.pi / 2
+        job = self.estimator.run(
+            [self.circuit] * len(values),
+            [self.observable] * len(values),
+            values.tolist(),
+            **self.run_options,
+        )
+        results = np.asarray(job.result().values, dtype=float)
+        gate_gradient = np.zeros(len(gates))
+        gate_gradient[shifted] = (results[1 : num + 1] - results[num + 1 :]) / 2
+        return float(results[0]), scale * (jacobian.T @ gate_gradient)
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        """Return the gradient at ``x``, e.g., as the ``jac`` of ``scipy.optimize.minimize``."""
+        return self.value_and_gradient(x)[1]
@@ -0,0 +1,241 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Chunked, concurrent and resumable parameter sweeps of an Estimator.
+
+A sweep evaluates one observable on a parameterized circuit over the Cartesian
+product of one grid axis per circuit parameter.  The points are split into
+job-sized chunks, each submitted as one Estimator call, and several chunks are
+in flight at once, so remote jobs queue while earlier ones run.  Results stream
+into preallocated arrays of the grid shape as chunks finish.
+
+Every finished chunk is appended to a log file named by a hash of the circuit
+structure, the observable, the run options and an estimator label; points are
+keyed by their parameter values.  Re-creating the sweep after an interruption
+loads the log and only submits the points still missing::
+
+    sweep = ParameterSweep(qc_ibm, mermin_ibm, [phases], estimator, label=backend.name)
+    values = sweep.run()
+
+A 2-D scan of a two-parameter circuit is ``ParameterSweep(qc, op, [phases, phases], ...)``.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from qiskit.circuit import QuantumCircuit
+from qiskit.primitives import BaseEstimator
+from qiskit.quantum_info import SparsePauliOp
+
+from transpile_cache import _canonical, circuit_hash
+
+DEFAULT_CACHE_DIR = ".sweep_cache"
+
+
+def _point_key(point: np.ndarray) -> str:
+    """Key of a grid point, exact in its float values."""
+    return hashlib.sha256(np.ascontiguousarray(point, dtype=float).tobytes()).hexdigest()
+
+
+class ParameterSweep:
+    """Estimator sweep over a grid of parameter values."""
+
+    def __init__(
+        self,
+        circuit: QuantumCircuit,
+        observable: SparsePauliOp,
+        axes: Sequence[Sequence[float]],
+        estimator: BaseEstimator,
+        chunk_size: int = 100,
+        max_workers: int = 4,
+        label: Optional[str] = None,
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+        **run_options,
+    ):
+        """
+        Args:
+            circuit: The parameterized circuit.
+            observable: The observable, on the qubits of the circuit.
+            axes: Values of every parameter, in the order of ``circuit.parameters``.
+            estimator: The Estimator, local or remote.
+            chunk_size: Number of points per Estimator call.
+            max_workers: Number of calls in flight at once.
+            label: Name of the estimator in the cache key, e.g., the backend name.
+                Defaults to the class name of the estimator.
+            cache_dir: Directory of the result logs, ``None`` disables caching.
+            run_options: Options of ``estimator.run``, part of the cache key.
+
+        Raises:
+            ValueError: If the number of axes differs from the number of parameters.
+        """
+        if len(axes) != circuit.num_parameters:
+            raise ValueError(
+                f"Got {len(axes)} axes for a circuit with {circuit.num_parameters} parameters."
+            )
+        self.circuit = circuit
+        self.observable = observable
+        self.axes = [np.asarray(axis, dtype=float) for axis in axes]
+        self.shape = tuple(len(axis) for axis in self.axes)
+        self.estimator = estimator
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.label = label if label is not None else type(estimator).__name__
+        self.cache_dir = cache_dir
+        self.run_options = run_options
+
+        grids = np.meshgrid(*self.axes, indexing="ij")
+        self.points = np.stack([grid.ravel() for grid in grids], axis=1)
+        """Parameter values of every point, in C order of the grid"""
+        self.values = np.full(self.shape, np.nan)
+        """Expectation values, ``nan`` where not computed yet"""
+        self.variances = np.full(self.shape, np.nan)
+        """Variances from the result metadata, ``nan`` where unavailable"""
+        self.done = np.zeros(self.shape, dtype=bool)
+        """Whether a point is computed"""
+        self._load()
+
+    @property
+    def key(self) -> str:
+        """Hash of everything but the grid that determines the results."""
+        digest = hashlib.sha256()
+        digest.update(circuit_hash(self.circuit).encode())
+        observable = self.observable.simplify(atol=0)
+        digest.update(_canonical(observable.paulis.to_labels()).encode())
+        digest.update(_canonical(observable.coeffs.tolist()).encode())
+        digest.update(_canonical(self.run_options).encode())
+        digest.update(self.label.encode())
+        return digest.hexdigest()
+
+    @property
+    def path(self) -> Optional[str]:
+        """Path of the result log, ``None`` without caching."""
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, self.key + ".jsonl")
+
+    def _load(self) -> None:
+        path = self.path
+        if path is None or not os.path.exists(path):
+            return
+        cached: Dict[str, Tuple[float, float]] = {}
+        with open(path, encoding="utf-8") as fd:
+            for line in fd:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by an interruption
+                    continue
+                for key, value, variance in entry:
+                    cached[key] = (value, variance)
+        if not cached:
+            return
+        values = self.values.reshape(-1)
+        variances = self.variances.reshape(-1)
+        done = self.done.reshape(-1)
+        for index, point in enumerate(self.points):
+            hit = cached.get(_point_key(point))
+            if hit is not None:
+                values[index], variances[index] = hit
+                done[index] = True
+
+    def _store(self, indices: np.ndarray) -> None:
+        path = self.path
+        if path is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        values = self.values.reshape(-1)
+        variances = self.variances.reshape(-1)
+        entry = [
+            [_point_key(self.points[index]), float(values[index]), float(variances[index])]
+            for index in indices
+        ]
+        # One line per chunk, flushed so a finished chunk survives an interruption
+        with open(path, "a", encoding="utf-8") as fd:
+            fd.write(json.dumps(entry) + "\n")
+            fd.flush()
+            os.fsync(fd.fileno())
+
+    def _run_chunk(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray, List[Dict]]:
+        job = self.estimator.run(
+            [self.circuit] * len(indices),
+            [self.observable] * len(indices),
+            self.points[indices].tolist(),
+            **self.run_options,
+        )
+        result = job.result()
+        return indices, np.asarray(result.values, dtype=float), result.metadata
+
+    def pending(self) -> np.ndarray:
+        """Flat indices of the points not computed yet."""
+        return np.flatnonzero(~self.done.reshape(-1))
+
+    def _record(self, indices: np.ndarray, chunk_values: np.ndarray, metadata: List[Dict]) -> None:
+        self.values.reshape(-1)[indices] = chunk_values
+        self.variances.reshape(-1)[indices] = [meta.get("variance", np.nan) for meta in metadata]
+        self.done.reshape(-1)[indices] = True
+        self._store(indices)
+
+    def iter_run(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Compute the missing points, yielding every chunk as it finishes.
+
+        Yields:
+            The flat grid indices of a chunk and their values, in completion order.
+        """
+        pending = self.pending()
+        if len(pending) == 0:
+            return
+        chunks = np.array_split(pending, -(-len(pending) // self.chunk_size))
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        futures = []
+        recorded = set()
+        try:
+            futures = [executor.submit(self._run_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                indices, chunk_values, metadata = future.result()
+                self._record(indices, chunk_values, metadata)
+                recorded.add(future)
+                yield indices, chunk_values
+        finally:
+            # On an error or when the caller stops early, do not start further chunks
+            executor.shutdown(wait=True, cancel_futures=True)
+            # Chunks in flight have finished now, keep them so a resume does not repeat them
+            for future in futures:
+                if (
+                    future not in recorded
+                    and not future.cancelled()
+                    and future.exception() is None
+                ):
+                    self._record(*future.result())
+
+    def run(self) -> np.ndarray:
+        """Compute the missing points.
+
+        Returns:
+            The expectation values, with the shape of the grid.
+        """
+        for _ in self.iter_run():
+            pass
+        return self.values
+
+    def clear(self) -> None:
+        """Forget all results, including the log of this sweep."""
+        path = self.path
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+        self.values[...] = np.nan
+        self.variances[...] = np.nan
+        self.done[...] = False
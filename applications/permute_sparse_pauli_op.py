@@ -10,16 +10,49 @@
 # copyright notice, and modified files need to carry a notice indicating
 # that they have been altered from the originals.
 """
+Map operators defined on the qubits of a circuit onto the physical qubits
+of its transpiled layout.
 
+The z/x boolean columns of every operator are scattered directly into the
+physical width, so no intermediate operators are composed.  Many observables
+of the same transpiled circuit are permuted together with
+:func:`permute_sparse_pauli_ops`, which builds the index map once.
 """
 
-from typing import Sequence
+from typing import List, Sequence, Tuple
 
+import numpy as np
 
 from qiskit.circuit import  Qubit
-from qiskit.quantum_info import SparsePauliOp
+from qiskit.quantum_info import PauliList, SparsePauliOp
 from qiskit.transpiler import Layout
 
+
+def layout_index_map(layout: Layout, original_qubits: Sequence[Qubit]) -> Tuple[np.ndarray, int]:
+    """Return the physical index of every original qubit together with the physical width.
+
+    Args:
+       layout: The layout of the transpiled circuit.
+       original_qubits: Qubits that original circuit has.
+
+    Returns:
+        The index array and the number of physical qubits.
+    """
+    index = np.fromiter((layout[qubit] for qubit in original_qubits), dtype=np.intp)
+    return index, len(layout)
+
+
+def _scatter(
+    z: np.ndarray, x: np.ndarray, index: np.ndarray, num_physical: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Scatter boolean symplectic columns into the physical width."""
+    z_out = np.zeros((z.shape[0], num_physical), dtype=bool)
+    x_out = np.zeros((x.shape[0], num_physical), dtype=bool)
+    z_out[:, index] = z
+    x_out[:, index] = x
+    return z_out, x_out
+
+
 def permute_sparse_pauli_op(
     operator: SparsePauliOp,
     layout: Layout,
@@ -34,7 +67,44 @@ def permute_sparse_pauli_op(
     Returns:
         The operator for the given layout.
     """
-    virtual_bit_map = layout.get_virtual_bits()
-    identity = SparsePauliOp("I" * len(virtual_bit_map))
-    perm_pattern = [virtual_bit_map[v] for v in original_qubits]
-    return identity.compose(operator, qargs=perm_pattern)
\ No newline at end of file
+    index, num_physical = layout_index_map(layout, original_qubits)
+    z, x = _scatter(operator.paulis.z, operator.paulis.x, index, num_physical)
+    paulis = PauliList.from_symplectic(z, x, operator.paulis.phase)
+    return SparsePauliOp(paulis, operator.coeffs)
+
+
+def permute_sparse_pauli_ops(
+    operators: Sequence[SparsePauliOp],
+    layout: Layout,
+    original_qubits: Sequence[Qubit],
+) -> List[SparsePauliOp]:
+    """Permute many operators against the same layout.
+
+    The index map is computed once and the stacked z/x columns of all
+    operators are scattered in a single fancy-indexing pass.
+
+    Args:
+       operators: Operators to be transpiled.
+       layout: The layout of the transpiled circuit.
+       original_qubits: Qubits that original circuit has.
+
+    Returns:
+        The operators for the given layout.
+    """
+    if not operators:
+        return []
+    index, num_physical = layout_index_map(layout, original_qubits)
+    z, x = _scatter(
+        np.vstack([op.paulis.z for op in operators]),
+        np.vstack([op.paulis.x for op in operators]),
+        index,
+        num_physical,
+    )
+    out = []
+    start = 0
+    for op in operators:
+        stop = start + len(op)
+        paulis = PauliList.from_symplectic(z[start:stop], x[start:stop], op.paulis.phase)
+        out.append(SparsePauliOp(paulis, op.coeffs))
+        start = stop
+    return out
@@ -24,6 +24,14 @@ this
 
 from .quadratic_program import QuadraticProgram
 from .exceptions import QuadraticProgramError
+from .program_arrays import ProgramArrays
+from .shared_program import SharedProgram, SharedProgramHandle
 
 
-__all__ = ["QuadraticProgram", "QuadraticProgramError"]
+__all__ = [
+    "QuadraticProgram",
+    "QuadraticProgramError",
+    "ProgramArrays",
+    "SharedProgram",
+    "SharedProgramHandle",
+]
@@ -0,0 +1,533 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Native reader and writer of the CPLEX LP file format.
+
+Both directions work line by line on file objects.  The writer streams every
+expression straight from its sparse coefficients, and the reader tokenizes one
+line at a time and collects the coefficients in compact typed arrays that are
+turned into sparse matrices once at the end, so no intermediate model is built
+and docplex is not needed.
+"""
+
+import array
+import re
+from collections import deque
+from itertools import chain
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix
+
+from .exceptions import QuadraticProgramError
+from .quadratic_program import QuadraticProgram
+from .variable import VarType
+
+INFINITY = np.inf
+
+# Lines are wrapped once they get longer than this; CPLEX accepts up to 560 characters
+_MAX_LINE = 255
+
+_SECTIONS = {
+    "minimize": "min",
+    "minimise": "min",
+    "minimum": "min",
+    "min": "min",
+    "maximize": "max",
+    "maximise": "max",
+    "maximum": "max",
+    "max": "max",
+    "subject to": "constraints",
+    "such that": "constraints",
+    "st": "constraints",
+    "s.t.": "constraints",
+    "st.": "constraints",
+    "bounds": "bounds",
+    "bound": "bounds",
+    "binary": "binaries",
+    "binaries": "binaries",
+    "bin": "binaries",
+    "general": "generals",
+    "generals": "generals",
+    "gen": "generals",
+    "semi-continuous": "unsupported",
+    "semis": "unsupported",
+    "semi": "unsupported",
+    "sos": "unsupported",
+    "end": "end",
+}
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<op><=|=<|>=|=>|<->|->|[<>=+\-*/^:\[\]])
+      | (?P<name>[^\s\d.+\-*/^:\[\]<>=][^\s+\-*/^:\[\]<>=]*)
+      | (?P<error>\S)
+    )""",
+    re.X,
+)
+
+_SENSES = {"<=": "<=", "=<": "<=", "<": "<=", ">=": ">=", "=>": ">=", ">": ">=", "=": "=="}
+_LABELS = {"<=": "<=", ">=": ">=", "==": "="}
+
+
+def _fmt(value: float) -> str:
+    """Shortest text that reads back as the same float."""
+    text = repr(float(value))
+    return text[:-2] if text.endswith(".0") else text
+
+
+class _Triplets:
+    """Growable COO coefficients backed by compact typed arrays."""
+
+    def __init__(self):
+        self.rows = array.array("q")
+        self.cols = array.array("q")
+        self.vals = array.array("d")
+
+    def __len__(self) -> int:
+        return len(self.vals)
+
+    def append(self, row: int, col: int, val: float) -> None:
+        self.rows.append(row)
+        self.cols.append(col)
+        self.vals.append(val)
+
+    def extend(self, other: "_Triplets", row: int) -> None:
+        """Append the coefficients of ``other`` to a single row."""
+        self.rows.extend(array.array("q", [row]) * len(other))
+        self.cols.extend(other.cols)
+        self.vals.extend(other.vals)
+
+    def clear(self) -> None:
+        del self.rows[:], self.cols[:], self.vals[:]
+
+    def scale(self, start: int, factor: float) -> None:
+        """Multiply the coefficients appended since ``start`` by a factor."""
+        for k in range(start, len(self.vals)):
+            self.vals[k] *= factor
+
+    def to_csr(self, shape: Tuple[int, int]) -> csr_matrix:
+        """Sum the coefficients into a sparse matrix."""
+        if not self.vals:
+            return csr_matrix(shape)
+        rows = np.frombuffer(self.rows, dtype=np.int64)
+        cols = np.frombuffer(self.cols, dtype=np.int64)
+        matrix = coo_matrix((np.frombuffer(self.vals), (rows, cols)), shape=shape).tocsr()
+        matrix.eliminate_zeros()
+        return matrix
+
+
+def _term(coeff: float, name: str) -> str:
+    sign = "-" if coeff < 0 else "+"
+    coeff = abs(coeff)
+    return f" {sign} {name}" if coeff == 1 else f" {sign} {_fmt(coeff)} {name}"
+
+
+def _expression_terms(
+    names: List[str], linear: Iterator[Tuple[int, float]], quadratic=None, factor: float = 1
+) -> Iterator[str]:
+    """Terms of a linear and an optional quadratic expression in LP syntax.
+
+    The quadratic coefficients are multiplied by ``factor``, which is 2 for the
+    objective, whose bracketed part is written as ``[ ... ] / 2``.
+    """
+    empty = True
+    for i, coeff in linear:
+        empty = False
+        yield _term(coeff, names[i]) if coeff else f" + 0 {names[i]}"
+    if quadratic is not None and quadratic.coefficients.nnz:
+        empty = False
+        yield " + ["
+        for (i, j), coeff in sorted(quadratic.coefficients.items()):
+            var = f"{names[i]} ^ 2" if i == j else f"{names[i]} * {names[j]}"
+            yield _term(factor * coeff, var)
+        yield " ] / 2" if factor == 2 else " ]"
+    if empty and names:
+        yield f" 0 {names[0]}"
+
+
+def _sparse_items(expression) -> Iterator[Tuple[int, float]]:
+    return ((i, coeff) for (_, i), coeff in sorted(expression.coefficients.items()))
+
+
+def _write_wrapped(fd: IO[str], start: str, terms: Iterator[str], end: str = "") -> None:
+    line = start
+    for term in terms:
+        if len(line) + len(term) > _MAX_LINE:
+            fd.write(line + "\n")
+            line = "     "
+        line += term
+    fd.write(line + end + "\n")
+
+
+def _bound_line(name: str, lowerbound: float, upperbound: float) -> Optional[str]:
+    if lowerbound == upperbound:
+        return f" {name} = {_fmt(lowerbound)}"
+    if lowerbound == -INFINITY and upperbound == INFINITY:
+        return f" {name} Free"
+    lower = "-infinity" if lowerbound == -INFINITY else _fmt(lowerbound)
+    if upperbound == INFINITY:
+        return None if lowerbound == 0 else f" {name} >= {lower}"
+    return f" {lower} <= {name} <= {_fmt(upperbound)}"
+
+
+def write_lp(problem: QuadraticProgram, fd: IO[str]) -> None:
+    """Write a quadratic program in LP format.
+
+    Args:
+        problem: The quadratic program.
+        fd: A text file object to write to.
+    """
+    names = [var.name for var in problem.variables]
+    fd.write("\\ This file has been generated by QuadraticProgram\n")
+    fd.write(f"\\ Problem name: {problem.name}\n\n")
+
+    objective = problem.objective
+    fd.write("Minimize\n" if objective.sense == objective.Sense.MINIMIZE else "Maximize\n")
+    # Every variable appears in the objective, so reading the file back keeps their order.
+    # The objective array only spans the variables that existed when it was set.
+    linear = np.zeros(problem.get_num_vars())
+    coeffs = objective.linear.to_array()
+    linear[: len(coeffs)] = coeffs
+    linear = enumerate(linear.tolist())
+    terms = _expression_terms(names, linear, objective.quadratic, factor=2)
+    if objective.constant != 0:
+        sign = "-" if objective.constant < 0 else "+"
+        terms = chain(terms, [f" {sign} {_fmt(abs(objective.constant))}"])
+    _write_wrapped(fd, " obj:", terms)
+
+    fd.write("\nSubject To\n")
+    for constraint in problem.linear_constraints:
+        _write_wrapped(
+            fd,
+            f" {constraint.name}:",
+            _expression_terms(names, _sparse_items(constraint.linear)),
+            f" {_LABELS[constraint.sense.label]} {_fmt(constraint.rhs)}",
+        )
+    for constraint in problem.quadratic_constraints:
+        _write_wrapped(
+            fd,
+            f" {constraint.name}:",
+            _expression_terms(names, _sparse_items(constraint.linear), constraint.quadratic),
+            f" {_LABELS[constraint.sense.label]} {_fmt(constraint.rhs)}",
+        )
+
+    fd.write("\nBounds\n")
+    binaries = []
+    generals = []
+    for var in problem.variables:
+        if var.vartype == VarType.BINARY:
+            binaries.append(var.name)
+            continue
+        if var.vartype == VarType.INTEGER:
+            generals.append(var.name)
+        line = _bound_line(var.name, var.lowerbound, var.upperbound)
+        if line is not None:
+            fd.write(line + "\n")
+
+    for title, section in (("Binaries", binaries), ("Generals", generals)):
+        if section:
+            fd.write(f"\n{title}\n")
+            _write_wrapped(fd, "", (f" {name}" for name in section))
+    fd.write("End\n")
+
+
+class _LPReader:
+    """Streaming recursive-descent parser of LP files."""
+
+    def __init__(self, fd: IO[str]):
+        self._fd = fd
+        self._buffer = deque()
+        self._line = 0
+        self.name = ""
+        self._var_index: Dict[str, int] = {}
+        self._lowerbounds = array.array("d")
+        self._upperbounds = array.array("d")
+        self._vartypes = array.array("b")
+        self._maximize = False
+        self._constant = 0.0
+        self._objective = _Triplets()
+        self._objective_quadratic = _Triplets()
+        self._constraints = _Triplets()
+        self._senses: List[str] = []
+        self._rhs = array.array("d")
+        self._names: List[Optional[str]] = []
+        self._quadratic_constraints = []
+
+    def _tokenize(self, line: str) -> None:
+        """Append the tokens of one line to the buffer."""
+        buffer = self._buffer
+        line, _, comment = line.partition("\\")
+        if comment.lower().startswith(" problem name:") and not self.name:
+            self.name = comment.split(":", 1)[1].strip()
+        words = line.split(None, 2)
+        lower = [word.lower() for word in words[:2]]
+        if len(lower) == 2 and f"{lower[0]} {lower[1]}" in _SECTIONS:
+            buffer.append(("section", _SECTIONS[f"{lower[0]} {lower[1]}"]))
+            line = words[2] if len(words) > 2 else ""
+        elif lower and lower[0] in _SECTIONS:
+            buffer.append(("section", _SECTIONS[lower[0]]))
+            line = line.split(None, 1)[1] if len(words) > 1 else ""
+        for number, op, name, error in _TOKEN.findall(line):
+            if error:
+                raise self._error(f"Invalid LP syntax '{error}'")
+            buffer.append(("number", number) if number else ("op", op) if op else ("name", name))
+
+    def _peek(self, k: int = 0) -> Tuple[str, str]:
+        buffer = self._buffer
+        while len(buffer) <= k:
+            line = self._fd.readline()
+            if not line:
+                buffer.append(("section", "end"))
+            else:
+                self._line += 1
+                self._tokenize(line)
+        return buffer[k]
+
+    def _next(self) -> Tuple[str, str]:
+        if not self._buffer:
+            self._peek()
+        return self._buffer.popleft()
+
+    def _error(self, message: str) -> QuadraticProgramError:
+        return QuadraticProgramError(f"{message} in line {self._line} of the LP file")
+
+    def _index(self, name: str) -> int:
+        index = self._var_index.get(name)
+        if index is None:
+            index = len(self._var_index)
+            self._var_index[name] = index
+            self._lowerbounds.append(0.0)
+            self._upperbounds.append(INFINITY)
+            self._vartypes.append(VarType.CONTINUOUS.value)
+        return index
+
+    def _label(self) -> Optional[str]:
+        if self._peek()[0] == "name" and self._peek(1) == ("op", ":"):
+            name = self._next()[1]
+            self._next()
+            return name
+        return None
+
+    def _number(self) -> float:
+        sign = 1.0
+        while self._peek() in (("op", "+"), ("op", "-")):
+            if self._next()[1] == "-":
+                sign = -sign
+        kind, text = self._next()
+        if kind == "name" and text.lower() in ("inf", "infinity"):
+            return sign * INFINITY
+        if kind != "number":
+            raise self._error(f"Expected a number but found '{text}'")
+        return sign * float(text)
+
+    def _quadratic_terms(self, quadratic: _Triplets) -> None:
+        sign, coeff = 1.0, None
+        while True:
+            kind, text = self._next()
+            if (kind, text) == ("op", "]"):
+                return
+            if kind == "op" and text in "+-":
+                sign = -sign if text == "-" else sign
+            elif kind == "number":
+                coeff = float(text)
+            elif kind == "name":
+                i = self._index(text)
+                op = self._next()
+                if op == ("op", "^"):
+                    if self._number() != 2:
+                        raise self._error("Only squares are supported as powers")
+                    j = i
+                elif op == ("op", "*"):
+                    kind, text = self._next()
+                    if kind != "name":
+                        raise self._error(f"Expected a variable but found '{text}'")
+                    j = self._index(text)
+                else:
+                    raise self._error(f"Expected '^' or '*' but found '{op[1]}'")
+                quadratic.append(i, j, sign * (1.0 if coeff is None else coeff))
+                sign, coeff = 1.0, None
+            else:
+                raise self._error(f"Unexpected '{text}' in quadratic expression")
+
+    def _expression(self, linear: _Triplets, quadratic: _Triplets) -> float:
+        """Parse terms into the coefficient buffers and return the constant."""
+        constant = 0.0
+        sign, coeff = 1.0, None
+        while True:
+            kind, text = self._peek()
+            if kind == "op" and text in ("+", "-"):
+                if coeff is not None:
+                    constant += sign * coeff
+                    sign, coeff = 1.0, None
+                sign = -sign if text == "-" else sign
+            elif kind == "number":
+                if coeff is not None:
+                    constant += sign * coeff
+                    sign = 1.0
+                coeff = float(text)
+            elif kind == "name" and self._peek(1) != ("op", ":"):
+                linear.append(0, self._index(text), sign * (1.0 if coeff is None else coeff))
+                sign, coeff = 1.0, None
+            elif (kind, text) == ("op", "["):
+                self._next()
+                start = len(quadratic)
+                self._quadratic_terms(quadratic)
+                factor = sign * (1.0 if coeff is None else coeff)
+                if self._peek() == ("op", "/"):
+                    self._next()
+                    factor /= self._number()
+                if factor != 1:
+                    quadratic.scale(start, factor)
+                sign, coeff = 1.0, None
+                continue
+            else:
+                if coeff is not None:
+                    constant += sign * coeff
+                return constant
+            self._next()
+
+    def _objective_section(self) -> None:
+        self._label()
+        self._constant += self._expression(self._objective, self._objective_quadratic)
+
+    def _constraint(self, linear: _Triplets, quadratic: _Triplets) -> None:
+        name = self._label()
+        linear.clear()
+        quadratic.clear()
+        constant = self._expression(linear, quadratic)
+        kind, text = self._next()
+        if kind != "op" or text not in _SENSES:
+            raise self._error(f"Expected a constraint sense but found '{text}'")
+        if self._peek() in (("op", "->"), ("op", "<->")) or self._peek(1) == ("op", "->"):
+            raise self._error("Indicator constraints are not supported")
+        sense = _SENSES[text]
+        rhs = self._number() - constant
+        if len(quadratic):
+            lin = {}
+            for col, val in zip(linear.cols, linear.vals):
+                lin[col] = lin.get(col, 0.0) + val
+            quad = {}
+            for row, col, val in zip(quadratic.rows, quadratic.cols, quadratic.vals):
+                quad[row, col] = quad.get((row, col), 0.0) + val
+            self._quadratic_constraints.append((lin, quad, sense, rhs, name))
+        else:
+            self._constraints.extend(linear, len(self._senses))
+            self._senses.append(sense)
+            self._rhs.append(rhs)
+            self._names.append(name)
+
+    def _set_bound(self, index: int, sense: str, value: float) -> None:
+        if sense in ("<=", "=="):
+            self._upperbounds[index] = value
+        if sense in (">=", "=="):
+            self._lowerbounds[index] = value
+
+    def _bound(self) -> None:
+        kind, text = self._peek()
+        if kind == "name":
+            index = self._index(self._next()[1])
+            kind, text = self._next()
+            if kind == "name" and text.lower() == "free":
+                self._lowerbounds[index] = -INFINITY
+                self._upperbounds[index] = INFINITY
+                return
+            if kind != "op" or text not in _SENSES:
+                raise self._error(f"Invalid bound, found '{text}'")
+            self._set_bound(index, _SENSES[text], self._number())
+            return
+
+        value = self._number()
+        kind, text = self._next()
+        if kind != "op" or text not in _SENSES:
+            raise self._error(f"Invalid bound, found '{text}'")
+        # value <= x is a lower bound
+        flipped = {"<=": ">=", ">=": "<=", "==": "=="}[_SENSES[text]]
+        kind, name = self._next()
+        if kind != "name":
+            raise self._error(f"Expected a variable but found '{name}'")
+        index = self._index(name)
+        self._set_bound(index, flipped, value)
+        kind, text = self._peek()
+        if kind == "op" and text in _SENSES:
+            self._next()
+            self._set_bound(index, _SENSES[text], self._number())
+
+    def read(self) -> QuadraticProgram:
+        """Parse the file and build the quadratic program."""
+        section = None
+        linear, quadratic = _Triplets(), _Triplets()
+        while True:
+            kind, text = self._peek()
+            if kind == "section":
+                self._next()
+                section = text
+                if section == "end":
+                    break
+                if section == "unsupported":
+                    raise self._error("Semi-continuous variables and SOS are not supported")
+                if section in ("min", "max"):
+                    self._maximize = section == "max"
+                    self._objective_section()
+            elif section == "constraints":
+                self._constraint(linear, quadratic)
+            elif section == "bounds":
+                self._bound()
+            elif section in ("binaries", "generals") and kind == "name":
+                self._next()
+                vartype = VarType.BINARY if section == "binaries" else VarType.INTEGER
+                self._vartypes[self._index(text)] = vartype.value
+            else:
+                raise self._error(f"Unexpected '{text}'")
+        return self._build()
+
+    def _build(self) -> QuadraticProgram:
+        problem = QuadraticProgram(self.name)
+        num_vars = len(self._var_index)
+        problem.add_variables(
+            np.frombuffer(self._lowerbounds) if num_vars else [],
+            np.frombuffer(self._upperbounds) if num_vars else [],
+            self._vartypes.tolist(),
+            list(self._var_index),
+        )
+        objective = self._objective.to_csr((1, num_vars))
+        objective_quadratic = self._objective_quadratic.to_csr((num_vars, num_vars))
+        if self._maximize:
+            problem.maximize(self._constant, objective, objective_quadratic)
+        else:
+            problem.minimize(self._constant, objective, objective_quadratic)
+        problem.add_linear_constraints(
+            self._constraints.to_csr((len(self._senses), num_vars)),
+            self._senses,
+            self._rhs.tolist(),
+            self._names,
+        )
+        for linear, quadratic, sense, rhs, name in self._quadratic_constraints:
+            problem.quadratic_constraint(linear, quadratic, sense, rhs, name)
+        return problem
+
+
+def read_lp(fd: IO[str]) -> QuadraticProgram:
+    """Read a quadratic program from an LP file.
+
+    Args:
+        fd: A text file object to read from.
+
+    Returns:
+        The quadratic program.
+
+    Raises:
+        QuadraticProgramError: if the file is not valid LP or uses unsupported
+            features such as indicator or SOS constraints.
+    """
+    return _LPReader(fd).read()
@@ -0,0 +1,379 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Native reader and writer of the free MPS file format.
+
+The reader goes through the file line by line and collects the column-wise
+coefficients in compact typed arrays; the writer transposes the constraint
+coefficients once into a CSC matrix and streams the columns.  Quadratic
+objectives are read from ``QUADOBJ`` or ``QMATRIX`` sections and quadratic
+constraints from ``QCMATRIX`` sections, ranged rows are split into two
+linear constraints.
+"""
+
+import array
+from typing import IO, Dict, List, Optional
+
+import numpy as np
+from scipy.sparse import vstack
+
+from .exceptions import QuadraticProgramError
+from .lp_file import _fmt, _Triplets
+from .quadratic_program import QuadraticProgram
+from .variable import VarType
+
+INFINITY = np.inf
+
+_SENSES = {"L": "<=", "G": ">=", "E": "=="}
+_ROW_TYPES = {"<=": "L", ">=": "G", "==": "E"}
+
+
+def _objective_row_name(problem: QuadraticProgram) -> str:
+    name = "obj"
+    while name in problem.linear_constraints_index or name in problem.quadratic_constraints_index:
+        name += "_"
+    return name
+
+
+def _write_bounds(fd: IO[str], var) -> None:
+    name, lowerbound, upperbound = var.name, var.lowerbound, var.upperbound
+    if var.vartype == VarType.BINARY:
+        fd.write(f" BV BND {name}\n")
+        return
+    if lowerbound == upperbound:
+        fd.write(f" FX BND {name} {_fmt(lowerbound)}\n")
+        return
+    if lowerbound == -INFINITY and upperbound == INFINITY and var.vartype != VarType.INTEGER:
+        fd.write(f" FR BND {name}\n")
+        return
+    # Integer defaults differ between solvers, so their bounds are always written, as is
+    # a zero lower bound with a negative upper bound, which some readers would drop
+    explicit = var.vartype == VarType.INTEGER or upperbound < 0
+    if lowerbound == -INFINITY:
+        fd.write(f" MI BND {name}\n")
+    elif lowerbound != 0 or explicit:
+        fd.write(f" LO BND {name} {_fmt(lowerbound)}\n")
+    if upperbound == INFINITY:
+        if explicit:
+            fd.write(f" PL BND {name}\n")
+    else:
+        fd.write(f" UP BND {name} {_fmt(upperbound)}\n")
+
+
+def write_mps(problem: QuadraticProgram, fd: IO[str]) -> None:
+    """Write a quadratic program in free MPS format.
+
+    Args:
+        problem: The quadratic program.
+        fd: A text file object to write to.
+    """
+    num_vars = problem.get_num_vars()
+    names = [var.name for var in problem.variables]
+    constraints = problem.linear_constraints + problem.quadratic_constraints
+    obj_name = _objective_row_name(problem)
+    objective = problem.objective
+
+    fd.write(f"NAME {problem.name}\n")
+    if objective.sense == objective.Sense.MAXIMIZE:
+        fd.write("OBJSENSE\n    MAX\n")
+    fd.write(f"ROWS\n N  {obj_name}\n")
+    for constraint in constraints:
+        fd.write(f" {_ROW_TYPES[constraint.sense.label]}  {constraint.name}\n")
+
+    # Row 0 is the objective, the constraints follow in order
+    coeffs = _Triplets()
+    for (_, col), val in objective.linear.coefficients.items():
+        coeffs.append(0, col, val)
+    for row, constraint in enumerate(constraints, start=1):
+        for (_, col), val in constraint.linear.coefficients.items():
+            coeffs.append(row, col, val)
+    columns = coeffs.to_csr((len(constraints) + 1, num_vars)).tocsc()
+    row_names = [obj_name] + [constraint.name for constraint in constraints]
+
+    fd.write("COLUMNS\n")
+    integer = False
+    for col, var in enumerate(problem.variables):
+        if (var.vartype != VarType.CONTINUOUS) != integer:
+            integer = not integer
+            marker = "INTORG" if integer else "INTEND"
+            fd.write(f"    MARKER 'MARKER' '{marker}'\n")
+        begin, end = columns.indptr[col], columns.indptr[col + 1]
+        if begin == end:
+            # Every column has to be declared, even without coefficients
+            fd.write(f"    {names[col]} {obj_name} 0\n")
+        rows = columns.indices[begin:end].tolist()
+        for row, val in zip(rows, columns.data[begin:end].tolist()):
+            fd.write(f"    {names[col]} {row_names[row]} {_fmt(val)}\n")
+    if integer:
+        fd.write("    MARKER 'MARKER' 'INTEND'\n")
+
+    fd.write("RHS\n")
+    if objective.constant != 0:
+        fd.write(f"    RHS {obj_name} {_fmt(-objective.constant)}\n")
+    for constraint in constraints:
+        if constraint.rhs != 0:
+            fd.write(f"    RHS {constraint.name} {_fmt(constraint.rhs)}\n")
+
+    fd.write("BOUNDS\n")
+    for var in problem.variables:
+        _write_bounds(fd, var)
+
+    if objective.quadratic.coefficients.nnz:
+        # QUADOBJ holds the upper triangle of Q in the objective 1/2 x^T Q x
+        fd.write("QUADOBJ\n")
+        for (i, j), val in sorted(objective.quadratic.coefficients.items()):
+            fd.write(f"    {names[i]} {names[j]} {_fmt(2 * val if i == j else val)}\n")
+    for constraint in problem.quadratic_constraints:
+        if not constraint.quadratic.coefficients.nnz:
+            continue
+        # QCMATRIX holds the full symmetric Q of the constraint term x^T Q x
+        fd.write(f"QCMATRIX {constraint.name}\n")
+        for (i, j), val in sorted(constraint.quadratic.coefficients.items()):
+            if i == j:
+                fd.write(f"    {names[i]} {names[j]} {_fmt(val)}\n")
+            else:
+                fd.write(f"    {names[i]} {names[j]} {_fmt(val / 2)}\n")
+                fd.write(f"    {names[j]} {names[i]} {_fmt(val / 2)}\n")
+    fd.write("ENDATA\n")
+
+
+class _MPSReader:
+    """Line-by-line reader of free MPS files."""
+
+    def __init__(self, fd: IO[str]):
+        self._fd = fd
+        self._line = 0
+        self.name = ""
+        self._maximize = False
+        self._objective_row: Optional[str] = None
+        self._free_rows = set()
+        self._row_index: Dict[str, int] = {}
+        self._senses: List[str] = []
+        self._var_index: Dict[str, int] = {}
+        self._lowerbounds = array.array("d")
+        self._upperbounds = array.array("d")
+        self._vartypes = array.array("b")
+        self._objective = _Triplets()
+        self._constant = 0.0
+        self._coeffs = _Triplets()
+        self._rhs: Dict[int, float] = {}
+        self._ranges: Dict[int, float] = {}
+        self._objective_quadratic = _Triplets()
+        self._constraint_quadratic: Dict[int, _Triplets] = {}
+
+    def _error(self, message: str) -> QuadraticProgramError:
+        return QuadraticProgramError(f"{message} in line {self._line} of the MPS file")
+
+    def _index(self, name: str, vartype: VarType = VarType.CONTINUOUS) -> int:
+        index = self._var_index.get(name)
+        if index is None:
+            index = len(self._var_index)
+            self._var_index[name] = index
+            self._lowerbounds.append(0.0)
+            self._upperbounds.append(INFINITY)
+            self._vartypes.append(vartype.value)
+        return index
+
+    def _row(self, name: str) -> Optional[int]:
+        """Row index of a constraint, -1 for the objective and None for free rows."""
+        if name == self._objective_row:
+            return -1
+        index = self._row_index.get(name)
+        if index is None and name not in self._free_rows:
+            raise self._error(f"Unknown row '{name}'")
+        return index
+
+    def _pairs(self, fields: List[str]):
+        # The set name in front of the (row, value) pairs is optional
+        if len(fields) % 2:
+            fields = fields[1:]
+        for k in range(0, len(fields) - 1, 2):
+            yield fields[k], float(fields[k + 1])
+
+    def _rows_line(self, fields: List[str]) -> None:
+        row_type, name = fields[0].upper(), fields[1]
+        if row_type == "N":
+            if self._objective_row is None:
+                self._objective_row = name
+            else:
+                self._free_rows.add(name)
+        elif row_type in _SENSES:
+            self._row_index[name] = len(self._senses)
+            self._senses.append(_SENSES[row_type])
+        else:
+            raise self._error(f"Unknown row type '{row_type}'")
+
+    def _columns_line(self, fields: List[str], integer: bool) -> None:
+        col = self._index(fields[0], VarType.INTEGER if integer else VarType.CONTINUOUS)
+        for k in range(1, len(fields) - 1, 2):
+            row = self._row(fields[k])
+            if row == -1:
+                self._objective.append(0, col, float(fields[k + 1]))
+            elif row is not None:
+                self._coeffs.append(row, col, float(fields[k + 1]))
+
+    def _bounds_line(self, fields: List[str]) -> None:
+        bound_type = fields[0].upper()
+        if bound_type in ("FR", "MI", "PL", "BV"):
+            name = fields[-1]
+            value = None
+        else:
+            name, value = fields[-2], float(fields[-1])
+        index = self._index(name)
+        if bound_type in ("UP", "UI"):
+            self._upperbounds[index] = value
+        elif bound_type in ("LO", "LI"):
+            self._lowerbounds[index] = value
+        elif bound_type == "FX":
+            self._lowerbounds[index] = self._upperbounds[index] = value
+        elif bound_type == "FR":
+            self._lowerbounds[index] = -INFINITY
+            self._upperbounds[index] = INFINITY
+        elif bound_type == "MI":
+            self._lowerbounds[index] = -INFINITY
+        elif bound_type == "PL":
+            self._upperbounds[index] = INFINITY
+        elif bound_type == "BV":
+            self._vartypes[index] = VarType.BINARY.value
+        else:
+            raise self._error(f"Unsupported bound type '{bound_type}'")
+        if bound_type in ("UI", "LI"):
+            self._vartypes[index] = VarType.INTEGER.value
+
+    def read(self) -> QuadraticProgram:
+        """Parse the file and build the quadratic program."""
+        section = None
+        integer = False
+        quadratic = None
+        for self._line, line in enumerate(self._fd, start=1):
+            if not line.strip() or line.startswith("*"):
+                continue
+            fields = line.split()
+            if not line[0].isspace():
+                section = fields[0].upper()
+                if section == "NAME":
+                    self.name = line[4:].strip()
+                elif section == "OBJSENSE" and len(fields) > 1:
+                    self._maximize = fields[1].upper().startswith("MAX")
+                elif section == "QCMATRIX":
+                    row = self._row(fields[1])
+                    quadratic = self._constraint_quadratic.setdefault(row, _Triplets())
+                elif section in ("QUADOBJ", "QMATRIX"):
+                    quadratic = self._objective_quadratic
+                elif section == "ENDATA":
+                    break
+                elif section not in ("ROWS", "COLUMNS", "RHS", "RANGES", "BOUNDS", "OBJSENSE"):
+                    raise self._error(f"Unsupported section '{section}'")
+                continue
+
+            if section == "OBJSENSE":
+                self._maximize = fields[0].upper().startswith("MAX")
+            elif section == "ROWS":
+                self._rows_line(fields)
+            elif section == "COLUMNS":
+                if len(fields) >= 3 and fields[1] == "'MARKER'":
+                    integer = fields[2] == "'INTORG'"
+                else:
+                    self._columns_line(fields, integer)
+            elif section in ("RHS", "RANGES"):
+                for name, value in self._pairs(fields):
+                    row = self._row(name)
+                    if row == -1 and section == "RHS":
+                        self._constant = -value
+                    elif row is not None and row >= 0:
+                        (self._rhs if section == "RHS" else self._ranges)[row] = value
+            elif section == "BOUNDS":
+                self._bounds_line(fields)
+            elif section in ("QUADOBJ", "QMATRIX", "QCMATRIX"):
+                i, j = self._index(fields[0]), self._index(fields[1])
+                value = float(fields[2])
+                if section == "QMATRIX" or (section == "QUADOBJ" and i == j):
+                    # Q carries a factor 1/2 in the objective
+                    value /= 2
+                quadratic.append(i, j, value)
+            else:
+                raise self._error("Data outside of a section")
+        return self._build()
+
+    def _build(self) -> QuadraticProgram:
+        problem = QuadraticProgram(self.name)
+        num_vars = len(self._var_index)
+        num_rows = len(self._senses)
+        problem.add_variables(
+            np.frombuffer(self._lowerbounds) if num_vars else [],
+            np.frombuffer(self._upperbounds) if num_vars else [],
+            self._vartypes.tolist(),
+            list(self._var_index),
+        )
+        objective = self._objective.to_csr((1, num_vars))
+        objective_quadratic = self._objective_quadratic.to_csr((num_vars, num_vars))
+        if self._maximize:
+            problem.maximize(self._constant, objective, objective_quadratic)
+        else:
+            problem.minimize(self._constant, objective, objective_quadratic)
+
+        matrix = self._coeffs.to_csr((num_rows, num_vars))
+        row_names = list(self._row_index)
+        senses = list(self._senses)
+        rhs = np.zeros(num_rows)
+        for row, value in self._rhs.items():
+            rhs[row] = value
+
+        # A range R turns a row into lo <= a x <= hi, the second side becomes a new row
+        range_rows, range_senses, range_rhs = [], [], []
+        for row, value in self._ranges.items():
+            if row in self._constraint_quadratic:
+                raise QuadraticProgramError(f"Ranged quadratic row '{row_names[row]}'")
+            sense = senses[row]
+            if sense == "==":
+                sense = senses[row] = "<=" if value < 0 else ">="
+            range_rows.append(row)
+            if sense == "<=":
+                range_senses.append(">=")
+                range_rhs.append(rhs[row] - abs(value))
+            else:
+                range_senses.append("<=")
+                range_rhs.append(rhs[row] + abs(value))
+
+        linear_rows = [row for row in range(num_rows) if row not in self._constraint_quadratic]
+        problem.add_linear_constraints(
+            vstack([matrix[linear_rows], matrix[range_rows]], format="csr"),
+            [senses[row] for row in linear_rows] + range_senses,
+            np.concatenate([rhs[linear_rows], range_rhs]),
+            [row_names[row] for row in linear_rows]
+            + [f"{row_names[row]}_range" for row in range_rows],
+        )
+        for row, quadratic in self._constraint_quadratic.items():
+            problem.quadratic_constraint(
+                matrix[row],
+                quadratic.to_csr((num_vars, num_vars)),
+                senses[row],
+                rhs[row],
+                row_names[row],
+            )
+        return problem
+
+
+def read_mps(fd: IO[str]) -> QuadraticProgram:
+    """Read a quadratic program from a free MPS file.
+
+    Args:
+        fd: A text file object to read from.
+
+    Returns:
+        The quadratic program.
+
+    Raises:
+        QuadraticProgramError: if the file is not valid MPS or uses unsupported
+            features such as semi-continuous bounds.
+    """
+    return _MPSReader(fd).read()
@@ -43,6 +43,7 @@ Converters
    LinearInequalityToPenalty
    MaximizeToMinimize
    MinimizeToMaximize
+   Presolve
    QuadraticProgramToQubo
    QuadraticProgram2Ising
 
@@ -54,6 +55,7 @@ from .linear_equality_to_penalty import LinearEqualityToPenalty
 from .linear_inequality_to_penalty import LinearInequalityToPenalty
 from .flip_problem_sense import MaximizeToMinimize
 from .flip_problem_sense import MinimizeToMaximize
+from .presolve import Presolve
 from .quadratic_program_to_qubo import QuadraticProgramToQubo
 from .quadratic_program_converter import QuadraticProgramConverter
 from .qubo_unroller import UnrollQUBOVariables
@@ -67,6 +69,7 @@ __all__ = [
     "LinearInequalityToPenalty",
     "MaximizeToMinimize",
     "MinimizeToMaximize",
+    "Presolve",
     "QuadraticProgramConverter",
     "QuadraticProgramToQubo",
     "QuadraticProgram2Ising",
@@ -13,17 +13,20 @@
 
 import copy
 import math
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 import numpy as np
+from scipy.sparse import csr_matrix
 
 from ..exceptions import QuadraticProgramError
 from ..constraint import Constraint
 from ..linear_constraint import LinearConstraint
+from ..program_arrays import ProgramArrays
 from ..quadratic_constraint import QuadraticConstraint
 from ..quadratic_objective import QuadraticObjective
 from ..quadratic_program import QuadraticProgram
-from ..variable import Variable
+from ..variable import Variable, VarType
+from .presolve import _activity, _propagate_bounds
 from .quadratic_program_converter import QuadraticProgramConverter
 
 
@@ -41,18 +44,39 @@ class InequalityToEquality(QuadraticProgramConverter):
 
     _delimiter = "@"  # users are supposed not to use this character in variable names
 
-    def __init__(self, mode: str = "auto") -> None:
+    def __init__(
+        self, mode: str = "auto", unbalanced_penalty: Tuple[float, float] = (0.96, 0.0371)
+    ) -> None:
         """
         Args:
-            mode: To choose the type of slack variables. There are 3 options for mode.
+            mode: To choose the type of slack variables. There are 5 options for mode.
 
                 - 'integer': All slack variables will be integer variables.
                 - 'continuous': All slack variables will be continuous variables.
                 - 'auto': Use integer variables if possible, otherwise use continuous variables.
+                - 'compact': Like 'auto', but with as few slack qubits as possible. Integral
+                  linear constraints are divided by the gcd of their coefficients, slack
+                  ranges come from the activity of the constraint over bounds propagated
+                  through all linear constraints, redundant constraints are dropped, and
+                  constraints with the same left-hand side share one slack variable.
+                - 'unbalanced': No slack variables for linear inequalities. Each linear
+                  inequality ``h(x) >= 0`` is replaced by the objective term
+                  ``-l1 * h(x) + l2 * h(x)**2``, the unbalanced penalty of [1]. It does not
+                  enforce the constraint, so solutions must be checked for feasibility.
+                  Quadratic inequalities are converted as in 'auto'.
+
+            unbalanced_penalty: The factors ``(l1, l2)`` of the 'unbalanced' mode. The
+                defaults are the values tuned for knapsack problems in [1].
+
+        References:
+            [1]: J. A. Montanez-Barrera et al. (2022), Unbalanced penalization: A new approach
+                to encode inequality constraints of combinatorial problems for quantum
+                optimization algorithms. arXiv:2211.13914.
         """
         self._src: Optional[QuadraticProgram] = None
         self._dst: Optional[QuadraticProgram] = None
         self._mode = mode
+        self._unbalanced_penalty = unbalanced_penalty
         self.input_types = (QuadraticProgram, )
         self.output_types = (QuadraticProgram, )
         self.property_set = None
@@ -87,7 +111,7 @@ class InequalityToEquality(QuadraticProgramConverter):
 
         # set a converting mode
         mode = self._mode
-        if mode not in ["integer", "continuous", "auto"]:
+        if mode not in ["integer", "continuous", "auto", "compact", "unbalanced"]:
             raise QiskitOptimizationError(f"Unsupported mode is selected: {mode}")
 
         # Copy variables
@@ -113,18 +137,26 @@ class InequalityToEquality(QuadraticProgramConverter):
             self._dst.maximize(constant, linear, quadratic)
 
         # For linear constraints
-        for lin_const in self._src.linear_constraints:
-            if lin_const.sense == Constraint.Sense.EQ:
-                self._dst.linear_constraint(
-                    lin_const.linear.coefficients, lin_const.sense, lin_const.rhs, lin_const.name
-                )
-            elif lin_const.sense in [Constraint.Sense.LE, Constraint.Sense.GE]:
-                self._add_slack_var_linear_constraint(lin_const)
-            else:
-                raise QiskitOptimizationError(
-                    f"Internal error: type of sense in {lin_const.name} is not supported: "
-                    f"{lin_const.sense}"
-                )
+        if mode == "compact":
+            self._add_compact_linear_constraints()
+        elif mode == "unbalanced":
+            self._add_unbalanced_penalties()
+        else:
+            for lin_const in self._src.linear_constraints:
+                if lin_const.sense == Constraint.Sense.EQ:
+                    self._dst.linear_constraint(
+                        lin_const.linear.coefficients,
+                        lin_const.sense,
+                        lin_const.rhs,
+                        lin_const.name,
+                    )
+                elif lin_const.sense in [Constraint.Sense.LE, Constraint.Sense.GE]:
+                    self._add_slack_var_linear_constraint(lin_const)
+                else:
+                    raise QiskitOptimizationError(
+                        f"Internal error: type of sense in {lin_const.name} is not supported: "
+                        f"{lin_const.sense}"
+                    )
 
         # For quadratic constraints
         for quad_const in self._src.quadratic_constraints:
@@ -153,6 +185,8 @@ class InequalityToEquality(QuadraticProgramConverter):
 
         any_float = self._any_float(linear.to_array())
         mode = self._mode
+        if mode in ["compact", "unbalanced"]:
+            mode = "auto"
         if mode == "integer":
             if any_float:
                 raise QiskitOptimizationError(
@@ -197,6 +231,170 @@ class InequalityToEquality(QuadraticProgramConverter):
             new_linear[slack_name] = sign
         self._dst.linear_constraint(new_linear, "==", new_rhs, name)
 
+    def _add_compact_linear_constraints(self):
+        src = self._src
+        arrays = ProgramArrays.from_program(src)
+        matrix = arrays.linear_constraint_matrix().copy()
+        matrix.eliminate_zeros()
+        senses = arrays.arrays["linear_senses"]
+        rhs = arrays.arrays["linear_rhs"]
+        vartypes = arrays.arrays["vartypes"]
+
+        # Activity ranges over the variable bounds decide redundancy. The slack ranges
+        # may use the bounds implied by all linear constraints: they hold for every
+        # feasible solution, and the slack stays nonnegative.
+        lowerbounds = arrays.arrays["lowerbounds"].copy()
+        upperbounds = arrays.arrays["upperbounds"].copy()
+        _, feasible = _propagate_bounds(
+            matrix,
+            np.where(senses == Constraint.Sense.LE.value, -np.inf, rhs),
+            np.where(senses == Constraint.Sense.GE.value, np.inf, rhs),
+            lowerbounds,
+            upperbounds,
+            vartypes,
+        )
+        if not feasible:
+            lowerbounds = arrays.arrays["lowerbounds"]
+            upperbounds = arrays.arrays["upperbounds"]
+        ranges = []
+        for bounds in (
+            (arrays.arrays["lowerbounds"], arrays.arrays["upperbounds"]),
+            (lowerbounds, upperbounds),
+        ):
+            minact, mininf, maxact, maxinf, _, _ = _activity(matrix, *bounds)
+            minact[mininf > 0] = -np.inf
+            maxact[maxinf > 0] = np.inf
+            ranges.append(np.column_stack([minact, maxact]))
+        integral_vars = vartypes != VarType.CONTINUOUS.value
+
+        # Inequalities with the same left-hand side up to a factor share one slack variable.
+        # Each group holds the row as ``lower <= coeffs @ x <= upper``.
+        groups: Dict[Tuple[bool, bytes, bytes], Dict] = {}
+        for i, constraint in enumerate(src.linear_constraints):
+            if constraint.sense == Constraint.Sense.EQ:
+                self._dst.linear_constraint(
+                    constraint.linear.coefficients,
+                    constraint.sense,
+                    constraint.rhs,
+                    constraint.name,
+                )
+                continue
+            cols = matrix.indices[matrix.indptr[i] : matrix.indptr[i + 1]]
+            coeffs = matrix.data[matrix.indptr[i] : matrix.indptr[i + 1]]
+            if len(cols) == 0:
+                self._add_slack_var_linear_constraint(constraint)
+                continue
+            integral = bool(
+                np.all(integral_vars[cols]) and np.all(coeffs == np.round(coeffs))
+            )
+            factor = float(np.gcd.reduce(np.abs(coeffs).astype(np.int64))) if integral else 1.0
+            if coeffs[0] < 0:
+                factor = -factor
+            coeffs = coeffs / factor
+            # activity ranges of the scaled row over the original and the implied bounds
+            activity = np.sort([ranges[0][i] / factor, ranges[1][i] / factor], axis=1)
+            value = rhs[i] / factor
+            upper = value if (constraint.sense == Constraint.Sense.LE) == (factor > 0) else np.inf
+            lower = value if np.isinf(upper) else -np.inf
+            if integral:
+                upper, lower = np.floor(upper + 1e-9), np.ceil(lower - 1e-9)
+                activity[:, 0] = np.ceil(activity[:, 0] - 1e-9)
+                activity[:, 1] = np.floor(activity[:, 1] + 1e-9)
+            key = (integral, cols.tobytes(), coeffs.tobytes())
+            if key in groups:
+                group = groups[key]
+                group["upper"] = min(group["upper"], upper)
+                group["lower"] = max(group["lower"], lower)
+                group["members"].append(constraint)
+            else:
+                groups[key] = {
+                    "name": constraint.name,
+                    "cols": cols,
+                    "coeffs": coeffs,
+                    "integral": integral,
+                    "upper": upper,
+                    "lower": lower,
+                    "activity": activity,
+                    "members": [constraint],
+                }
+
+        for group in groups.values():
+            (range_min, range_max), (act_min, act_max) = group["activity"]
+            if range_min >= group["lower"] and range_max <= group["upper"]:
+                # redundant for all values within the bounds
+                continue
+            upper = min(group["upper"], act_max)
+            lower = max(group["lower"], act_min)
+            linear = {
+                src.variables[j].name: coeff
+                for j, coeff in zip(group["cols"].tolist(), group["coeffs"].tolist())
+            }
+            name = group["name"]
+            # coeffs @ x + slack == upper, or coeffs @ x - slack == lower
+            if np.isfinite(group["upper"]):
+                new_rhs, sign = group["upper"], 1
+                slack_lb, slack_ub = group["upper"] - upper, group["upper"] - lower
+            else:
+                new_rhs, sign = group["lower"], -1
+                slack_lb, slack_ub = lower - group["lower"], upper - group["lower"]
+            if slack_ub < slack_lb:
+                # infeasible, keep the constraints as they are
+                for constraint in group["members"]:
+                    self._add_slack_var_linear_constraint(constraint)
+                continue
+            if slack_ub > slack_lb:
+                if group["integral"]:
+                    slack_name = f"{name}{self._delimiter}int_slack"
+                    self._dst.integer_var(
+                        name=slack_name, lowerbound=slack_lb, upperbound=slack_ub
+                    )
+                else:
+                    slack_name = f"{name}{self._delimiter}continuous_slack"
+                    self._dst.continuous_var(
+                        name=slack_name, lowerbound=slack_lb, upperbound=slack_ub
+                    )
+                linear[slack_name] = sign
+            else:
+                new_rhs -= sign * slack_lb
+            self._dst.linear_constraint(linear, "==", new_rhs, name)
+
+    def _add_unbalanced_penalties(self):
+        src = self._src
+        num_vars = src.get_num_vars()
+        l_1, l_2 = self._unbalanced_penalty
+        sign = 1 if src.objective.sense == QuadraticObjective.Sense.MINIMIZE else -1
+        arrays = ProgramArrays.from_program(src)
+        constant = arrays.metadata["constant"]
+        linear = arrays.objective_linear().toarray().ravel()
+        quadratic = arrays.objective_quadratic()
+
+        for constraint in src.linear_constraints:
+            if constraint.sense == Constraint.Sense.EQ:
+                self._dst.linear_constraint(
+                    constraint.linear.coefficients,
+                    constraint.sense,
+                    constraint.rhs,
+                    constraint.name,
+                )
+                continue
+            # h(x) = h_0 + d @ x >= 0
+            coeffs = np.zeros(num_vars)
+            for j, coeff in constraint.linear.to_dict().items():
+                coeffs[j] = coeff
+            if constraint.sense == Constraint.Sense.LE:
+                h_0, coeffs = constraint.rhs, -coeffs
+            else:
+                h_0 = -constraint.rhs
+            constant += sign * (-l_1 * h_0 + l_2 * h_0**2)
+            linear += sign * (2 * l_2 * h_0 - l_1) * coeffs
+            row = csr_matrix(coeffs)
+            quadratic = quadratic + sign * l_2 * (row.T @ row)
+
+        if src.objective.sense == QuadraticObjective.Sense.MINIMIZE:
+            self._dst.minimize(constant, linear, quadratic)
+        else:
+            self._dst.maximize(constant, linear, quadratic)
+
     def _add_slack_var_quadratic_constraint(self, constraint: QuadraticConstraint):
         quadratic = constraint.quadratic
         linear = constraint.linear
@@ -205,6 +403,8 @@ class InequalityToEquality(QuadraticProgramConverter):
 
         any_float = self._any_float(linear.to_array()) or self._any_float(quadratic.to_array())
         mode = self._mode
+        if mode in ["compact", "unbalanced"]:
+            mode = "auto"
         if mode == "integer":
             if any_float:
                 raise QiskitOptimizationError(
@@ -13,19 +13,28 @@
 """Converter to convert a problem with inequality constraints to unconstrained with penalty terms."""
 
 import logging
-from typing import Optional, Union, Tuple, List, Dict
+from typing import Optional, Union, Tuple, List
 
 import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix
 
 from .quadratic_program_converter import QuadraticProgramConverter
 from ..exceptions import QuadraticProgramError
-from ..constraint import Constraint, ConstraintSense
+from ..constraint import ConstraintSense
+from ..program_arrays import ProgramArrays
 from ..quadratic_objective import QuadraticObjective
 from ..quadratic_program import QuadraticProgram
 from ..variable import Variable
 
 logger = logging.getLogger(__name__)
 
+# Patterns of the linear constraints that are converted without slack variables
+_NO_PATTERN = 0
+_PAIR = 1  # x - y <= 0
+_PAIR_FLIPPED = 2  # x - y >= 0
+_AT_MOST_ONE = 3  # x1 + x2 + ... <= 1
+_AT_LEAST_ALL_BUT_ONE = 4  # x1 + x2 + ... >= n - 1
+
 
 class LinearInequalityToPenalty(QuadraticProgramConverter):
     r"""Convert linear inequality constraints to penalty terms of the objective function.
@@ -128,68 +137,48 @@ class LinearInequalityToPenalty(QuadraticProgramConverter):
         # create empty QuadraticProgram model
         self._src_num_vars = problem.get_num_vars()
         self._dst = QuadraticProgram(name=problem.name)
+        arrays = ProgramArrays.from_program(problem)
 
         # If no penalty was given, set the penalty coefficient by _auto_define_penalty()
         if self._should_define_penalty:
-            penalty = self._auto_define_penalty(problem)
+            penalty = self._auto_define_penalty(problem, arrays)
         else:
             penalty = self._penalty
 
         # Set variables
-        for x in problem.variables:
-            if x.vartype == Variable.Type.CONTINUOUS:
-                self._dst.continuous_var(x.lowerbound, x.upperbound, x.name)
-            elif x.vartype == Variable.Type.BINARY:
-                self._dst.binary_var(x.name)
-            elif x.vartype == Variable.Type.INTEGER:
-                self._dst.integer_var(x.lowerbound, x.upperbound, x.name)
-            else:
-                raise QiskitOptimizationError(f"Unsupported vartype: {x.vartype}")
-
-        # get original objective terms
-        offset = problem.objective.constant
-        linear = problem.objective.linear.to_dict()
-        quadratic = problem.objective.quadratic.to_dict()
+        vartypes = arrays.arrays["vartypes"]
+        self._dst.add_variables(
+            arrays.arrays["lowerbounds"],
+            arrays.arrays["upperbounds"],
+            vartypes,
+            arrays.variable_names(),
+        )
+
+        # classify all linear constraints at once
+        matrix = arrays.linear_constraint_matrix().copy()
+        matrix.eliminate_zeros()
+        senses = arrays.arrays["linear_senses"]
+        rhs = arrays.arrays["linear_rhs"]
+        pattern = self._classify_constraints(
+            matrix, senses, rhs, vartypes == Variable.Type.BINARY.value
+        )
+
+        # keep the constraints that do not match any pattern
+        names = [constraint.name for constraint in problem.linear_constraints]
+        keep = np.flatnonzero(pattern == _NO_PATTERN)
+        self._dst.add_linear_constraints(
+            matrix[keep],
+            [ConstraintSense(sense) for sense in senses[keep].tolist()],
+            rhs[keep],
+            [names[i] for i in keep],
+        )
+
+        # convert the others into penalty terms
+        conv_offset, conv_linear, conv_quadratic = self._penalty_terms(matrix, pattern)
         sense = problem.objective.sense.value
-
-        # convert linear constraints into penalty terms
-        for constraint in problem.linear_constraints:
-
-            # special constraint check function here
-            if not self._is_matched_constraint(problem, constraint):
-                self._dst.linear_constraint(
-                    constraint.linear.coefficients,
-                    constraint.sense,
-                    constraint.rhs,
-                    constraint.name,
-                )
-                continue
-
-            conv_offset, conv_linear, conv_quadratic, varmap = self._conversion_table(constraint)
-
-            # constant part
-            offset += sense * penalty * conv_offset
-
-            # linear parts of penalty
-            for j, j_2 in varmap.items():
-                # if j already exists in the linear terms dic, add a penalty term
-                # into existing value else create new key and value in the linear_term dict
-
-                if conv_linear[j] != 0:
-                    linear[j_2] = linear.get(j_2, 0.0) + sense * penalty * conv_linear[j]
-
-            # quadratic parts of penalty
-            for j, j_2 in varmap.items():
-                for k in range(j, len(varmap)):
-                    # if j and k already exist in the quadratic terms dict,
-                    # add a penalty term into existing value
-                    # else create new key and value in the quadratic term dict
-
-                    if conv_quadratic[j][k] != 0:
-                        tup = (j_2, varmap[k])
-                        quadratic[tup] = (
-                            quadratic.get(tup, 0.0) + sense * penalty * conv_quadratic[j][k]
-                        )
+        offset = problem.objective.constant + sense * penalty * conv_offset
+        linear = arrays.objective_linear() + sense * penalty * conv_linear
+        quadratic = arrays.objective_quadratic() + sense * penalty * conv_quadratic
 
         # Copy quadratic_constraints
         for quadratic_constraint in problem.quadratic_constraints:
@@ -212,104 +201,130 @@ class LinearInequalityToPenalty(QuadraticProgramConverter):
         return self._dst
 
     @staticmethod
-    def _conversion_table(
-        constraint,
-    ) -> Tuple[int, np.ndarray, np.ndarray, Dict[int, int]]:
-        """Construct conversion matrix for special constraint.
+    def _classify_constraints(
+        matrix: csr_matrix, senses: np.ndarray, rhs: np.ndarray, binary: np.ndarray
+    ) -> np.ndarray:
+        """Determine which pattern every constraint matches.
 
-        Returns:
-            Return conversion table which is used to construct
-            penalty term in main function.
+        Args:
+            matrix: The left-hand sides of the constraints, without explicit zeros.
+            senses: The sense of every constraint.
+            rhs: The right-hand side of every constraint.
+            binary: Whether every variable is binary.
 
-        Raises:
-            QiskitOptimizationError: if the constraint is invalid.
+        Returns:
+            The pattern of every constraint, ``_NO_PATTERN`` when it is not special.
         """
-
-        vars_dict = constraint.linear.to_dict()
-        coeffs = list(vars_dict.values())
-        varmap = dict(enumerate(vars_dict.keys()))
-        rhs = constraint.rhs
-        sense = constraint.sense
-
-        num_vars = len(vars_dict)
-
-        # initialize return values, these are used for converted offset, linear
-        # and quadratic terms
-        offset = 0
-        linear = np.zeros(num_vars, dtype=int)
-        quadratic = np.zeros((num_vars, num_vars), dtype=int)
-
-        # rhs = num_vars - 1 correspond to multiple variable with >= n - 1 case.
-        if sense == ConstraintSense.GE and rhs == num_vars - 1:
-            # x_1 + ... + x_n >= n - 1
-            # The number of offset is combination ( nC2 )
-            offset = num_vars * (num_vars - 1) // 2
-            linear = np.full(num_vars, 1 - num_vars, dtype=int)
-            quadratic = np.triu(np.ones((num_vars, num_vars), dtype=int), k=1)
-        elif sense == ConstraintSense.LE and rhs == 1:
-            # x_1 + ... + x_n <= 1
-            quadratic = np.triu(np.ones((num_vars, num_vars), dtype=int), k=1)
-        elif rhs == 0:
-            if num_vars != 2:
-                raise QiskitOptimizationError(
-                    f"Internal error: invalid number of variables {num_vars} {constraint.name}"
-                )
-            quadratic = np.array([[0, -1], [0, 0]])
-            if sense == ConstraintSense.GE:
-                # x >= y case
-                if coeffs[0] < 0.0:
-                    linear[0] = 1
-                else:
-                    linear[1] = 1
-            elif sense == ConstraintSense.LE:
-                # x <= y case
-                if coeffs[0] > 0.0:
-                    linear[0] = 1
-                else:
-                    linear[1] = 1
-        else:
-            raise QiskitOptimizationError(f"Internal error: invalid constraint {constraint.name}")
-
-        return offset, linear, quadratic, varmap
+        num_rows = matrix.shape[0]
+        num_vars = np.diff(matrix.indptr)
+        rows = np.repeat(np.arange(num_rows), num_vars)
+        # rows with a non-binary variable or a coefficient other than +-1 are not special
+        only_binary = np.bincount(rows, ~binary[matrix.indices], num_rows) == 0
+        num_ones = np.bincount(rows, matrix.data == 1, num_rows)
+        num_minus_ones = np.bincount(rows, matrix.data == -1, num_rows)
+        all_ones = num_ones == num_vars
+
+        pattern = np.full(num_rows, _NO_PATTERN, dtype=np.int8)
+        pair = only_binary & (num_vars == 2) & (rhs == 0) & (num_ones == 1) & (num_minus_ones == 1)
+        # x - y <= 0
+        pattern[pair & (senses == ConstraintSense.LE.value)] = _PAIR
+        # x - y >= 0
+        pattern[pair & (senses == ConstraintSense.GE.value)] = _PAIR_FLIPPED
+        # x1 + x2 + ... <= 1
+        pattern[
+            only_binary
+            & (num_vars >= 2)
+            & all_ones
+            & (senses == ConstraintSense.LE.value)
+            & (rhs == 1)
+        ] = _AT_MOST_ONE
+        # x1 + x2 + ... >= n - 1
+        pattern[
+            only_binary
+            & (num_vars >= 2)
+            & all_ones
+            & (senses == ConstraintSense.GE.value)
+            & (rhs == num_vars - 1)
+        ] = _AT_LEAST_ALL_BUT_ONE
+        return pattern
 
     @staticmethod
-    def _is_matched_constraint(problem, constraint) -> bool:
-        """Determine if constraint is special or not.
+    def _penalty_terms(
+        matrix: csr_matrix, pattern: np.ndarray
+    ) -> Tuple[float, csr_matrix, csr_matrix]:
+        """Construct the penalty terms of all special constraints.
+
+        The pairs of variables of all constraints with the same number of variables
+        are generated together, so the quadratic terms are built as one sparse matrix.
 
         Returns:
-            True: when constraint is special
-            False: when constraint is not special
+            The constant, the ``1 x n`` linear and the upper-triangular quadratic
+            coefficients of the sum of penalty terms.
         """
-
-        params = constraint.linear.to_dict()
-        num_vars = len(params)
-        rhs = constraint.rhs
-        sense = constraint.sense
-        coeff_array = np.array(list(params.values()))
-
-        # Binary parameter?
-        if any(problem.variables[i].vartype != Variable.Type.BINARY for i in params.keys()):
-            return False
-
-        if num_vars == 2 and rhs == 0:
-            if sense in (Constraint.Sense.LE, Constraint.Sense.GE):
-                # x-y<=0
-                # x-y>=0
-                return coeff_array.min() == -1.0 and coeff_array.max() == 1.0
-        elif num_vars >= 2:
-            if sense == Constraint.Sense.LE and rhs == 1:
-                if all(i == 1 for i in params.values()):
-                    # x1+x2+...<=1
-                    return True
-            elif sense == Constraint.Sense.GE and rhs == num_vars - 1:
-                if all(i == 1 for i in params.values()):
-                    # x1+x2+...>=n-1
-                    return True
-
-        return False
+        num_vars = matrix.shape[1]
+        offset = 0.0
+        lin_cols: List[np.ndarray] = []
+        lin_vals: List[np.ndarray] = []
+        quad_rows: List[np.ndarray] = []
+        quad_cols: List[np.ndarray] = []
+        quad_vals: List[np.ndarray] = []
+
+        # x <= y -> x - x y, where x has the coefficient +1 in x - y <= 0
+        # and -1 in y - x >= 0
+        pairs = np.flatnonzero((pattern == _PAIR) | (pattern == _PAIR_FLIPPED))
+        if len(pairs) > 0:
+            positions = matrix.indptr[pairs][:, None] + np.arange(2)
+            cols = matrix.indices[positions]
+            coeffs = matrix.data[positions]
+            flipped = (pattern[pairs] == _PAIR_FLIPPED)[:, None]
+            lower = np.where((coeffs > 0) != flipped, cols, -1).max(axis=1)
+            lin_cols.append(lower)
+            lin_vals.append(np.ones(len(pairs)))
+            quad_rows.append(cols.min(axis=1))
+            quad_cols.append(cols.max(axis=1))
+            quad_vals.append(np.full(len(pairs), -1.0))
+
+        # sum x_i <= 1 -> sum_{i<j} x_i x_j
+        # sum x_i >= n - 1 -> sum_{i<j} (1 - x_i)(1 - x_j)
+        #                   = n(n-1)/2 - (n-1) sum x_i + sum_{i<j} x_i x_j
+        groups = np.flatnonzero((pattern == _AT_MOST_ONE) | (pattern == _AT_LEAST_ALL_BUT_ONE))
+        sizes = np.diff(matrix.indptr)[groups]
+        for size in np.unique(sizes).tolist():
+            rows = groups[sizes == size]
+            cols = matrix.indices[matrix.indptr[rows][:, None] + np.arange(size)]
+            first, second = np.triu_indices(size, k=1)
+            quad_rows.append(np.minimum(cols[:, first], cols[:, second]).ravel())
+            quad_cols.append(np.maximum(cols[:, first], cols[:, second]).ravel())
+            quad_vals.append(np.ones(len(rows) * len(first)))
+            complement = cols[pattern[rows] == _AT_LEAST_ALL_BUT_ONE]
+            offset += len(complement) * size * (size - 1) // 2
+            lin_cols.append(complement.ravel())
+            lin_vals.append(np.full(complement.size, 1.0 - size))
+
+        linear = coo_matrix(
+            (
+                np.concatenate(lin_vals) if lin_vals else np.zeros(0),
+                (
+                    np.zeros(sum(len(cols) for cols in lin_cols), dtype=int),
+                    np.concatenate(lin_cols) if lin_cols else np.zeros(0, dtype=int),
+                ),
+            ),
+            shape=(1, num_vars),
+        ).tocsr()
+        quadratic = coo_matrix(
+            (
+                np.concatenate(quad_vals) if quad_vals else np.zeros(0),
+                (
+                    np.concatenate(quad_rows) if quad_rows else np.zeros(0, dtype=int),
+                    np.concatenate(quad_cols) if quad_cols else np.zeros(0, dtype=int),
+                ),
+            ),
+            shape=(num_vars, num_vars),
+        ).tocsr()
+        return float(offset), linear, quadratic
 
     @staticmethod
-    def _auto_define_penalty(problem) -> float:
+    def _auto_define_penalty(problem, arrays: Optional[ProgramArrays] = None) -> float:
         """Automatically define the penalty coefficient.
 
         Returns:
@@ -320,14 +335,13 @@ class LinearInequalityToPenalty(QuadraticProgramConverter):
         """
 
         default_penalty = 1e5
+        if arrays is None:
+            arrays = ProgramArrays.from_program(problem)
 
         # Check coefficients of constraints.
         # If a constraint has a float coefficient, return the default value for the penalty factor.
-        terms = []
-        for constraint in problem.linear_constraints:
-            terms.append(constraint.rhs)
-            terms.extend(constraint.linear.to_array().tolist())
-        if any(isinstance(term, float) and not term.is_integer() for term in terms):
+        terms = np.concatenate([arrays.arrays["linear_rhs"], arrays.arrays["linear_data"]])
+        if np.any(terms != np.round(terms)):
             logger.warning(
                 "Warning: Using %f for the penalty coefficient because "
                 "a float coefficient exists in constraints. \n"
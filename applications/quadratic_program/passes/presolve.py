@@ -0,0 +1,360 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""The presolve converter to shrink a quadratic program before the QUBO conversion."""
+
+import logging
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from ..constraint import ConstraintSense
+from ..program_arrays import ProgramArrays, _string_table
+from ..quadratic_objective import ObjSense
+from ..quadratic_program import QuadraticProgram, QuadraticProgramStatus
+from ..variable import VarType
+from .quadratic_program_converter import QuadraticProgramConverter
+
+logger = logging.getLogger(__name__)
+
+
+def _activity(
+    matrix: csr_matrix, lowerbounds: np.ndarray, upperbounds: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Minimal and maximal row activities over the variable bounds.
+
+    Returns the finite parts of the activities and the numbers of infinite
+    contributions per row, and the contributions of every nonzero.
+    """
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    coeffs = matrix.data
+    low = lowerbounds[matrix.indices]
+    high = upperbounds[matrix.indices]
+    with np.errstate(invalid="ignore"):
+        cmin = np.where(coeffs > 0, coeffs * low, coeffs * high)
+        cmax = np.where(coeffs > 0, coeffs * high, coeffs * low)
+    activities = []
+    for contributions in (cmin, cmax):
+        finite = np.isfinite(contributions)
+        activities.append(
+            np.bincount(rows, np.where(finite, contributions, 0.0), minlength=matrix.shape[0])
+        )
+        activities.append(np.bincount(rows, ~finite, minlength=matrix.shape[0]))
+    return activities[0], activities[1], activities[2], activities[3], cmin, cmax
+
+
+def _residual(
+    rows: np.ndarray, finite: np.ndarray, num_inf: np.ndarray, contributions: np.ndarray
+) -> np.ndarray:
+    """Activity of every row without the contribution of each of its nonzeros."""
+    own_inf = ~np.isfinite(contributions)
+    residual = finite[rows] - np.where(own_inf, 0.0, contributions)
+    return np.where(num_inf[rows] - own_inf == 0, residual, np.nan)
+
+
+def _propagate_bounds(
+    matrix: csr_matrix,
+    lo: np.ndarray,
+    hi: np.ndarray,
+    lowerbounds: np.ndarray,
+    upperbounds: np.ndarray,
+    vartypes: np.ndarray,
+    max_rounds: int = 100,
+    feastol: float = 1e-9,
+) -> Tuple[np.ndarray, bool]:
+    """Propagate the bounds of ``lo <= A x <= hi`` in place.
+
+    Returns:
+        The mask of the constraints that are not redundant and whether no
+        infeasibility was found.
+    """
+    tol = feastol
+    num_rows = matrix.shape[0]
+    rows = np.repeat(np.arange(num_rows), np.diff(matrix.indptr))
+    cols = matrix.indices
+    coeffs = matrix.data
+    integral = vartypes != VarType.CONTINUOUS.value
+    active = np.ones(num_rows, dtype=bool)
+
+    for _ in range(max_rounds):
+        minact, mininf, maxact, maxinf, cmin, cmax = _activity(matrix, lowerbounds, upperbounds)
+        bounded_below = mininf == 0
+        bounded_above = maxinf == 0
+        violated = active & (
+            (bounded_below & (minact > hi + tol)) | (bounded_above & (maxact < lo - tol))
+        )
+        if violated.any():
+            logger.warning(
+                "Bound propagation found infeasible constraints: %s",
+                np.flatnonzero(violated).tolist(),
+            )
+            return active, False
+        redundant = (
+            active
+            & (np.isneginf(lo) | (bounded_below & (minact >= lo - tol)))
+            & (np.isposinf(hi) | (bounded_above & (maxact <= hi + tol)))
+        )
+        active &= ~redundant
+
+        # a_j x_j <= hi - (minimal activity of the other terms), and likewise for lo
+        with np.errstate(invalid="ignore", divide="ignore"):
+            from_hi = (hi[rows] - _residual(rows, minact, mininf, cmin)) / coeffs
+            from_lo = (lo[rows] - _residual(rows, maxact, maxinf, cmax)) / coeffs
+        entry = active[rows]
+        implied_ub = np.where(coeffs > 0, from_hi, from_lo)
+        implied_lb = np.where(coeffs > 0, from_lo, from_hi)
+        implied_ub = np.where(entry & ~np.isnan(implied_ub), implied_ub, np.inf)
+        implied_lb = np.where(entry & ~np.isnan(implied_lb), implied_lb, -np.inf)
+        new_ub = np.full(len(upperbounds), np.inf)
+        new_lb = np.full(len(lowerbounds), -np.inf)
+        np.minimum.at(new_ub, cols, implied_ub)
+        np.maximum.at(new_lb, cols, implied_lb)
+        new_ub[integral] = np.floor(new_ub[integral] + tol)
+        new_lb[integral] = np.ceil(new_lb[integral] - tol)
+
+        # Ignore tiny improvements of continuous bounds, which converge slowly
+        with np.errstate(invalid="ignore"):
+            step = np.where(integral, tol, 1e-6 * np.maximum(1.0, np.abs(upperbounds)))
+            tighter_ub = np.where(
+                np.isposinf(upperbounds), new_ub < np.inf, new_ub < upperbounds - step
+            )
+            step = np.where(integral, tol, 1e-6 * np.maximum(1.0, np.abs(lowerbounds)))
+            tighter_lb = np.where(
+                np.isneginf(lowerbounds), new_lb > -np.inf, new_lb > lowerbounds + step
+            )
+        upperbounds[tighter_ub] = new_ub[tighter_ub]
+        lowerbounds[tighter_lb] = new_lb[tighter_lb]
+        empty = lowerbounds > upperbounds + tol
+        if empty.any():
+            logger.warning(
+                "Bound propagation found variables with empty domains: %s",
+                np.flatnonzero(empty).tolist(),
+            )
+            return active, False
+        if not (redundant.any() or tighter_ub.any() or tighter_lb.any()):
+            break
+    return active, True
+
+
+def _encoding_qubits(
+    lowerbounds: np.ndarray,
+    upperbounds: np.ndarray,
+    vartypes: np.ndarray,
+    matrix: csr_matrix,
+    senses: np.ndarray,
+    rhs: np.ndarray,
+    counted_vars: np.ndarray,
+    counted_rows: np.ndarray,
+) -> int:
+    """Estimate the qubits of the QUBO encoding.
+
+    Binary variables take one qubit, integer variables the bits of the bounded-coefficient
+    encoding of :class:`~.IntegerToBinary`, and integral inequalities the bits of their
+    integer slack variable as in :class:`~.InequalityToEquality`.  Only the
+    counted variables and constraints are included; the others count as fixed.
+    """
+    integer = counted_vars & (vartypes == VarType.INTEGER.value)
+    span = (upperbounds - lowerbounds)[integer]
+    span = span[np.isfinite(span)]
+    bits = np.where(span > 0, np.floor(np.log2(np.maximum(span, 1))) + 1, 1)
+    qubits = int(np.sum(counted_vars & (vartypes == VarType.BINARY.value))) + int(bits.sum())
+
+    minact, mininf, maxact, maxinf, _, _ = _activity(matrix, lowerbounds, upperbounds)
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    fractional = np.bincount(
+        rows, matrix.data != np.round(matrix.data), minlength=matrix.shape[0]
+    ).astype(bool)
+    with np.errstate(invalid="ignore"):
+        slack = np.where(
+            senses == ConstraintSense.LE.value,
+            np.where(mininf == 0, np.floor(rhs) - minact, np.inf),
+            np.where(maxinf == 0, maxact - np.ceil(rhs), np.inf),
+        )
+    slack = slack[counted_rows & (senses != ConstraintSense.EQ.value) & ~fractional & (slack > 0)]
+    slack = slack[np.isfinite(slack)]
+    return qubits + int(np.sum(np.floor(np.log2(np.maximum(slack, 1))) + 1))
+
+
+class Presolve(QuadraticProgramConverter):
+    """Shrink a quadratic program by bound propagation over its linear constraints.
+
+    Every round computes the minimal and maximal activities of all linear constraints
+    over the current bounds and then
+
+    - marks constraints that hold for all values within the bounds as redundant,
+    - tightens the variable bounds implied by each constraint, rounding integer bounds,
+    - fixes variables whose bounds meet, and
+    - fixes variables that appear only in the linear objective at their best bound.
+
+    Singleton constraints turn into bounds and become redundant this way. The rounds stop
+    when nothing changes. Fixed variables are substituted and redundant constraints are
+    dropped. :meth:`interpret` restores the fixed variables.
+
+    Examples:
+        >>> presolve = Presolve()
+        >>> reduced = presolve.convert(problem)
+        >>> presolve.report["qubits_saved"]
+        >>> x = presolve.interpret(reduced_x)
+    """
+
+    def __init__(self, max_rounds: int = 100, feastol: float = 1e-9) -> None:
+        """
+        Args:
+            max_rounds: The maximal number of bound propagation rounds.
+            feastol: Tolerance of the feasibility and integrality checks.
+        """
+        self._src: Optional[QuadraticProgram] = None
+        self._dst: Optional[QuadraticProgram] = None
+        self._kept: Optional[np.ndarray] = None
+        self._fixed: Dict[int, float] = {}
+        self._max_rounds = max_rounds
+        self._feastol = feastol
+        self.report: Dict[str, int] = {}
+        self.input_types = (QuadraticProgram, )
+        self.output_types = (QuadraticProgram, )
+        self.property_set = None
+
+    def run(self, problem):
+        """Presolve a problem.
+
+        Args:
+            problem: The problem to be presolved.
+
+        Returns:
+            The reduced problem.
+        """
+        return self.convert(problem)
+
+    def convert(self, problem: QuadraticProgram) -> QuadraticProgram:
+        """Presolve a problem.
+
+        Args:
+            problem: The problem to be presolved.
+
+        Returns:
+            The reduced problem. Its status is ``INFEASIBLE`` if presolve proved
+            that the problem has no feasible solution.
+        """
+        self._src = problem
+        arrays = ProgramArrays.from_program(problem)
+        lowerbounds = arrays.arrays["lowerbounds"].copy()
+        upperbounds = arrays.arrays["upperbounds"].copy()
+        vartypes = arrays.arrays["vartypes"]
+        matrix = arrays.linear_constraint_matrix().copy()
+        matrix.eliminate_zeros()
+        senses = arrays.arrays["linear_senses"]
+        rhs = arrays.arrays["linear_rhs"]
+
+        # lo <= A x <= hi
+        lo = np.where(senses == ConstraintSense.LE.value, -np.inf, rhs)
+        hi = np.where(senses == ConstraintSense.GE.value, np.inf, rhs)
+        active, feasible = _propagate_bounds(
+            matrix, lo, hi, lowerbounds, upperbounds, vartypes, self._max_rounds, self._feastol
+        )
+        self._fix_free_columns(arrays, matrix[active], lowerbounds, upperbounds)
+
+        fixed = np.flatnonzero(upperbounds - lowerbounds <= self._feastol)
+        values = lowerbounds[fixed]
+        integral = vartypes[fixed] != VarType.CONTINUOUS.value
+        values[integral] = np.round(values[integral])
+        lowerbounds[fixed] = upperbounds[fixed] = values
+        self._fixed = dict(zip(fixed.tolist(), values.tolist()))
+        self._kept = np.setdiff1d(np.arange(problem.get_num_vars()), fixed)
+
+        tightened = dict(arrays.arrays)
+        tightened["lowerbounds"] = lowerbounds
+        tightened["upperbounds"] = upperbounds
+        keep = np.flatnonzero(active)
+        rows = arrays.linear_constraint_matrix()[keep]
+        tightened["linear_indptr"] = rows.indptr
+        tightened["linear_indices"] = rows.indices
+        tightened["linear_data"] = rows.data
+        tightened["linear_senses"] = senses[keep]
+        tightened["linear_rhs"] = rhs[keep]
+        names = [con.name for con in problem.linear_constraints]
+        tightened["linear_name_offsets"], tightened["linear_name_data"] = _string_table(
+            [names[i] for i in keep]
+        )
+        self._dst = ProgramArrays(tightened, arrays.metadata).to_program().substitute_variables(
+            constants=self._fixed
+        )
+        if not feasible:
+            # pylint: disable=protected-access
+            self._dst._status = QuadraticProgramStatus.INFEASIBLE
+
+        num_vars = problem.get_num_vars()
+        matrix = arrays.linear_constraint_matrix()
+        qubits_before = _encoding_qubits(
+            arrays.arrays["lowerbounds"], arrays.arrays["upperbounds"], vartypes, matrix,
+            senses, rhs, np.ones(num_vars, dtype=bool), np.ones(len(rhs), dtype=bool),
+        )
+        unfixed = np.ones(num_vars, dtype=bool)
+        unfixed[fixed] = False
+        qubits_after = _encoding_qubits(
+            lowerbounds, upperbounds, vartypes, matrix, senses, rhs, unfixed, active
+        )
+        self.report = {
+            "variables_removed": num_vars - self._dst.get_num_vars(),
+            "linear_constraints_removed": (
+                problem.get_num_linear_constraints() - self._dst.get_num_linear_constraints()
+            ),
+            "qubits_before": qubits_before,
+            "qubits_after": qubits_after,
+            "qubits_saved": qubits_before - qubits_after,
+        }
+        logger.info("Presolve: %s", self.report)
+        return self._dst
+
+    @staticmethod
+    def _fix_free_columns(
+        arrays: ProgramArrays,
+        matrix: csr_matrix,
+        lowerbounds: np.ndarray,
+        upperbounds: np.ndarray,
+    ) -> None:
+        """Fix variables that only appear in the linear objective at their best bound."""
+        num_vars = len(lowerbounds)
+        coupled = np.zeros(num_vars, dtype=bool)
+        quadratic = arrays.objective_quadratic()
+        for indices in (
+            matrix.indices,
+            quadratic.indices,
+            np.repeat(np.arange(num_vars), np.diff(quadratic.indptr)),
+            arrays.arrays["quadratic_linear_indices"],
+            arrays.arrays["quadratic_rows"],
+            arrays.arrays["quadratic_cols"],
+        ):
+            coupled[indices] = True
+
+        linear = arrays.objective_linear().toarray().ravel()
+        if ObjSense(arrays.metadata["sense"]) == ObjSense.MAXIMIZE:
+            linear = -linear
+        fallback = np.where(np.isfinite(upperbounds), upperbounds, 0.0)
+        fallback = np.where(np.isfinite(lowerbounds), lowerbounds, fallback)
+        best = np.where(linear > 0, lowerbounds, np.where(linear < 0, upperbounds, fallback))
+        free = ~coupled & np.isfinite(best)
+        lowerbounds[free] = upperbounds[free] = best[free]
+
+    def interpret(self, x: Union[np.ndarray, List[float]]) -> np.ndarray:
+        """Restore the variables removed by presolve.
+
+        Args:
+            x: The result of the reduced problem.
+
+        Returns:
+            The result of the original problem.
+        """
+        new_x = np.zeros(self._src.get_num_vars())
+        new_x[self._kept] = x
+        new_x[list(self._fixed)] = list(self._fixed.values())
+        return new_x
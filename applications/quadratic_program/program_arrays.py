@@ -0,0 +1,436 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Flat array form of a quadratic program and its binary container format.
+
+A :class:`ProgramArrays` holds a quadratic program as a handful of plain
+numpy arrays: variable bounds and types, names as offset-indexed string
+tables, and the objective and constraints in CSR form.  It is written to a
+single versioned file in which every array starts on a 64-byte boundary, so
+loading only parses a small JSON header and maps the arrays lazily::
+
+    ProgramArrays.from_program(qubo).save("qubo.qpa")
+    arrays = ProgramArrays.load("qubo.qpa")  # memory-mapped, pages in on demand
+    quadratic = arrays.objective_quadratic()
+    qubo = arrays.to_program()
+"""
+
+import json
+import struct
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .constraint import ConstraintSense
+from .exceptions import QuadraticProgramError
+from .quadratic_objective import ObjSense
+from .quadratic_program import QuadraticProgram, QuadraticProgramStatus
+
+MAGIC = b"QPARRAYS"
+FORMAT_VERSION = 1
+
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGNMENT = 64
+
+# Name and dtype of every array of the container. Index arrays are stored as int32 when
+# every index fits, which is what scipy uses, so sparse matrices can share the arrays.
+_INDEX = "index"
+_FIELDS = {
+    "lowerbounds": "<f8",
+    "upperbounds": "<f8",
+    "vartypes": "i1",
+    "var_name_offsets": "<i8",
+    "var_name_data": "u1",
+    "objective_linear_indices": _INDEX,
+    "objective_linear_data": "<f8",
+    "objective_quadratic_indptr": _INDEX,
+    "objective_quadratic_indices": _INDEX,
+    "objective_quadratic_data": "<f8",
+    "linear_indptr": _INDEX,
+    "linear_indices": _INDEX,
+    "linear_data": "<f8",
+    "linear_senses": "i1",
+    "linear_rhs": "<f8",
+    "linear_name_offsets": "<i8",
+    "linear_name_data": "u1",
+    "quadratic_linear_indptr": _INDEX,
+    "quadratic_linear_indices": _INDEX,
+    "quadratic_linear_data": "<f8",
+    "quadratic_ptr": "<i8",
+    "quadratic_rows": _INDEX,
+    "quadratic_cols": _INDEX,
+    "quadratic_data": "<f8",
+    "quadratic_senses": "i1",
+    "quadratic_rhs": "<f8",
+    "quadratic_name_offsets": "<i8",
+    "quadratic_name_data": "u1",
+}
+
+
+def _string_table(names: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [name.encode("utf8") for name in names]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def _strings(offsets: np.ndarray, data: np.ndarray) -> List[str]:
+    raw = data.tobytes()
+    offsets = offsets.tolist()
+    return [raw[begin:end].decode("utf8") for begin, end in zip(offsets, offsets[1:])]
+
+
+def _csr(coefficients, shape: Tuple[int, int]) -> csr_matrix:
+    """Convert coefficients to CSR; expressions created before later variables are narrower."""
+    coo = coefficients.tocoo()
+    return csr_matrix((coo.data, (coo.row, coo.col)), shape=shape)
+
+
+def _stack_rows(rows: List, num_vars: int) -> csr_matrix:
+    # Reading the keys of the 1 x n dok rows directly is much faster than ``tocoo`` per row
+    counts = [row.nnz for row in rows]
+    total = sum(counts)
+    row_index = np.repeat(np.arange(len(rows)), counts)
+    cols = np.fromiter((j for row in rows for _, j in row.keys()), dtype=np.int64, count=total)
+    data = np.fromiter((v for row in rows for v in row.values()), dtype=float, count=total)
+    return csr_matrix((data, (row_index, cols)), shape=(len(rows), num_vars))
+
+
+class ProgramArrays:
+    """A quadratic program as flat numpy arrays."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]):
+        """
+        Args:
+            arrays: The arrays of the program, keyed by the field names of the container.
+            metadata: Program name, objective sense and constant, and status.
+        """
+        missing = set(_FIELDS) - set(arrays)
+        if missing:
+            raise QuadraticProgramError(f"Missing program arrays: {sorted(missing)}")
+        self.arrays = arrays
+        self.metadata = metadata
+
+    @classmethod
+    def from_program(cls, problem: QuadraticProgram) -> "ProgramArrays":
+        """Flatten a quadratic program.
+
+        Args:
+            problem: The quadratic program.
+
+        Returns:
+            The array form of the program.
+        """
+        num_vars = problem.get_num_vars()
+        variables = problem.variables
+        arrays = {
+            "lowerbounds": np.array([var.lowerbound for var in variables], dtype=float),
+            "upperbounds": np.array([var.upperbound for var in variables], dtype=float),
+            "vartypes": np.array([var.vartype.value for var in variables], dtype=np.int8),
+        }
+        arrays["var_name_offsets"], arrays["var_name_data"] = _string_table(
+            [var.name for var in variables]
+        )
+
+        objective = problem.objective
+        linear = _csr(objective.linear.coefficients, (1, num_vars))
+        arrays["objective_linear_indices"] = linear.indices
+        arrays["objective_linear_data"] = linear.data
+        quadratic = _csr(objective.quadratic.coefficients, (num_vars, num_vars))
+        arrays["objective_quadratic_indptr"] = quadratic.indptr
+        arrays["objective_quadratic_indices"] = quadratic.indices
+        arrays["objective_quadratic_data"] = quadratic.data
+
+        constraints = problem.linear_constraints
+        matrix = _stack_rows([con.linear.coefficients for con in constraints], num_vars)
+        arrays["linear_indptr"] = matrix.indptr
+        arrays["linear_indices"] = matrix.indices
+        arrays["linear_data"] = matrix.data
+        arrays["linear_senses"] = np.array([con.sense.value for con in constraints], np.int8)
+        arrays["linear_rhs"] = np.array([con.rhs for con in constraints], dtype=float)
+        arrays["linear_name_offsets"], arrays["linear_name_data"] = _string_table(
+            [con.name for con in constraints]
+        )
+
+        constraints = problem.quadratic_constraints
+        matrix = _stack_rows([con.linear.coefficients for con in constraints], num_vars)
+        arrays["quadratic_linear_indptr"] = matrix.indptr
+        arrays["quadratic_linear_indices"] = matrix.indices
+        arrays["quadratic_linear_data"] = matrix.data
+        # The quadratic parts are stored as consecutive COO blocks
+        blocks = [con.quadratic.coefficients.tocoo() for con in constraints]
+        ptr = np.zeros(len(blocks) + 1, dtype=np.int64)
+        np.cumsum([block.nnz for block in blocks], out=ptr[1:])
+        arrays["quadratic_ptr"] = ptr
+        for field, attr in (("quadratic_rows", "row"), ("quadratic_cols", "col")):
+            arrays[field] = np.concatenate(
+                [getattr(block, attr) for block in blocks] + [np.zeros(0, dtype=np.int64)]
+            )
+        arrays["quadratic_data"] = np.concatenate(
+            [block.data for block in blocks] + [np.zeros(0)]
+        )
+        arrays["quadratic_senses"] = np.array([con.sense.value for con in constraints], np.int8)
+        arrays["quadratic_rhs"] = np.array([con.rhs for con in constraints], dtype=float)
+        arrays["quadratic_name_offsets"], arrays["quadratic_name_data"] = _string_table(
+            [con.name for con in constraints]
+        )
+
+        max_index = max(
+            num_vars,
+            len(arrays["objective_quadratic_indices"]),
+            len(arrays["linear_indices"]),
+            len(arrays["quadratic_linear_indices"]),
+        )
+        index_dtype = "<i4" if max_index < np.iinfo(np.int32).max else "<i8"
+        for field, dtype in _FIELDS.items():
+            dtype = index_dtype if dtype == _INDEX else dtype
+            arrays[field] = np.ascontiguousarray(arrays[field], dtype=dtype)
+        metadata = {
+            "name": problem.name,
+            "sense": objective.sense.value,
+            "constant": float(objective.constant),
+            "status": problem.status.value,
+        }
+        return cls(arrays, metadata)
+
+    @property
+    def num_vars(self) -> int:
+        """Returns the number of variables."""
+        return len(self.arrays["lowerbounds"])
+
+    @property
+    def num_linear_constraints(self) -> int:
+        """Returns the number of linear constraints."""
+        return len(self.arrays["linear_rhs"])
+
+    @property
+    def num_quadratic_constraints(self) -> int:
+        """Returns the number of quadratic constraints."""
+        return len(self.arrays["quadratic_rhs"])
+
+    def variable_names(self) -> List[str]:
+        """Returns the names of the variables."""
+        return _strings(self.arrays["var_name_offsets"], self.arrays["var_name_data"])
+
+    def objective_linear(self) -> csr_matrix:
+        """Returns the linear objective coefficients as a ``1 x n`` matrix sharing the arrays."""
+        indices = self.arrays["objective_linear_indices"]
+        indptr = np.array([0, len(indices)], dtype=indices.dtype)
+        return csr_matrix(
+            (self.arrays["objective_linear_data"], indices, indptr),
+            shape=(1, self.num_vars),
+            copy=False,
+        )
+
+    def objective_quadratic(self) -> csr_matrix:
+        """Returns the upper-triangular quadratic objective coefficients sharing the arrays."""
+        return csr_matrix(
+            (
+                self.arrays["objective_quadratic_data"],
+                self.arrays["objective_quadratic_indices"],
+                self.arrays["objective_quadratic_indptr"],
+            ),
+            shape=(self.num_vars, self.num_vars),
+            copy=False,
+        )
+
+    def linear_constraint_matrix(self) -> csr_matrix:
+        """Returns the left-hand sides of the linear constraints sharing the arrays."""
+        return csr_matrix(
+            (
+                self.arrays["linear_data"],
+                self.arrays["linear_indices"],
+                self.arrays["linear_indptr"],
+            ),
+            shape=(self.num_linear_constraints, self.num_vars),
+            copy=False,
+        )
+
+    def to_program(self) -> QuadraticProgram:
+        """Build the quadratic program.
+
+        Returns:
+            The quadratic program.
+        """
+        arrays = self.arrays
+        num_vars = self.num_vars
+        problem = QuadraticProgram(self.metadata["name"])
+        problem.add_variables(
+            arrays["lowerbounds"],
+            arrays["upperbounds"],
+            arrays["vartypes"].tolist(),
+            self.variable_names(),
+        )
+        if ObjSense(self.metadata["sense"]) == ObjSense.MAXIMIZE:
+            problem.maximize(
+                self.metadata["constant"], self.objective_linear(), self.objective_quadratic()
+            )
+        else:
+            problem.minimize(
+                self.metadata["constant"], self.objective_linear(), self.objective_quadratic()
+            )
+
+        problem.add_linear_constraints(
+            self.linear_constraint_matrix(),
+            [ConstraintSense(sense) for sense in arrays["linear_senses"].tolist()],
+            arrays["linear_rhs"],
+            _strings(arrays["linear_name_offsets"], arrays["linear_name_data"]),
+        )
+
+        linear = csr_matrix(
+            (
+                arrays["quadratic_linear_data"],
+                arrays["quadratic_linear_indices"],
+                arrays["quadratic_linear_indptr"],
+            ),
+            shape=(self.num_quadratic_constraints, num_vars),
+        )
+        names = _strings(arrays["quadratic_name_offsets"], arrays["quadratic_name_data"])
+        ptr = arrays["quadratic_ptr"].tolist()
+        for k, name in enumerate(names):
+            block = slice(ptr[k], ptr[k + 1])
+            quadratic = csr_matrix(
+                (
+                    arrays["quadratic_data"][block],
+                    (arrays["quadratic_rows"][block], arrays["quadratic_cols"][block]),
+                ),
+                shape=(num_vars, num_vars),
+            )
+            problem.quadratic_constraint(
+                linear[k],
+                quadratic,
+                ConstraintSense(int(arrays["quadratic_senses"][k])),
+                float(arrays["quadratic_rhs"][k]),
+                name,
+            )
+        # pylint: disable=protected-access
+        problem._status = QuadraticProgramStatus(self.metadata["status"])
+        return problem
+
+    def layout(self) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        """Compute the placement of the arrays in a contiguous buffer.
+
+        Returns:
+            The dtype, shape and offset of every array, and the total size in bytes.
+            Every array starts on a 64-byte boundary.
+        """
+        entries = {}
+        offset = 0
+        for field in _FIELDS:
+            array = self.arrays[field]
+            entries[field] = {
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "offset": offset,
+            }
+            offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+        return entries, offset
+
+    def write_into(self, buffer, entries: Dict[str, Dict[str, Any]], start: int = 0) -> None:
+        """Copy the arrays into a writable buffer laid out by :meth:`layout`."""
+        target = np.frombuffer(buffer, dtype=np.uint8)
+        for field, entry in entries.items():
+            array = self.arrays[field]
+            begin = start + entry["offset"]
+            target[begin : begin + array.nbytes] = array.reshape(-1).view(np.uint8)
+
+    @classmethod
+    def from_buffer(
+        cls,
+        buffer,
+        entries: Dict[str, Dict[str, Any]],
+        metadata: Dict[str, Any],
+        start: int = 0,
+    ) -> "ProgramArrays":
+        """Create arrays that are views of a buffer laid out by :meth:`layout`.
+
+        Args:
+            buffer: A numpy uint8 array or an object supporting the buffer protocol.
+            entries: The placement of the arrays, as returned by :meth:`layout`.
+            metadata: The program metadata.
+            start: Byte offset of the first array in the buffer.
+
+        Returns:
+            The array form of the program, without copying the data.
+        """
+        if not isinstance(buffer, np.ndarray):
+            buffer = np.frombuffer(buffer, dtype=np.uint8)
+        arrays = {}
+        for field, entry in entries.items():
+            dtype = np.dtype(entry["dtype"])
+            shape = tuple(entry["shape"])
+            begin = start + entry["offset"]
+            nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+            arrays[field] = buffer[begin : begin + nbytes].view(dtype).reshape(shape)
+        return cls(arrays, metadata)
+
+    def save(self, filename: str) -> None:
+        """Write the arrays to a binary container file.
+
+        The file starts with a magic string, the format version and the length
+        of a JSON header that lists the dtype, shape and offset of every array.
+        Arrays follow, each aligned to 64 bytes.
+
+        Args:
+            filename: The name of the file to write.
+        """
+        entries, _ = self.layout()
+        header = json.dumps({"metadata": self.metadata, "arrays": entries}).encode("utf8")
+        # Pad the header so that the data section starts aligned
+        data_start = -(-(_PREAMBLE.size + len(header)) // _ALIGNMENT) * _ALIGNMENT
+        header += b" " * (data_start - _PREAMBLE.size - len(header))
+
+        with open(filename, "wb") as fd:
+            fd.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+            fd.write(header)
+            for field in _FIELDS:
+                array = self.arrays[field]
+                fd.write(array.tobytes())
+                fd.write(b"\0" * (-array.nbytes % _ALIGNMENT))
+
+    @classmethod
+    def load(cls, filename: str, mmap: bool = True) -> "ProgramArrays":
+        """Open a binary container file.
+
+        Args:
+            filename: The name of the file to read.
+            mmap: If ``True``, the arrays are read-only memory maps of the file that
+                are paged in when accessed. Otherwise the file is read into memory.
+
+        Returns:
+            The array form of the program.
+
+        Raises:
+            QuadraticProgramError: if the file is not a container of a supported version.
+        """
+        with open(filename, "rb") as fd:
+            preamble = fd.read(_PREAMBLE.size)
+            if len(preamble) != _PREAMBLE.size:
+                raise QuadraticProgramError(f"Not a program array file: {filename}")
+            magic, version, header_len = _PREAMBLE.unpack(preamble)
+            if magic != MAGIC:
+                raise QuadraticProgramError(f"Not a program array file: {filename}")
+            if version > FORMAT_VERSION:
+                raise QuadraticProgramError(
+                    f"Unsupported program array format version {version}, "
+                    f"this reader supports up to {FORMAT_VERSION}"
+                )
+            header = json.loads(fd.read(header_len).decode("utf8"))
+
+        if mmap:
+            buffer = np.memmap(filename, dtype=np.uint8, mode="r")
+        else:
+            buffer = np.fromfile(filename, dtype=np.uint8)
+        return cls.from_buffer(
+            buffer, header["arrays"], header["metadata"], start=_PREAMBLE.size + header_len
+        )
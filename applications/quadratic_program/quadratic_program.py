@@ -15,6 +15,7 @@
 
 """Quadratic Program."""
 
+import io
 import logging
 from collections.abc import Sequence
 from enum import Enum
@@ -24,7 +25,7 @@ from warnings import warn
 
 import numpy as np
 from numpy import ndarray
-from scipy.sparse import spmatrix
+from scipy.sparse import csr_matrix, dok_matrix, spmatrix
 
 from .exceptions import QuadraticProgramError
 from .constraint import Constraint, ConstraintSense
@@ -557,6 +558,68 @@ class QuadraticProgram:
         """
         return self._var_list(keys, lowerbound, upperbound, Variable.Type.INTEGER, name, key_format)
 
+    def add_variables(
+        self,
+        lowerbounds: Union[ndarray, List[float]],
+        upperbounds: Union[ndarray, List[float]],
+        vartypes: Union[ndarray, List[VarType]],
+        names: Optional[Sequence] = None,
+    ) -> List[Variable]:
+        """Adds many variables at once from arrays of bounds and types.
+
+        Args:
+            lowerbounds: The lower bound of every variable.
+            upperbounds: The upper bound of every variable.
+            vartypes: The type of every variable, as ``VarType`` or its integer value.
+            names: The name of every variable. Entries that are ``None`` or empty
+                get the default name, e.g., ``x0``.
+
+        Returns:
+            The added variables.
+
+        Raises:
+            QuadraticProgramError: if the array lengths differ or a variable name is
+                already taken.
+        """
+        num_vars = len(vartypes)
+        if names is None:
+            names = [None] * num_vars
+        if not len(lowerbounds) == len(upperbounds) == len(names) == num_vars:
+            raise QuadraticProgramError("Variable arrays must have the same length.")
+
+        start = self.get_num_vars()
+        k = start
+        new_names = []
+        # Default names also skip the names given explicitly in this batch
+        taken = {name for name in names if name}
+        for position, name in enumerate(names):
+            if not name:
+                # Default names count from the index of the new element, as one at a time
+                k = max(k, start + position)
+                while f"x{k}" in self._variables_index or f"x{k}" in taken:
+                    k += 1
+                name = f"x{k}"
+                k += 1
+            else:
+                self._check_name(name, "Variable")
+            new_names.append(name)
+        if len(set(new_names)) != num_vars or not self._variables_index.keys().isdisjoint(
+            new_names
+        ):
+            raise QuadraticProgramError("Variable name already exists.")
+
+        variables = []
+        for name, lowerbound, upperbound, vartype in zip(
+            new_names, np.asarray(lowerbounds).tolist(), np.asarray(upperbounds).tolist(), vartypes
+        ):
+            vartype = VarType(vartype)
+            if vartype == VarType.BINARY:
+                lowerbound, upperbound = 0, 1
+            variables.append(Variable(self, name, lowerbound, upperbound, vartype))
+        self._variables.extend(variables)
+        self._variables_index.update(zip(new_names, range(start, start + num_vars)))
+        return variables
+
     def get_variable(self, i: Union[int, str]) -> Variable:
         """Returns a variable for a given name or index.
 
@@ -672,6 +735,76 @@ class QuadraticProgram:
         self.linear_constraints.append(constraint)
         return constraint
 
+    def add_linear_constraints(
+        self,
+        matrix: Union[ndarray, spmatrix],
+        senses: Sequence,
+        rhs: Union[ndarray, List[float]],
+        names: Optional[Sequence] = None,
+    ) -> List[LinearConstraint]:
+        """Adds many linear constraints ``matrix @ x sense rhs`` at once.
+
+        Args:
+            matrix: The left-hand-side coefficients, one row per constraint.
+            senses: The sense of every constraint, see :meth:`linear_constraint`.
+            rhs: The right-hand side of every constraint.
+            names: The name of every constraint. Entries that are ``None`` or empty
+                get the default name, e.g., ``c0``.
+
+        Returns:
+            The added constraints.
+
+        Raises:
+            QuadraticProgramError: if the array lengths differ, the matrix does not
+                have one column per variable, or a constraint name already exists.
+        """
+        matrix = csr_matrix(matrix)
+        num_rows, num_cols = matrix.shape
+        if names is None:
+            names = [None] * num_rows
+        if not len(senses) == len(rhs) == len(names) == num_rows:
+            raise QuadraticProgramError("Constraint arrays must have the same length.")
+        if num_cols != self.get_num_vars():
+            raise QuadraticProgramError(
+                f"Constraint matrix has {num_cols} columns for {self.get_num_vars()} variables."
+            )
+
+        start = self.get_num_linear_constraints()
+        k = start
+        new_names = []
+        # Default names also skip the names given explicitly in this batch
+        taken = {name for name in names if name}
+        for position, name in enumerate(names):
+            if not name:
+                # Default names count from the index of the new element, as one at a time
+                k = max(k, start + position)
+                while f"c{k}" in self._linear_constraints_index or f"c{k}" in taken:
+                    k += 1
+                name = f"c{k}"
+                k += 1
+            else:
+                self._check_name(name, "Linear constraint")
+            new_names.append(name)
+        if len(set(new_names)) != num_rows or not self._linear_constraints_index.keys().isdisjoint(
+            new_names
+        ):
+            raise QuadraticProgramError("Linear constraint's name already exists.")
+
+        indptr, indices, data = matrix.indptr, matrix.indices, matrix.data
+        constraints = []
+        rhs = np.asarray(rhs).tolist()
+        for row, (name, sense, value) in enumerate(zip(new_names, senses, rhs)):
+            begin, end = indptr[row], indptr[row + 1]
+            # Fill the row from the CSR buffers, converting sliced rows to dok is much slower
+            linear = dok_matrix((1, num_cols))
+            linear[0, indices[begin:end]] = data[begin:end]
+            constraints.append(
+                LinearConstraint(self, name, linear, Constraint.Sense.convert(sense), value)
+            )
+        self._linear_constraints.extend(constraints)
+        self._linear_constraints_index.update(zip(new_names, range(start, start + num_rows)))
+        return constraints
+
     def get_linear_constraint(self, i: Union[int, str]) -> LinearConstraint:
         """Returns a linear constraint for a given name or index.
 
@@ -917,9 +1050,67 @@ class QuadraticProgram:
             A string representing the quadratic program.
         """
         # pylint: disable=cyclic-import
-        from ..translators.docplex_mp import to_docplex_mp
+        from .lp_file import write_lp
+
+        buffer = io.StringIO()
+        write_lp(self, buffer)
+        return buffer.getvalue()
+
+    def write_to_lp_file(self, filename: str) -> None:
+        """Writes the quadratic program to an LP file.
+
+        The file is written line by line without building an intermediate model.
+
+        Args:
+            filename: The name of the file to write.
+        """
+        # pylint: disable=cyclic-import
+        from .lp_file import write_lp
+
+        with open(filename, "w", encoding="utf8") as fd:
+            write_lp(self, fd)
+
+    def read_from_lp_file(self, filename: str) -> None:
+        """Loads the quadratic program from an LP file, replacing the current content.
+
+        Args:
+            filename: The name of the file to read.
+
+        Raises:
+            QuadraticProgramError: if the file is not valid LP or uses unsupported features.
+        """
+        # pylint: disable=cyclic-import
+        from .lp_file import read_lp
+
+        with open(filename, encoding="utf8") as fd:
+            self._copy_from(read_lp(fd), include_name=True)
+
+    def write_to_mps_file(self, filename: str) -> None:
+        """Writes the quadratic program to a free MPS file.
+
+        Args:
+            filename: The name of the file to write.
+        """
+        # pylint: disable=cyclic-import
+        from .mps_file import write_mps
+
+        with open(filename, "w", encoding="utf8") as fd:
+            write_mps(self, fd)
+
+    def read_from_mps_file(self, filename: str) -> None:
+        """Loads the quadratic program from a free MPS file, replacing the current content.
+
+        Args:
+            filename: The name of the file to read.
+
+        Raises:
+            QuadraticProgramError: if the file is not valid MPS or uses unsupported features.
+        """
+        # pylint: disable=cyclic-import
+        from .mps_file import read_mps
 
-        return to_docplex_mp(self).export_as_lp_string()
+        with open(filename, encoding="utf8") as fd:
+            self._copy_from(read_mps(fd), include_name=True)
 
     def substitute_variables(
         self,
@@ -0,0 +1,182 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Publish quadratic programs to shared memory for worker processes.
+
+Pickling a :class:`QuadraticProgram` for every task serializes every
+``Variable``, back-reference and ``dok_matrix``.  Instead, the
+:class:`ProgramArrays` of the program are copied once into a
+``multiprocessing.shared_memory`` block, and tasks only carry a small
+:class:`SharedProgramHandle`.  Workers attach to the block once per process
+and get read-only views::
+
+    with SharedProgram(problem) as shared:
+        with ProcessPoolExecutor() as executor:
+            energies = list(executor.map(evaluate, repeat(shared.handle), samples))
+
+    def evaluate(handle, x):
+        arrays = handle.attach()
+        return x @ arrays.objective_quadratic() @ x
+"""
+
+import atexit
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .program_arrays import ProgramArrays
+from .quadratic_program import QuadraticProgram
+
+# Blocks published or attached in this process, by name. Forked workers inherit the
+# published blocks together with their mappings and use them without attaching again.
+_BLOCKS: Dict[str, Tuple[SharedMemory, ProgramArrays]] = {}
+
+# Released blocks whose buffer is still exported by views held elsewhere
+_DEFERRED: List[SharedMemory] = []
+
+
+class _SharedMemory(SharedMemory):
+    """Shared memory block that may be finalized while views of it are alive."""
+
+    def __del__(self):
+        try:
+            self.close()
+        except (BufferError, OSError):
+            # Views outlive the block at interpreter exit; the OS unmaps it
+            pass
+
+
+def _attach_block(name: str) -> SharedMemory:
+    try:
+        return _SharedMemory(name=name, track=False)  # pylint: disable=unexpected-keyword-arg
+    except TypeError:
+        # Before Python 3.13 attaching registers the block with the resource tracker.
+        # Pool workers share the tracker of the publishing process, which already
+        # holds the block, so the registration is harmless there.
+        return _SharedMemory(name=name)
+
+
+def _read_only_views(block: SharedMemory, entries, metadata) -> ProgramArrays:
+    arrays = ProgramArrays.from_buffer(block.buf, entries, metadata)
+    for array in arrays.arrays.values():
+        array.flags.writeable = False
+    return arrays
+
+
+def _close(block: SharedMemory) -> bool:
+    """Close a block whose views are released, returning whether it was closed."""
+    try:
+        block.close()
+    except BufferError:
+        return False
+    return True
+
+
+def _release(name: str) -> Optional[SharedMemory]:
+    """Drop the views of a block and close it, returning the block."""
+    # Views handed out earlier may still be alive and keep the buffer exported.
+    # Such blocks stay referenced and are closed once the views are gone.
+    _DEFERRED[:] = [block for block in _DEFERRED if not _close(block)]
+    block, arrays = _BLOCKS.pop(name, (None, None))
+    del arrays
+    if block is not None and not _close(block):
+        _DEFERRED.append(block)
+    return block
+
+
+@atexit.register
+def _release_all() -> None:
+    for name in list(_BLOCKS):
+        _release(name)
+    _DEFERRED[:] = [block for block in _DEFERRED if not _close(block)]
+
+
+@dataclass(frozen=True)
+class SharedProgramHandle:
+    """Picklable reference to a program published in shared memory"""
+
+    name: str
+    """Name of the shared memory block"""
+
+    entries: Dict[str, Dict[str, Any]]
+    """Placement of the arrays in the block"""
+
+    metadata: Dict[str, Any]
+    """Program metadata"""
+
+    def attach(self) -> ProgramArrays:
+        """Return read-only views of the published arrays.
+
+        The block is attached once per process; later calls return the same views.
+
+        Returns:
+            The array form of the program.
+        """
+        cached = _BLOCKS.get(self.name)
+        if cached is None:
+            block = _attach_block(self.name)
+            cached = _BLOCKS[self.name] = (
+                block,
+                _read_only_views(block, self.entries, self.metadata),
+            )
+        return cached[1]
+
+    def to_program(self) -> QuadraticProgram:
+        """Build a quadratic program from the published arrays."""
+        return self.attach().to_program()
+
+
+class SharedProgram:
+    """Owner of a quadratic program published in shared memory.
+
+    The block is released when the owner is closed, so workers must be done
+    with it by then.  Use it as a context manager around the pool.
+    """
+
+    def __init__(self, problem: Union[QuadraticProgram, ProgramArrays]):
+        """
+        Args:
+            problem: The quadratic program or its array form.
+        """
+        if isinstance(problem, QuadraticProgram):
+            problem = ProgramArrays.from_program(problem)
+        entries, size = problem.layout()
+        # Zero-size blocks are not allowed
+        block = _SharedMemory(create=True, size=max(size, 1))
+        problem.write_into(block.buf, entries)
+        self.handle = SharedProgramHandle(block.name, entries, problem.metadata)
+        _BLOCKS[block.name] = (block, _read_only_views(block, entries, problem.metadata))
+        self._closed = False
+
+    @property
+    def nbytes(self) -> int:
+        """Returns the size of the shared memory block."""
+        return _BLOCKS[self.handle.name][0].size
+
+    def arrays(self) -> ProgramArrays:
+        """Returns read-only views of the published arrays in this process."""
+        return self.handle.attach()
+
+    def close(self) -> None:
+        """Release and unlink the shared memory block."""
+        if self._closed:
+            return
+        self._closed = True
+        block = _release(self.handle.name)
+        if block is not None:
+            block.unlink()
+
+    def __enter__(self) -> "SharedProgram":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
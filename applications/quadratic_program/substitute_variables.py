@@ -0,0 +1,264 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Substitute variables of a quadratic program by constants or other variables.
+
+The substitution is written as one sparse linear map ``x = S y + s`` from the
+remaining variables ``y`` to the original variables ``x``: kept variables map to
+themselves, ``{'x': ('y', c)}`` puts ``c`` in the column of ``y``, and constants go
+into ``s``.  The objective and every constraint are then transformed with sparse
+products, ``Q -> Sᵀ Q S``, ``A -> A S``, so fixing thousands of variables at once
+costs a few matrix products instead of a Python loop over terms.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix, triu, tril
+
+from .constraint import ConstraintSense
+from .exceptions import QuadraticProgramError
+from .program_arrays import ProgramArrays, _csr
+from .quadratic_objective import ObjSense
+from .quadratic_program import QuadraticProgram, QuadraticProgramStatus
+from .variable import VarType
+
+logger = logging.getLogger(__name__)
+
+
+def _index(problem: QuadraticProgram, i: Union[str, int]) -> int:
+    if isinstance(i, (int, np.integer)):
+        if not 0 <= i < problem.get_num_vars():
+            raise QuadraticProgramError(f"Variable index out of range: {i}")
+        return int(i)
+    if i not in problem.variables_index:
+        raise QuadraticProgramError(f"Unknown variable: {i}")
+    return problem.variables_index[i]
+
+
+def _triangle(matrix: csr_matrix) -> csr_matrix:
+    """Fold the lower triangle onto the upper one."""
+    return (triu(matrix) + tril(matrix, -1).T).tocsr()
+
+
+def _feasible(senses: np.ndarray, rhs: np.ndarray) -> np.ndarray:
+    """Evaluate ``0 <sense> rhs`` for every entry."""
+    return np.where(
+        senses == ConstraintSense.LE.value,
+        rhs >= 0,
+        np.where(senses == ConstraintSense.GE.value, rhs <= 0, rhs == 0),
+    )
+
+
+class _SubstitutionMap:
+    """The map ``x = S y + s`` and the bounds of the remaining variables ``y``."""
+
+    def __init__(
+        self,
+        problem: QuadraticProgram,
+        arrays: ProgramArrays,
+        constants: Dict[Union[str, int], float],
+        variables: Dict[Union[str, int], Tuple[Union[str, int], float]],
+    ):
+        num_vars = problem.get_num_vars()
+        const_index = [_index(problem, i) for i in constants]
+        const_value = np.array(list(constants.values()), dtype=float)
+        var_index = [_index(problem, i) for i in variables]
+        target_index = [_index(problem, j) for j, _ in variables.values()]
+        coeffs = np.array([coeff for _, coeff in variables.values()], dtype=float)
+
+        replaced = np.zeros(num_vars, dtype=bool)
+        for i in const_index + var_index:
+            if replaced[i]:
+                raise QuadraticProgramError(
+                    f"Cannot substitute the same variable twice: {problem.get_variable(i).name}"
+                )
+            replaced[i] = True
+        if np.any(coeffs == 0):
+            raise QuadraticProgramError(
+                "Variable can not be substituted with zero coefficient: "
+                f"{list(variables)[int(np.flatnonzero(coeffs == 0)[0])]}"
+            )
+        for i, j in zip(var_index, target_index):
+            if replaced[j]:
+                raise QuadraticProgramError(
+                    "Cannot substitute by variable that gets substituted itself: "
+                    f"{problem.get_variable(i).name} <- {problem.get_variable(j).name}"
+                )
+
+        self.kept = np.flatnonzero(~replaced)
+        position = np.full(num_vars, -1, dtype=np.int64)
+        position[self.kept] = np.arange(len(self.kept))
+        var_index = np.array(var_index, dtype=np.int64)
+        target_index = np.array(target_index, dtype=np.int64)
+        const_index = np.array(const_index, dtype=np.int64)
+
+        self.matrix = csr_matrix(
+            (
+                np.concatenate([np.ones(len(self.kept)), coeffs]),
+                (
+                    np.concatenate([self.kept, var_index]),
+                    np.concatenate([position[self.kept], position[target_index]]),
+                ),
+            ),
+            shape=(num_vars, len(self.kept)),
+        )
+        self.offset = np.zeros(num_vars)
+        self.offset[const_index] = const_value
+
+        lowerbounds = arrays.arrays["lowerbounds"]
+        upperbounds = arrays.arrays["upperbounds"]
+        infeasible: List[int] = const_index[
+            (const_value < lowerbounds[const_index]) | (upperbounds[const_index] < const_value)
+        ].tolist()
+
+        # lb_i <= c * x_j <= ub_i bounds x_j, with the ends swapped for negative c
+        self.lowerbounds = lowerbounds[self.kept].copy()
+        self.upperbounds = upperbounds[self.kept].copy()
+        with np.errstate(invalid="ignore"):
+            low = lowerbounds[var_index] / coeffs
+            high = upperbounds[var_index] / coeffs
+        negative = coeffs < 0
+        low[negative], high[negative] = high[negative], low[negative].copy()
+        # Adding zero turns -0.0 from a zero bound over a negative coefficient into 0.0
+        low += 0.0
+        high += 0.0
+        np.maximum.at(self.lowerbounds, position[target_index], low)
+        np.minimum.at(self.upperbounds, position[target_index], high)
+        empty = self.lowerbounds > self.upperbounds
+        infeasible += var_index[empty[position[target_index]]].tolist()
+        # Variables with empty bounds keep theirs, the program is marked infeasible
+        self.lowerbounds[empty] = lowerbounds[self.kept][empty]
+        self.upperbounds[empty] = upperbounds[self.kept][empty]
+        if infeasible:
+            logger.warning(
+                "Infeasible substitution for variables: %s",
+                ", ".join(problem.get_variable(i).name for i in sorted(set(infeasible))),
+            )
+        self.feasible = not infeasible
+
+    def quadratic(self, quadratic: csr_matrix) -> Tuple[csr_matrix, np.ndarray, float]:
+        """Substitute ``xᵀ Q x``, returning the quadratic, linear and constant parts."""
+        offset = self.offset
+        substituted = _triangle((self.matrix.T @ (quadratic @ self.matrix)).tocsr())
+        linear = self.matrix.T @ (quadratic @ offset + quadratic.T @ offset)
+        return substituted, linear, float(offset @ (quadratic @ offset))
+
+
+def substitute_variables(
+    quadratic_program: QuadraticProgram,
+    constants: Optional[Dict[Union[str, int], float]] = None,
+    variables: Optional[Dict[Union[str, int], Tuple[Union[str, int], float]]] = None,
+) -> QuadraticProgram:
+    """Substitutes variables with constants or other variables.
+
+    Args:
+        quadratic_program: a quadratic program whose variables are substituted.
+
+        constants: replace variable by constant
+            e.g., ``{'x': 2}`` means ``x`` is substituted with 2
+
+        variables: replace variables by weighted other variable
+            need to copy everything using name reference to make sure that indices are matched
+            correctly. The lower and upper bounds are updated accordingly.
+            e.g., ``{'x': ('y', 2)}`` means ``x`` is substituted with ``y * 2``
+
+    Returns:
+        An optimization problem by substituting variables with constants or other variables.
+        If the substitution is valid, ``QuadraticProgram.status`` is still
+        ``QuadraticProgram.Status.VALID``.
+        Otherwise, it gets ``QuadraticProgram.Status.INFEASIBLE``.
+
+    Raises:
+        QuadraticProgramError: if the substitution is invalid as follows.
+
+            - Same variable is substituted multiple times.
+            - Coefficient of variable substitution is zero.
+            - A variable is substituted by a variable that is substituted itself.
+    """
+    arrays = ProgramArrays.from_program(quadratic_program)
+    subs = _SubstitutionMap(quadratic_program, arrays, constants or {}, variables or {})
+    feasible = subs.feasible
+    matrix, offset, kept = subs.matrix, subs.offset, subs.kept
+
+    dst = QuadraticProgram(quadratic_program.name)
+    names = arrays.variable_names()
+    new_vars = dst.add_variables(
+        subs.lowerbounds,
+        subs.upperbounds,
+        arrays.arrays["vartypes"][kept].tolist(),
+        [names[i] for i in kept],
+    )
+    # add_variables resets binary variables to [0, 1], so set their tightened bounds
+    for var, lowerbound, upperbound in zip(
+        new_vars, subs.lowerbounds.tolist(), subs.upperbounds.tolist()
+    ):
+        if var.vartype == VarType.BINARY:
+            var.lowerbound = lowerbound
+            var.upperbound = upperbound
+
+    # objective
+    quadratic, linear, constant = subs.quadratic(arrays.objective_quadratic())
+    objective_linear = arrays.objective_linear()
+    linear = linear + (objective_linear @ matrix).toarray().ravel()
+    constant += arrays.metadata["constant"] + float((objective_linear @ offset)[0])
+    if ObjSense(arrays.metadata["sense"]) == ObjSense.MAXIMIZE:
+        dst.maximize(constant, linear, quadratic)
+    else:
+        dst.minimize(constant, linear, quadratic)
+
+    # linear constraints
+    constraint_matrix = arrays.linear_constraint_matrix()
+    lhs = (constraint_matrix @ matrix).tocsr()
+    lhs.eliminate_zeros()
+    rhs = arrays.arrays["linear_rhs"] - constraint_matrix @ offset
+    senses = arrays.arrays["linear_senses"]
+    names = [con.name for con in quadratic_program.linear_constraints]
+    nonempty = np.diff(lhs.indptr) > 0
+    violated = ~nonempty & ~_feasible(senses, rhs)
+    if violated.any():
+        logger.warning(
+            "Constraints are infeasible due to substitution: %s",
+            ", ".join(names[i] for i in np.flatnonzero(violated)),
+        )
+        feasible = False
+    keep = np.flatnonzero(nonempty)
+    dst.add_linear_constraints(
+        lhs[keep],
+        [ConstraintSense(sense) for sense in senses[keep].tolist()],
+        rhs[keep],
+        [names[i] for i in keep],
+    )
+
+    # quadratic constraints
+    num_vars = quadratic_program.get_num_vars()
+    for constraint in quadratic_program.quadratic_constraints:
+        quadratic, linear, constant = subs.quadratic(
+            _csr(constraint.quadratic.coefficients, (num_vars, num_vars))
+        )
+        quadratic.eliminate_zeros()
+        linear_part = _csr(constraint.linear.coefficients, (1, num_vars))
+        linear = linear + (linear_part @ matrix).toarray().ravel()
+        rhs = constraint.rhs - constant - float((linear_part @ offset)[0])
+        if quadratic.nnz > 0:
+            dst.quadratic_constraint(linear, quadratic, constraint.sense, rhs, constraint.name)
+        elif np.any(linear != 0):
+            dst.linear_constraint(linear, constraint.sense, rhs, constraint.name)
+        elif not _feasible(np.array([constraint.sense.value]), np.array([rhs]))[0]:
+            logger.warning("Constraint %s is infeasible due to substitution", constraint.name)
+            feasible = False
+
+    if not feasible:
+        # pylint: disable=protected-access
+        dst._status = QuadraticProgramStatus.INFEASIBLE
+    return dst
@@ -0,0 +1,189 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Variance-aware allocation of shots across measurement groups.
+
+The energy estimate of a :class:`~measurement_grouping.MeasurementPlan` is a sum
+of independent group estimates, with variance ``sum_g V_g / N_g`` where ``V_g``
+is the single-shot variance of ``sum_{k in g} c_k P_k`` and ``N_g`` the shots of
+the group.  For a fixed budget ``N`` this is smallest for ``N_g`` proportional to
+``sqrt(V_g)``, i.e., to ``|c| * sigma`` for a single term, and then equals
+``(sum_g sqrt(V_g))^2 / N``.  Before any measurement ``sqrt(V_g)`` is bounded by
+``sum_{k in g} |c_k|``.  Afterwards it is estimated from the measured
+distributions and smoothed over evaluations, so the allocation follows the state
+as an optimizer moves::
+
+    allocator = ShotAllocator(plan, total_shots=20000)
+
+    def energy(theta):
+        circuits = plan.circuits(ansatz.assign_parameters(theta))
+        counts = [backend.run(circ, shots=shots).result().get_counts()
+                  for circ, shots in zip(circuits, allocator.shots)]
+        return allocator.estimate(counts)
+
+    minimize_spsa(energy, x0, callback=allocator.reallocate)
+
+Reallocating only in the callback keeps the shots of the two evaluations of one
+SPSA gradient equal.
+"""
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from qiskit.result import QuasiDistribution
+
+from diagonal_expectation import _CHUNK_ELEMENTS, _parity, distribution_arrays, outcome_words
+from measurement_grouping import MeasurementPlan
+
+
+def _outcome_values(words: np.ndarray, masks: np.ndarray, coeffs: np.ndarray) -> np.ndarray:
+    """Value of ``sum_k coeffs_k (-1)^{popcount(outcome & mask_k)}`` for every outcome."""
+    values = np.empty(words.shape[0])
+    chunk = max(1, _CHUNK_ELEMENTS // max(1, masks.shape[0]))
+    for start in range(0, words.shape[0], chunk):
+        block = words[start : start + chunk]
+        acc = np.bitwise_xor.reduce(block[:, None, :] & masks[None, :, :], axis=2)
+        values[start : start + chunk] = (1.0 - 2.0 * _parity(acc)) @ coeffs
+    return values
+
+
+def _split(total: int, weights: np.ndarray, minimum: int) -> np.ndarray:
+    """Split ``total`` into integers proportional to ``weights``, each at least ``minimum``.
+
+    The remainder after rounding down goes to the largest fractional parts.
+    """
+    num = len(weights)
+    spare = total - minimum * num
+    if spare < 0:
+        raise ValueError(f"{total} shots cannot give {minimum} shots to each of {num} groups.")
+    weights = np.maximum(weights, 0.0)
+    if weights.sum() == 0:
+        weights = np.ones(num)
+    exact = spare * weights / weights.sum()
+    shots = np.floor(exact).astype(int)
+    remainder = spare - shots.sum()
+    shots[np.argsort(shots - exact, kind="stable")[:remainder]] += 1
+    return shots + minimum
+
+
+class ShotAllocator:
+    """Shot budget split across the groups of a measurement plan."""
+
+    def __init__(
+        self,
+        plan: MeasurementPlan,
+        total_shots: int,
+        min_shots: int = 10,
+        smoothing: float = 0.5,
+    ):
+        """
+        Args:
+            plan: The measurement plan of the operator.
+            total_shots: Number of shots per evaluation of the operator.
+            min_shots: Number of shots every group gets at least, which also keeps
+                its variance estimate alive.
+            smoothing: Weight of the latest deviation estimate in the running one, in
+                ``(0, 1]``. ``1`` uses only the latest evaluation.
+
+        Raises:
+            ValueError: If the budget is smaller than the minimum for every group or
+                the smoothing is not in ``(0, 1]``.
+        """
+        if not 0 < smoothing <= 1:
+            raise ValueError(f"smoothing must be in (0, 1], got {smoothing}")
+        self.plan = plan
+        self.total_shots = total_shots
+        self.min_shots = min_shots
+        self.smoothing = smoothing
+        self._coeffs = np.real(plan.coeffs)
+        self.deviations = np.array(
+            [np.abs(self._coeffs[group.indices]).sum() for group in plan.groups]
+        )
+        """Running estimate of the single-shot standard deviation of every group"""
+        self._estimated = np.zeros(len(plan.groups), dtype=bool)
+        self.shots = _split(total_shots, self.deviations, min_shots)
+        """Shots of every group in the current allocation"""
+
+    def reallocate(self, *_) -> np.ndarray:
+        """Update :attr:`shots` from the running deviations.
+
+        Extra arguments are ignored, so this can be an optimizer callback.
+
+        Returns:
+            The shots of every group.
+        """
+        self.shots = _split(self.total_shots, self.deviations, self.min_shots)
+        return self.shots
+
+    def estimate(
+        self,
+        dists: Sequence[Union[QuasiDistribution, Dict[Union[int, str], float]]],
+        update: bool = True,
+    ) -> float:
+        """Return the expectation value of the operator and update the running deviations.
+
+        Args:
+            dists: Counts or quasi-distributions of the circuits of the plan, in order.
+            update: Update the running deviations from these distributions.
+
+        Returns:
+            The expectation value of the operator.
+
+        Raises:
+            ValueError: If the number of distributions and groups differ.
+        """
+        plan = self.plan
+        if len(dists) != len(plan.groups):
+            raise ValueError(f"Got {len(dists)} distributions for {len(plan.groups)} groups.")
+        value = float(self._coeffs[plan.identity].sum())
+        for index, (group, dist) in enumerate(zip(plan.groups, dists)):
+            outcomes, weights = distribution_arrays(dist)
+            words = outcome_words(outcomes, plan.num_qubits)
+            values = _outcome_values(
+                words, group.masks, group.signs * self._coeffs[group.indices]
+            )
+            mean = weights @ values
+            value += mean
+            if update:
+                deviation = np.sqrt(max(weights @ (values - mean) ** 2, 0.0))
+                if self._estimated[index]:
+                    deviation = (
+                        self.smoothing * deviation
+                        + (1 - self.smoothing) * self.deviations[index]
+                    )
+                self.deviations[index] = deviation
+                self._estimated[index] = True
+        return value
+
+    def standard_error(self, shots: Optional[np.ndarray] = None) -> float:
+        """Return the standard error of the estimate for an allocation.
+
+        Args:
+            shots: Shots of every group, defaults to :attr:`shots`.
+
+        Returns:
+            The standard error from the running deviations.
+        """
+        shots = self.shots if shots is None else np.asarray(shots)
+        return float(np.sqrt(np.sum(self.deviations**2 / shots)))
+
+    def shots_for_precision(self, precision: float) -> int:
+        """Return the total shots reaching a standard error with the optimal allocation.
+
+        Args:
+            precision: The target standard error.
+
+        Returns:
+            The number of shots, ``(sum_g sigma_g)^2 / precision^2``.
+        """
+        return int(np.ceil((self.deviations.sum() / precision) ** 2))
@@ -16,12 +16,36 @@
 import numpy as np
 from scipy.optimize import OptimizeResult
 
+def _update_hessian(hessian, deltak, delta2, curvature, num_samples):
+    """Feedback update of the Hessian average by a curvature sample, in place."""
+    num = hessian.shape[0]
+    rank_one = np.outer(deltak, delta2)
+    # Correct the average by the error of the curvature it predicts along
+    # (deltak, delta2), normalized so that a unit weight matches the observation,
+    # instead of averaging the noisy rank-one estimates themselves
+    error = curvature - deltak @ hessian @ delta2
+    norm = (num**2 + (deltak @ delta2)**2) / 2
+    weight = num**2 / (num_samples + num**2)
+    hessian += weight * error / norm * (rank_one + rank_one.T) / 2
+
+
+def _precondition(hessian, grad, regularization):
+    """Solve with |H| + reg*I from the eigendecomposition of the symmetric average."""
+    eigvals, eigvecs = np.linalg.eigh(hessian)
+    spd = (eigvecs * (np.abs(eigvals) + regularization)) @ eigvecs.T
+    return np.linalg.solve(spd, grad)
+
+
 def minimize_spsa(func, x0, args=(), maxiter=100,
                   a=1.0, alpha=0.602, c=0.2, gamma=0.101,
-                  callback=None):
+                  callback=None, second_order=False, regularization=0.5,
+                  hessian_delay=0, resamplings=1, calibrate=False,
+                  target_magnitude=0.2*np.pi, blocking=False,
+                  allowed_increase=None, seed=None):
     """
     Minimization of scalar function of one or more variables using simultaneous
-    perturbation stochastic approximation (SPSA).
+    perturbation stochastic approximation (SPSA), or its second-order version
+    (2-SPSA).
 
     Parameters:
         func (callable): The objective function to be minimized.
@@ -29,48 +53,177 @@ def minimize_spsa(func, x0, args=(), maxiter=100,
                           ``fun(x, *args) -> float``
 
                           where x is an 1-D array with shape (n,) and args is a
-                          tuple of the fixed parameters needed to completely 
+                          tuple of the fixed parameters needed to completely
                           specify the function.
 
-        x0 (ndarray): Initial guess. Array of real elements of size (n,), 
+        x0 (ndarray): Initial guess. Array of real elements of size (n,),
                       where ‘n’ is the number of independent variables.
-      
+
         maxiter (int): Maximum number of iterations.  The number of function
-                       evaluations is twice as many. Optional.
+                       evaluations is twice as many, times ``resamplings``, for
+                       first-order SPSA. Optional.
 
         a (float): SPSA gradient scaling parameter. Optional.
 
         alpha (float): SPSA gradient scaling exponent. Optional.
 
         c (float):  SPSA step size scaling parameter. Optional.
-        
+
         gamma (float): SPSA step size scaling exponent. Optional.
 
         callback (callable): Function that accepts the current parameter vector
                              as input. Optional.
 
+        second_order (bool): Use 2-SPSA, which also estimates the Hessian from
+                             two more evaluations per resampling and
+                             preconditions the gradient with its running
+                             average. Optional.
+
+        regularization (float): Added to the absolute eigenvalues of the
+                                averaged Hessian, which keeps the
+                                preconditioner positive definite. Optional.
+
+        hessian_delay (int): Number of first-order iterations before 2-SPSA
+                             starts preconditioning, while the Hessian average
+                             settles. Optional.
+
+        resamplings (int): Number of gradient (and Hessian) estimates averaged
+                           per iteration. Optional.
+
+        calibrate (bool): Replace ``a`` by the value that makes the first step
+                          about ``target_magnitude`` long, from the gradient
+                          magnitudes of 25 perturbations of ``x0`` (50
+                          evaluations). Optional.
+
+        target_magnitude (float): First step length for the calibration. Optional.
+
+        blocking (bool): Evaluate every new point and reject steps that
+                         increase the function by more than
+                         ``allowed_increase``. Optional.
+
+        allowed_increase (float): Tolerated increase with blocking. Defaults to
+                                  twice the standard deviation of 25 evaluations
+                                  at ``x0``, i.e., to the noise. Optional.
+
+        seed (int): Seed of the perturbations, defaults to the global NumPy
+                    random state. Optional.
+
     Returns:
         OptimizeResult: Solution in SciPy Optimization format.
 
     Notes:
         See the `SPSA homepage <https://www.jhuapl.edu/SPSA/>`_ for usage and
-        additional extentions to the basic version implimented here.
+        additional extentions to the basic version implimented here.  2-SPSA
+        follows J. C. Spall, IEEE Trans. Autom. Control 45, 1839 (2000): with
+        perturbations ``D1`` and ``D2``, the curvature along them is
+        ``[(f(x+cD1+cD2) - f(x+cD1)) - (f(x-cD1+cD2) - f(x-cD1))] / (2c^2)``.
+        Averaging the rank-one Hessian estimates built from it converges slowly
+        for tens of parameters, so, as in Spall's feedback variant (2009), the
+        average is corrected by the error of the curvature it predicts, with
+        weights ``n^2 / (k + n^2)`` after ``k`` samples.
     """
     A = 0.01 * maxiter
-    x0 = np.asarray(x0)
-    x = x0
+    x = np.array(x0, dtype=float)
+    rng = np.random if seed is None else np.random.RandomState(seed)
+    nfev = 0
+
+    def fun(y):
+        nonlocal nfev
+        nfev += 1
+        return func(y, *args)
 
+    def perturbation():
+        # Bernoulli distribution for randoms
+        return 2*rng.randint(2, size=x.shape[0])-1
+
+    if calibrate:
+        magnitude = np.mean([abs(fun(x + c*delta) - fun(x - c*delta)) / (2*c)
+                             for delta in (perturbation() for _ in range(25))])
+        a = target_magnitude / max(magnitude, 1e-12) * (1.0+A)**alpha
+
+    if blocking:
+        fx = fun(x)
+        if allowed_increase is None:
+            allowed_increase = 2*np.std([fun(x) for _ in range(25)])
+
+    hessian = np.identity(x.shape[0])
+    num_samples = 0
     for kk in range(maxiter):
         ak = a * (kk+1.0+A)**-alpha
         ck = c * (kk+1.0)**-gamma
-        # Bernoulli distribution for randoms
-        deltak =  2*np.random.randint(2, size=x.shape[0])-1
-        grad = (func(x + ck*deltak, *args) - func(x - ck*deltak, *args)) / (2*ck*deltak)
-        x -= ak*grad
-        
+        grad = np.zeros(x.shape[0])
+        for _ in range(resamplings):
+            deltak = perturbation()
+            f_plus, f_minus = fun(x + ck*deltak), fun(x - ck*deltak)
+            grad += (f_plus - f_minus) / (2*ck*deltak)
+            if second_order:
+                delta2 = perturbation()
+                curvature = ((fun(x + ck*deltak + ck*delta2) - f_plus)
+                             - (fun(x - ck*deltak + ck*delta2) - f_minus)) / (2*ck*ck)
+                _update_hessian(hessian, deltak, delta2, curvature, num_samples)
+                num_samples += 1
+        grad /= resamplings
+
+        if second_order and kk >= hessian_delay:
+            grad = _precondition(hessian, grad, regularization)
+
+        x_new = x - ak*grad
+        if blocking:
+            f_new = fun(x_new)
+            if f_new <= fx + allowed_increase:
+                x, fx = x_new, f_new
+        else:
+            x = x_new
+
         if callback is not None:
             callback(x)
 
-    return OptimizeResult(fun=func(x, *args), x=x, nit=maxiter, nfev=2*maxiter, 
+    fun_x = fx if blocking else fun(x)
+    return OptimizeResult(fun=fun_x, x=x, nit=maxiter, nfev=nfev,
                           message='Optimization terminated successfully.',
                           success=True)
+
+
+def evals_to_tolerance(func, x0, target, tol, exact=None, args=(), seeds=range(5),
+                       **kwargs):
+    """
+    Number of function evaluations :func:`minimize_spsa` needs to get within a
+    tolerance of a target value.
+
+    Parameters:
+        func (callable): The objective function, possibly noisy.
+
+        x0 (ndarray): Initial guess.
+
+        target (float): The target value, e.g., the ground-state energy.
+
+        tol (float): Tolerance on the exact value at the iterates.
+
+        exact (callable): Noiseless version of ``func`` used to monitor the
+                          iterates, not counted. Defaults to ``func``. Optional.
+
+        seeds (iterable): Seeds of the repeated runs. Optional.
+
+        kwargs: Further arguments of :func:`minimize_spsa`, e.g.,
+                ``second_order=True``.
+
+    Returns:
+        ndarray: Evaluations up to the first iterate within ``tol`` of
+        ``target`` for every seed, ``inf`` if it is never reached.
+    """
+    exact = func if exact is None else exact
+    evals = []
+    for seed in seeds:
+        count = [0, np.inf]
+
+        def counted(x, *fargs):
+            count[0] += 1
+            return func(x, *fargs)
+
+        def monitor(x):
+            if count[1] == np.inf and abs(exact(x, *args) - target) <= tol:
+                count[1] = count[0]
+
+        minimize_spsa(counted, x0, args=args, callback=monitor, seed=seed, **kwargs)
+        evals.append(count[1])
+    return np.array(evals, dtype=float)
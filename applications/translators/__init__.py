@@ -31,7 +31,10 @@ Translator functions
 
 from .docplex_mp_to_qp import docplex_mp_to_qp
 from .qubo_to_sparse_pauli_op import qubo_to_sparse_pauli_op
+from .qubo_decomposition import QUBOComponent, QUBODecomposition
+from .sparsify_ising import sparsify_sparse_pauli_op
 
 __all__ = [
-    "docplex_mp_to_qp", "qubo_to_sparse_pauli_op"
+    "docplex_mp_to_qp", "qubo_to_sparse_pauli_op", "QUBOComponent", "QUBODecomposition",
+    "sparsify_sparse_pauli_op"
 ]
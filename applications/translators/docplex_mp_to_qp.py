@@ -20,9 +20,12 @@ Translator functions from DOCPLEX.MP (IBM Decision Optimization
 """
 
 from math import isclose
-from typing import Any, Dict, Optional, Tuple, cast
+from typing import Any, Dict, List, Optional, Tuple, cast
 from warnings import warn
 
+import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix
+
 from docplex.mp.basic import Expr
 from docplex.mp.constants import ComparisonType
 from docplex.mp.constr import (
@@ -37,11 +40,27 @@ from docplex.mp.model import Model
 from docplex.mp.quad import QuadExpr
 from docplex.mp.vartype import BinaryVarType, ContinuousVarType, IntegerVarType
 
-from quadratic_program import QuadraticProgram
+from quadratic_program import ProgramArrays, QuadraticProgram
+from quadratic_program.variable import VarType
+from quadratic_program.constraint import ConstraintSense
 from quadratic_program.exceptions import QuadraticProgramError
+from quadratic_program.passes.presolve import _propagate_bounds
+
+# Relative tolerance below which a coefficient of ``left - right`` is treated as cancelled
+_CANCEL_RTOL = 1e-9
+
+_INDICATOR_MODES = ("big_m", "tight", "penalty")
+
+# Penalty factor used when the objective range is unbounded
+_DEFAULT_PENALTY = 1e5
 
 
-def docplex_mp_to_qp(model: Model, indicator_big_m: Optional[float] = None) -> QuadraticProgram:
+def docplex_mp_to_qp(
+    model: Model,
+    indicator_big_m: Optional[float] = None,
+    indicator_mode: str = "big_m",
+    indicator_penalty: Optional[float] = None,
+) -> QuadraticProgram:
     """Translate a docplex.mp model into a quadratic program.
 
     Note that this supports the following features of docplex:
@@ -56,13 +75,30 @@ def docplex_mp_to_qp(model: Model, indicator_big_m: Optional[float] = None) -> Q
         indicator_big_m: The big-M value used for the big-M formulation to convert
             indicator constraints into linear constraints.
             If ``None``, it is automatically derived from the model.
+        indicator_mode: How indicator constraints are translated.
+
+            - 'big_m': Big-M constraints with M derived from the variable bounds.
+            - 'tight': Big-M constraints with M derived from the bounds implied by
+              propagation over all linear constraints of the model, which are never
+              looser and give smaller slack variables downstream.
+            - 'penalty': Like 'tight', but indicators on binary variables whose
+              constraint fixes every variable it contains, such as ``z -> x == 0`` or
+              ``z -> x + y >= 2``, become the quadratic objective penalty
+              ``P * z * (number of mismatched variables)`` instead of a constraint.
+
+        indicator_penalty: The penalty factor ``P`` of the 'penalty' mode. If ``None``,
+            it is one plus the range of the objective function.
 
     Returns:
         The quadratic program corresponding to the model.
 
     Raises:
-        QuadraticProgramError: if the model contains unsupported elements.
+        QuadraticProgramError: if the model contains unsupported elements or the
+            indicator mode is unknown.
     """
+    if indicator_mode not in _INDICATOR_MODES:
+        raise QuadraticProgramError(f"Unsupported indicator mode: {indicator_mode}")
+
     if not isinstance(model, Model):
         #This should raise a docplex error
         raise QuadraticProgramError(f"The model is not compatible: {model}")
@@ -87,7 +123,9 @@ def docplex_mp_to_qp(model: Model, indicator_big_m: Optional[float] = None) -> Q
         elif not isinstance(constraint, (QuadraticConstraint, IndicatorConstraint)):
             raise QiskitOptimizationError(f"Unsupported constraint: {constraint}")
 
-    return _FromDocplexMp(model).quadratic_program(indicator_big_m)
+    return _FromDocplexMp(model).quadratic_program(
+        indicator_big_m, indicator_mode, indicator_penalty
+    )
 
 
 class _FromDocplexMp:
@@ -102,20 +140,32 @@ class _FromDocplexMp:
         self._quadratic_program: QuadraticProgram = QuadraticProgram()
         self._var_names: Dict[Var, str] = {}
         self._var_bounds: Dict[str, Tuple[float, float]] = {}
+        self._var_index: Dict[Var, int] = {}
 
     def _variables(self):
         # keep track of names separately, since docplex allows to have None names.
-        for x in self._model.iter_variables():
+        model_vars = list(self._model.iter_variables())
+        lowerbounds = np.empty(len(model_vars))
+        upperbounds = np.empty(len(model_vars))
+        vartypes = []
+        for index, x in enumerate(model_vars):
             if isinstance(x.vartype, ContinuousVarType):
-                x_new = self._quadratic_program.continuous_var(x.lb, x.ub, x.name)
+                vartypes.append(VarType.CONTINUOUS)
             elif isinstance(x.vartype, BinaryVarType):
-                x_new = self._quadratic_program.binary_var(x.name)
+                vartypes.append(VarType.BINARY)
             elif isinstance(x.vartype, IntegerVarType):
-                x_new = self._quadratic_program.integer_var(x.lb, x.ub, x.name)
+                vartypes.append(VarType.INTEGER)
             else:
                 raise QiskitOptimizationError(f"Unsupported variable type: {x.name} {x.vartype}")
+            lowerbounds[index] = x.lb
+            upperbounds[index] = x.ub
+            self._var_index[x] = index
+        variables = self._quadratic_program.add_variables(
+            lowerbounds, upperbounds, vartypes, [x.name for x in model_vars]
+        )
+        for x, x_new in zip(model_vars, variables):
             self._var_names[x] = x_new.name
-            self._var_bounds[x.name] = (x_new.lowerbound, x_new.upperbound)
+            self._var_bounds[x_new.name] = (x_new.lowerbound, x_new.upperbound)
 
     def _linear_expr(self, expr: AbstractLinearExpr) -> Dict[str, float]:
         # AbstractLinearExpr is a parent of LinearExpr, ConstantExpr, and ZeroExpr
@@ -135,13 +185,20 @@ class _FromDocplexMp:
             quad[i, j] = coeff
         return linear, quad
 
-    def quadratic_program(self, indicator_big_m: Optional[float]) -> QuadraticProgram:
+    def quadratic_program(
+        self,
+        indicator_big_m: Optional[float],
+        indicator_mode: str = "big_m",
+        indicator_penalty: Optional[float] = None,
+    ) -> QuadraticProgram:
         """Generate a quadratic program corresponding to the input Docplex model.
 
         Args:
             indicator_big_m: The big-M value used for the big-M formulation to convert
             indicator constraints into linear constraints.
             If ``None``, it is automatically derived from the model.
+            indicator_mode: 'big_m', 'tight' or 'penalty', see :func:`docplex_mp_to_qp`.
+            indicator_penalty: The penalty factor of the 'penalty' mode.
 
         Returns:
             a quadratic program corresponding to the input Docplex model.
@@ -160,10 +217,10 @@ class _FromDocplexMp:
             self._model.objective_expr = self._model.objective_expr + 0  # Var + 0 -> LinearExpr
 
         constant = self._model.objective_expr.constant
+        linear = self._linear_array(self._model.objective_expr.get_linear_part())
         if isinstance(self._model.objective_expr, QuadExpr):
-            linear, quadratic = self._quadratic_expr(self._model.objective_expr)
+            quadratic = self._quadratic_array(self._model.objective_expr)
         else:
-            linear = self._linear_expr(self._model.objective_expr.get_linear_part())
             quadratic = {}
 
         # set objective
@@ -173,11 +230,7 @@ class _FromDocplexMp:
             self._quadratic_program.maximize(constant, linear, quadratic)
 
         # set linear constraints
-        for constraint in self._model.iter_linear_constraints():
-            linear, sense, rhs = self._linear_constraint(constraint)
-            if not linear:  # lhs == 0
-                warn(f"Trivial constraint: {constraint}", stacklevel=3)
-            self._quadratic_program.linear_constraint(linear, sense, rhs, constraint.name)
+        self._linear_constraints()
 
         # set quadratic constraints
         for constraint in self._model.iter_quadratic_constraints():
@@ -189,17 +242,110 @@ class _FromDocplexMp:
             )
 
         # set indicator constraints
-        for index, constraint in enumerate(self._model.iter_indicator_constraints()):
+        indicators = list(self._model.iter_indicator_constraints())
+        if indicators and indicator_mode != "big_m":
+            self._propagate_var_bounds()
+        penalties = []
+        for index, constraint in enumerate(indicators):
             linear, _, _ = self._linear_constraint(constraint.linear_constraint)
             if not linear:  # lhs == 0
                 warn(f"Trivial constraint: {constraint}", stacklevel=3)
+            if indicator_mode == "penalty":
+                penalty_terms = self._indicator_penalty_terms(constraint)
+                if penalty_terms is not None:
+                    penalties.append(penalty_terms)
+                    continue
             prefix = constraint.name or f"ind{index}"
             linear_constraints = self._indicator_constraints(constraint, prefix, indicator_big_m)
             for linear, sense, rhs, name in linear_constraints:
                 self._quadratic_program.linear_constraint(linear, sense, rhs, name)
+        if penalties:
+            self._add_penalties(penalties, indicator_penalty)
 
         return self._quadratic_program
 
+    def _linear_array(self, expr: AbstractLinearExpr) -> csr_matrix:
+        num_vars = len(self._var_index)
+        cols = []
+        vals = []
+        for x, coeff in expr.iter_terms():
+            cols.append(self._var_index[x])
+            vals.append(coeff)
+        return csr_matrix(
+            (vals, (np.zeros(len(cols), dtype=int), cols)), shape=(1, num_vars), dtype=float
+        )
+
+    def _quadratic_array(self, expr: QuadExpr) -> csr_matrix:
+        num_vars = len(self._var_index)
+        rows = []
+        cols = []
+        vals = []
+        for x, y, coeff in expr.iter_quad_triplets():
+            rows.append(self._var_index[x])
+            cols.append(self._var_index[y])
+            vals.append(coeff)
+        return csr_matrix((vals, (rows, cols)), shape=(num_vars, num_vars), dtype=float)
+
+    def _linear_constraints(self):
+        """Add all linear constraints of the model in bulk.
+
+        The terms of both sides of every constraint are collected in a single
+        pass into COO arrays, with the right-hand side negated, so ``left - right``
+        is formed by summing duplicates of the sparse matrix.
+        """
+        constraints = list(self._model.iter_linear_constraints())
+        rows: List[int] = []
+        cols: List[int] = []
+        vals: List[float] = []
+        senses = []
+        rhs = np.empty(len(constraints))
+        for index, constraint in enumerate(constraints):
+            left_expr, right_expr = self._constraint_exprs(constraint)
+            for x, coeff in left_expr.iter_terms():
+                rows.append(index)
+                cols.append(self._var_index[x])
+                vals.append(coeff)
+            for x, coeff in right_expr.iter_terms():
+                rows.append(index)
+                cols.append(self._var_index[x])
+                vals.append(-coeff)
+            senses.append(self._sense_dict[constraint.sense])
+            rhs[index] = right_expr.constant - left_expr.constant
+
+        shape = (len(constraints), len(self._var_index))
+        vals = np.asarray(vals, dtype=float)
+        matrix = coo_matrix((vals, (rows, cols)), shape=shape).tocsr()
+        magnitude = coo_matrix((np.abs(vals), (rows, cols)), shape=shape).tocsr()
+        # Both matrices share the sparsity pattern, drop the terms that cancel out
+        matrix.data[np.abs(matrix.data) <= _CANCEL_RTOL * magnitude.data] = 0
+        matrix.eliminate_zeros()
+
+        for index in np.flatnonzero(np.diff(matrix.indptr) == 0):  # lhs == 0
+            warn(f"Trivial constraint: {constraints[index]}", stacklevel=4)
+        self._quadratic_program.add_linear_constraints(
+            matrix, senses, rhs, [constraint.name for constraint in constraints]
+        )
+
+    def _constraint_exprs(self, constraint: LinearConstraint) -> Tuple[Expr, Expr]:
+        left_expr = constraint.get_left_expr()
+        right_expr = constraint.get_right_expr()
+        # for linear constraints we may get an instance of Var instead of expression,
+        # e.g. x + y = z
+        if not isinstance(left_expr, (Expr, Var)):
+            raise QiskitOptimizationError(f"Unsupported expression: {left_expr} {type(left_expr)}")
+        if not isinstance(right_expr, (Expr, Var)):
+            raise QiskitOptimizationError(
+                f"Unsupported expression: {right_expr} {type(right_expr)}"
+            )
+        if constraint.sense not in self._sense_dict:
+            raise QiskitOptimizationError(f"Unsupported constraint sense: {constraint}")
+
+        if isinstance(left_expr, Var):
+            left_expr = left_expr + 0  # Var + 0 -> LinearExpr
+        if isinstance(right_expr, Var):
+            right_expr = right_expr + 0
+        return left_expr, right_expr
+
     @staticmethod
     def _subtract(dict1: Dict[Any, float], dict2: Dict[Any, float]) -> Dict[Any, float]:
         """Calculate dict1 - dict2"""
@@ -218,25 +364,8 @@ class _FromDocplexMp:
     def _linear_constraint(
         self, constraint: LinearConstraint
     ) -> Tuple[Dict[str, float], str, float]:
-        left_expr = constraint.get_left_expr()
-        right_expr = constraint.get_right_expr()
-        # for linear constraints we may get an instance of Var instead of expression,
-        # e.g. x + y = z
-        if not isinstance(left_expr, (Expr, Var)):
-            raise QiskitOptimizationError(f"Unsupported expression: {left_expr} {type(left_expr)}")
-        if not isinstance(right_expr, (Expr, Var)):
-            raise QiskitOptimizationError(
-                f"Unsupported expression: {right_expr} {type(right_expr)}"
-            )
-        if constraint.sense not in self._sense_dict:
-            raise QiskitOptimizationError(f"Unsupported constraint sense: {constraint}")
-
-        if isinstance(left_expr, Var):
-            left_expr = left_expr + 0  # Var + 0 -> LinearExpr
+        left_expr, right_expr = self._constraint_exprs(constraint)
         left_linear = self._linear_expr(left_expr)
-
-        if isinstance(right_expr, Var):
-            right_expr = right_expr + 0
         right_linear = self._linear_expr(right_expr)
 
         linear = self._subtract(left_linear, right_linear)
@@ -289,6 +418,137 @@ class _FromDocplexMp:
             linear_ub += max(x_lb, x_ub)
         return linear_lb, linear_ub
 
+    def _propagate_var_bounds(self):
+        """Replace the variable bounds by those implied by the linear constraints."""
+        arrays = ProgramArrays.from_program(self._quadratic_program)
+        senses = arrays.arrays["linear_senses"]
+        rhs = arrays.arrays["linear_rhs"]
+        lowerbounds = arrays.arrays["lowerbounds"].copy()
+        upperbounds = arrays.arrays["upperbounds"].copy()
+        _, feasible = _propagate_bounds(
+            arrays.linear_constraint_matrix(),
+            np.where(senses == ConstraintSense.LE.value, -np.inf, rhs),
+            np.where(senses == ConstraintSense.GE.value, np.inf, rhs),
+            lowerbounds,
+            upperbounds,
+            arrays.arrays["vartypes"],
+        )
+        if not feasible:
+            return
+        for name, x_lb, x_ub in zip(
+            arrays.variable_names(), lowerbounds.tolist(), upperbounds.tolist()
+        ):
+            self._var_bounds[name] = (x_lb, x_ub)
+
+    def _indicator_penalty_terms(
+        self, constraint: IndicatorConstraint
+    ) -> Optional[List[Tuple[str, int, Optional[Tuple[str, bool]]]]]:
+        """Return the penalty terms of an indicator on binary variables, if it has a penalty form.
+
+        The penalty is ``literal * sum(mismatch)`` where the literal is the binary variable or
+        its negation and every mismatch is a variable or its negation, given as
+        ``(name, literal value, mismatch value)`` triplets. A constraint that no assignment
+        satisfies gives the single mismatch ``(None, ...)`` that is always one.
+        """
+        binary_name = self._var_names[constraint.binary_var]
+        linear, sense, rhs = self._linear_constraint(constraint.linear_constraint)
+        linear = {name: coeff for name, coeff in linear.items() if coeff != 0}
+        if any(self._var_bounds[name] != (0, 1) for name in linear):
+            return None
+        if any(
+            x.vartype.cplex_typecode != "B"
+            for x in constraint.linear_constraint.iter_variables()
+        ):
+            return None
+        literal = 1 if constraint.active_value else 0
+        minact = sum(min(coeff, 0.0) for coeff in linear.values())
+        maxact = sum(max(coeff, 0.0) for coeff in linear.values())
+        smallest = min((abs(coeff) for coeff in linear.values()), default=np.inf)
+        if (sense in ["<=", "=="] and rhs < minact) or (sense in [">=", "=="] and rhs > maxact):
+            # never satisfied: the literal must be zero
+            return [(binary_name, literal, None)]
+        if sense == "<=" and rhs < minact + smallest or sense == "==" and isclose(rhs, minact):
+            # every variable at the value that minimizes the activity
+            return [(binary_name, literal, (name, coeff > 0)) for name, coeff in linear.items()]
+        if sense == ">=" and rhs > maxact - smallest or sense == "==" and isclose(rhs, maxact):
+            # every variable at the value that maximizes the activity
+            return [(binary_name, literal, (name, coeff < 0)) for name, coeff in linear.items()]
+        return None
+
+    def _penalty_factor(self) -> float:
+        """One plus the range of the objective over the variable bounds."""
+        arrays = ProgramArrays.from_program(self._quadratic_program)
+        lowerbounds = arrays.arrays["lowerbounds"]
+        upperbounds = arrays.arrays["upperbounds"]
+        linear = arrays.objective_linear().tocoo()
+        quadratic = arrays.objective_quadratic().tocoo()
+        with np.errstate(invalid="ignore"):
+            corners = np.array(
+                [
+                    lowerbounds[quadratic.row] * lowerbounds[quadratic.col],
+                    lowerbounds[quadratic.row] * upperbounds[quadratic.col],
+                    upperbounds[quadratic.row] * lowerbounds[quadratic.col],
+                    upperbounds[quadratic.row] * upperbounds[quadratic.col],
+                ]
+            )
+            spread = np.sum(
+                np.abs(linear.data) * (upperbounds[linear.col] - lowerbounds[linear.col])
+            ) + np.sum(np.abs(quadratic.data) * (corners.max(axis=0) - corners.min(axis=0)))
+        if not np.isfinite(spread):
+            warn(
+                f"Using {_DEFAULT_PENALTY} for the indicator penalty factor because the "
+                "objective is unbounded. If it is too small, set the penalty factor manually.",
+                stacklevel=4,
+            )
+            return _DEFAULT_PENALTY
+        return 1.0 + float(spread)
+
+    def _add_penalties(self, penalties: List, penalty: Optional[float]):
+        """Add ``penalty * literal * mismatch`` terms of binary indicators to the objective."""
+        if penalty is None:
+            penalty = self._penalty_factor()
+        objective = self._quadratic_program.objective
+        sense = objective.sense.value
+        constant = objective.constant
+        linear = objective.linear.to_dict(use_name=True)
+        quadratic = objective.quadratic.to_dict(use_name=True)
+
+        def add_product(factors, weight):
+            # weight * prod(x if value else 1 - x)
+            terms = {(): weight}
+            for name, value in factors:
+                expanded = {}
+                for key, coeff in terms.items():
+                    if value:
+                        expanded[key + (name,)] = expanded.get(key + (name,), 0.0) + coeff
+                    else:
+                        expanded[key] = expanded.get(key, 0.0) + coeff
+                        expanded[key + (name,)] = expanded.get(key + (name,), 0.0) - coeff
+                terms = expanded
+            nonlocal constant
+            for key, coeff in terms.items():
+                if not key:
+                    constant += coeff
+                elif len(key) == 1:
+                    linear[key[0]] = linear.get(key[0], 0.0) + coeff
+                elif key[0] == key[1]:
+                    # x * x == x for binary variables
+                    linear[key[0]] = linear.get(key[0], 0.0) + coeff
+                else:
+                    quadratic[key] = quadratic.get(key, 0.0) + coeff
+
+        for terms in penalties:
+            for binary_name, literal, mismatch in terms:
+                factors = [(binary_name, literal)]
+                if mismatch is not None:
+                    factors.append(mismatch)
+                add_product(factors, sense * penalty)
+
+        if sense == objective.Sense.MINIMIZE.value:
+            self._quadratic_program.minimize(constant, linear, quadratic)
+        else:
+            self._quadratic_program.maximize(constant, linear, quadratic)
+
     def _indicator_constraints(
         self,
         constraint: IndicatorConstraint,
@@ -305,11 +565,11 @@ class _FromDocplexMp:
             big_m = max(0.0, linear_ub - rhs) if indicator_big_m is None else indicator_big_m
             if active_value:
                 # rhs += big_m * (1 - binary_var)
-                linear2 = self._subtract(linear, {binary_var.name: -big_m})
+                linear2 = self._subtract(linear, {self._var_names[binary_var]: -big_m})
                 rhs2 = rhs + big_m
             else:
                 # rhs += big_m * binary_var
-                linear2 = self._subtract(linear, {binary_var.name: big_m})
+                linear2 = self._subtract(linear, {self._var_names[binary_var]: big_m})
                 rhs2 = rhs
             name2 = name + "_LE" if sense == "==" else name
             ret.append((linear2, "<=", rhs2, name2))
@@ -317,11 +577,11 @@ class _FromDocplexMp:
             big_m = max(0.0, rhs - linear_lb) if indicator_big_m is None else indicator_big_m
             if active_value:
                 # rhs += -big_m * (1 - binary_var)
-                linear2 = self._subtract(linear, {binary_var.name: big_m})
+                linear2 = self._subtract(linear, {self._var_names[binary_var]: big_m})
                 rhs2 = rhs - big_m
             else:
                 # rhs += -big_m * binary_var
-                linear2 = self._subtract(linear, {binary_var.name: -big_m})
+                linear2 = self._subtract(linear, {self._var_names[binary_var]: -big_m})
                 rhs2 = rhs
             name2 = name + "_GE" if sense == "==" else name
             ret.append((linear2, ">=", rhs2, name2))
@@ -0,0 +1,228 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Decomposition of a QUBO into the connected components of its interaction graph.
+
+Variables that share no quadratic term, directly or through other variables,
+never influence each other, so a QUBO whose interaction graph is disconnected
+is the sum of independent smaller QUBOs.  Every component gets its own
+:class:`QuadraticProgram` and Ising operator on only its own qubits, the
+components are solved in parallel, and the sub-solutions are stitched back into
+a solution of the full QUBO in the ``(value, x)`` form produced by
+``EvaluateProgramSolution``, so ``UnrollQUBOVariables`` applies unchanged::
+
+    decomposition = QUBODecomposition(qubo)
+    solution = decomposition.solve(solve_component, max_workers=4)
+    x = UnrollQUBOVariables(converter).run(solution)
+
+    def solve_component(component):
+        dist = sampler.run(ansatz(component.operator), ...).result().quasi_dists[0]
+        return max(dist.binary_probabilities().items(), key=lambda item: item[1])[0]
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from qiskit.quantum_info import SparsePauliOp
+
+from quadratic_program import ProgramArrays, QuadraticProgram
+from quadratic_program.exceptions import QuadraticProgramError
+from quadratic_program.quadratic_objective import ObjSense
+from quadratic_program.variable import VarType
+
+from .qubo_to_sparse_pauli_op import qubo_to_sparse_pauli_op
+
+
+@dataclass
+class QUBOComponent:
+    """A connected component of a QUBO"""
+
+    indices: np.ndarray
+    """Indices of the variables of the full QUBO, in the order of the component variables"""
+
+    program: QuadraticProgram
+    """The QUBO restricted to the component, without the constant"""
+
+    operator: SparsePauliOp
+    """Ising operator of the component, qubit ``i`` is component variable ``i``"""
+
+    offset: float
+    """Offset of the Ising operator of the component"""
+
+
+def _bits(solution: Union[str, Sequence[int], np.ndarray], num_vars: int) -> np.ndarray:
+    """Read a sub-solution given as variable values or as a little-endian bitstring."""
+    if isinstance(solution, str):
+        solution = solution[::-1]
+    x = np.fromiter(solution, dtype=int)
+    if len(x) != num_vars:
+        raise QuadraticProgramError(
+            f"The solution has {len(x)} variables but its component has {num_vars}."
+        )
+    return x
+
+
+class QUBODecomposition:
+    """Split a QUBO into the connected components of its quadratic sparsity graph.
+
+    Variables without any quadratic term are not handed off as one-qubit components:
+    their optimal value follows from the sign of their linear coefficient.
+    """
+
+    def __init__(self, qubo: QuadraticProgram, solve_isolated: bool = True):
+        """
+        Args:
+            qubo: The QUBO, i.e., a program with binary variables and no constraints.
+            solve_isolated: Set variables without quadratic terms directly instead of
+                making them one-variable components.
+
+        Raises:
+            QuadraticProgramError: If the program is not a QUBO.
+        """
+        if qubo.get_num_vars() > qubo.get_num_binary_vars():
+            raise QuadraticProgramError("The type of all variables must be binary.")
+        if qubo.linear_constraints or qubo.quadratic_constraints:
+            raise QuadraticProgramError("There must be no constraint in the problem.")
+
+        arrays = ProgramArrays.from_program(qubo)
+        self.num_vars = arrays.num_vars
+        self._sense = qubo.objective.sense.value
+        self._constant = arrays.metadata["constant"]
+        self._linear = arrays.objective_linear().toarray().ravel()
+        quadratic = arrays.objective_quadratic().copy()
+        quadratic.eliminate_zeros()
+        # x_i^2 == x_i, so diagonal terms do not couple anything
+        diagonal = quadratic.diagonal()
+        self._quadratic = quadratic
+
+        coupling = quadratic - csr_matrix(
+            (diagonal, (np.arange(self.num_vars), np.arange(self.num_vars))),
+            shape=quadratic.shape,
+        )
+        coupling.eliminate_zeros()
+        num_labels, labels = connected_components(coupling, directed=False)
+        degree = np.diff((coupling + coupling.T).tocsr().indptr)
+
+        self.isolated = np.zeros(0, dtype=np.int64)
+        """Indices of the variables without quadratic terms, if solved directly"""
+        self.isolated_values = np.zeros(0, dtype=int)
+        """Optimal values of the isolated variables"""
+        if solve_isolated:
+            self.isolated = np.flatnonzero(degree == 0)
+            weight = self._sense * (self._linear + diagonal)[self.isolated]
+            self.isolated_values = (weight < 0).astype(int)
+            labels = labels.copy()
+            labels[self.isolated] = num_labels
+        # Objective contribution of the isolated variables at their optimal values
+        self._isolated_value = float(
+            (self._linear + diagonal)[self.isolated] @ self.isolated_values
+        )
+
+        order = np.argsort(labels, kind="stable")
+        bounds = np.flatnonzero(np.diff(labels[order])) + 1
+        names = arrays.variable_names()
+        self.components: List[QUBOComponent] = []
+        """The components, ordered by their smallest variable index"""
+        for indices in np.split(order, bounds):
+            if len(indices) == 0 or (solve_isolated and labels[indices[0]] == num_labels):
+                continue
+            self.components.append(self._component(indices, names))
+
+    def _component(self, indices: np.ndarray, names: List[str]) -> QUBOComponent:
+        program = QuadraticProgram(f"component{len(self.components)}")
+        size = len(indices)
+        program.add_variables(
+            np.zeros(size), np.ones(size), [VarType.BINARY] * size, [names[i] for i in indices]
+        )
+        linear = self._linear[indices]
+        quadratic = self._quadratic[indices][:, indices]
+        if self._sense == ObjSense.MINIMIZE.value:
+            program.minimize(0.0, linear, quadratic)
+        else:
+            program.maximize(0.0, linear, quadratic)
+        operator, offset = qubo_to_sparse_pauli_op(program)
+        return QUBOComponent(indices, program, operator, offset)
+
+    @property
+    def offset(self) -> float:
+        """Ising offset of what no component offset includes.
+
+        This is the constant of the QUBO plus the contribution of the isolated variables
+        at their optimal values.  The sum of this offset, the component offsets and the
+        Ising energies of the components is the objective value for minimization, or its
+        negative for maximization.
+        """
+        return self._sense * (self._constant + self._isolated_value)
+
+    def evaluate(self, x: np.ndarray) -> float:
+        """Evaluate the objective of the full QUBO."""
+        x = np.asarray(x, dtype=float)
+        return float(self._constant + self._linear @ x + x @ (self._quadratic @ x))
+
+    def stitch(
+        self, solutions: Sequence[Union[str, Sequence[int], np.ndarray]]
+    ) -> Tuple[float, np.ndarray]:
+        """Combine solutions of the components into a solution of the full QUBO.
+
+        Args:
+            solutions: One solution per component, either the values of the component
+                variables in order or a bitstring in which qubit ``i`` is the ``i``-th
+                character from the right.
+
+        Returns:
+            The objective value and the values of all variables of the QUBO.
+
+        Raises:
+            QuadraticProgramError: If the number of solutions or of their variables
+                does not match the components.
+        """
+        if len(solutions) != len(self.components):
+            raise QuadraticProgramError(
+                f"Got {len(solutions)} solutions for {len(self.components)} components."
+            )
+        x = np.zeros(self.num_vars, dtype=int)
+        x[self.isolated] = self.isolated_values
+        for component, solution in zip(self.components, solutions):
+            x[component.indices] = _bits(solution, len(component.indices))
+        return self.evaluate(x), x
+
+    def solve(
+        self,
+        solver: Callable[[QUBOComponent], Union[str, Sequence[int], np.ndarray]],
+        max_workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> Tuple[float, np.ndarray]:
+        """Solve all components in parallel and stitch the solutions.
+
+        Args:
+            solver: Picklable function returning a solution of a component, see
+                :meth:`stitch`.
+            max_workers: Number of worker processes, defaults to the number of CPUs.
+            executor: Executor to submit the components to instead of a process pool,
+                e.g., a thread pool when the solver waits on remote jobs.
+
+        Returns:
+            The objective value and the values of all variables of the QUBO.
+        """
+        if executor is not None:
+            solutions = list(executor.map(solver, self.components))
+        elif max_workers == 1 or len(self.components) <= 1:
+            solutions = [solver(component) for component in self.components]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                solutions = list(pool.map(solver, self.components))
+        return self.stitch(solutions)
@@ -0,0 +1,87 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Sparsification of Ising operators with a bound on the energy perturbation.
+
+Penalty conversions leave many couplings that are tiny compared to the largest
+ones.  Dropping a set of Pauli terms with coefficients :math:`c_k` changes the
+operator by :math:`\\sum_k c_k P_k`, whose spectral norm is at most
+:math:`\\sum_k |c_k|` since every Pauli string has norm one.  So the energy of every
+state, and every eigenvalue, moves by at most that sum, and a ground state of the
+sparsified operator is within twice that sum of the true ground energy.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+from qiskit.quantum_info import SparsePauliOp
+
+
+def sparsify_sparse_pauli_op(
+    operator: SparsePauliOp,
+    offset: float = 0.0,
+    threshold: float = 1e-6,
+    max_terms: Optional[int] = None,
+    max_error: Optional[float] = None,
+) -> Tuple[SparsePauliOp, float, float]:
+    """Drop the smallest terms of an operator, e.g., from :func:`qubo_to_sparse_pauli_op`.
+
+    Equal Pauli strings are merged and identity terms are moved into the offset exactly.
+    Of the remaining terms, the ones dropped are:
+
+    - by default, those with ``|coeff| < threshold * max |coeff|``,
+    - with ``max_terms``, the smallest ones beyond the ``max_terms`` largest,
+    - with ``max_error``, the smallest ones while their total weight is at most ``max_error``.
+
+    Args:
+        operator: The operator to sparsify.
+        offset: The constant offset of the operator.
+        threshold: Threshold relative to the largest coefficient.
+        max_terms: Number of non-identity terms to keep, replacing the threshold.
+        max_error: Bound on the energy perturbation to fill, replacing the threshold.
+
+    Returns:
+        The sparsified operator, its offset and the bound on the energy perturbation,
+        the sum of the absolute values of the dropped coefficients.
+
+    Raises:
+        ValueError: If both ``max_terms`` and ``max_error`` are given.
+    """
+    if max_terms is not None and max_error is not None:
+        raise ValueError("Only one of max_terms and max_error can be given.")
+
+    operator = operator.simplify(atol=0)
+    paulis = operator.paulis
+    identity = ~(paulis.z.any(axis=1) | paulis.x.any(axis=1))
+    offset += float(np.real(operator.coeffs[identity].sum()))
+    terms = operator[~identity]
+
+    magnitude = np.abs(terms.coeffs)
+    order = np.argsort(magnitude, kind="stable")
+    dropped_weight = np.cumsum(magnitude[order])
+    if max_terms is not None:
+        num_dropped = max(0, len(order) - max_terms)
+    elif max_error is not None:
+        num_dropped = int(np.searchsorted(dropped_weight, max_error, side="right"))
+    elif len(order) > 0:
+        num_dropped = int(
+            np.searchsorted(magnitude[order], threshold * magnitude[order[-1]], side="left")
+        )
+    else:
+        num_dropped = 0
+    bound = float(dropped_weight[num_dropped - 1]) if num_dropped > 0 else 0.0
+
+    if num_dropped == len(order):
+        # Keep an operator on the same qubits, as qubo_to_sparse_pauli_op does
+        return SparsePauliOp("I" * operator.num_qubits, 0), offset, bound
+    return terms[np.sort(order[num_dropped:])], offset, bound
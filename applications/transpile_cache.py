@@ -0,0 +1,297 @@
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2023.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Persistent transpilation cache.
+
+Transpiled circuits are stored as QPY files named by a hash of
+
+1. the structure of the (parameterized) input circuit,
+2. the backend target, basis gates and coupling map,
+3. the Qiskit version, and
+4. every other transpile option (optimization level, seed, layout,
+   routing and scheduling methods, ...),
+
+so re-running a workflow with the same ansatz and settings skips
+transpilation entirely.  Circuits are hashed structurally, so an ansatz that
+is rebuilt in a new session with fresh ``Parameter`` objects still hits the
+cache; the loaded circuit is re-bound to the caller's parameters by name.
+"""
+import hashlib
+import os
+from typing import Any, List, Optional, Union
+
+from qiskit import __version__ as qiskit_version, qpy
+from qiskit.circuit import Clbit, Instruction, ParameterExpression, QuantumCircuit
+from qiskit.circuit.library.standard_gates import get_standard_gate_name_mapping
+from qiskit.compiler import transpile
+from qiskit.transpiler import CouplingMap, Layout, Target
+
+DEFAULT_CACHE_DIR = ".transpile_cache"
+
+_STANDARD_GATES = frozenset(get_standard_gate_name_mapping())
+
+
+def _canonical(obj: Any) -> str:
+    """Deterministic text representation of a transpile option."""
+    if obj is None or isinstance(obj, (bool, int, str)):
+        return repr(obj)
+    if isinstance(obj, float):
+        return repr(float(obj))
+    if isinstance(obj, complex):
+        return repr(complex(obj))
+    if isinstance(obj, ParameterExpression):
+        return f"Expr({obj})"
+    if isinstance(obj, dict):
+        items = sorted((_canonical(k), _canonical(v)) for k, v in obj.items())
+        return "{" + ",".join(f"{k}:{v}" for k, v in items) + "}"
+    if isinstance(obj, (list, tuple)):
+        return "[" + ",".join(_canonical(item) for item in obj) + "]"
+    if isinstance(obj, (set, frozenset)):
+        return "{" + ",".join(sorted(_canonical(item) for item in obj)) + "}"
+    if isinstance(obj, CouplingMap):
+        return f"CouplingMap({obj.size()},{sorted(obj.get_edges())})"
+    if isinstance(obj, Target):
+        return target_hash(obj)
+    if isinstance(obj, Instruction):
+        return f"{obj.name}({_canonical(list(obj.params))})"
+    if isinstance(obj, QuantumCircuit):
+        return circuit_hash(obj)
+    if hasattr(obj, "target") and hasattr(obj, "name"):
+        # BackendV2: the target carries the calibration data layout selection uses
+        return f"Backend({obj.name},{target_hash(obj.target)})"
+    if hasattr(obj, "configuration") and hasattr(obj, "properties"):
+        # BackendV1: key on the name and the date of the last calibration
+        props = obj.properties()
+        updated = props.last_update_date if props is not None else None
+        return f"Backend({obj.name()},{updated})"
+    return f"{type(obj).__qualname__}({obj!r})"
+
+
+def target_hash(target: Target) -> str:
+    """Hash of the instructions, qubits and instruction properties of a target.
+
+    Args:
+        target: The backend target.
+
+    Returns:
+        A hex digest that changes whenever gate errors or durations change.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{target.num_qubits},{target.dt}".encode())
+    for name in sorted(target.operation_names):
+        props = target[name]
+        for qargs in sorted(props, key=lambda q: (q is None, q or ())):
+            prop = props[qargs]
+            values = None if prop is None else (prop.error, prop.duration)
+            digest.update(f"{name}{qargs}{values}".encode())
+    return digest.hexdigest()
+
+
+def _update_circuit(digest, circuit: QuantumCircuit) -> None:
+    digest.update(f"q{circuit.num_qubits}c{circuit.num_clbits}g{circuit.global_phase}".encode())
+    for reg in circuit.qregs + circuit.cregs:
+        digest.update(f"r{reg.name}{reg.size}".encode())
+    digest.update(_canonical([param.name for param in circuit.parameters]).encode())
+    for instr in circuit.data:
+        op = instr.operation
+        qubits = [circuit.find_bit(bit).index for bit in instr.qubits]
+        clbits = [circuit.find_bit(bit).index for bit in instr.clbits]
+        condition = getattr(op, "condition", None)
+        if condition is not None:
+            target, value = condition
+            if isinstance(target, Clbit):
+                target = circuit.find_bit(target).index
+            else:
+                target = (target.name, target.size)
+            condition = (target, value)
+        digest.update(
+            f"{op.name}{_canonical(list(op.params))}{qubits}{clbits}{condition}".encode()
+        )
+        # Custom instructions (e.g. library blueprints) are hashed by their definition
+        if op.name not in _STANDARD_GATES and getattr(op, "definition", None) is not None:
+            _update_circuit(digest, op.definition)
+
+
+def circuit_hash(circuit: QuantumCircuit) -> str:
+    """Structural hash of a circuit.
+
+    Two circuits with the same instructions, qubit indices, parameter names and
+    registers hash equal, even if their ``Parameter`` objects are different.
+
+    Args:
+        circuit: The circuit to hash.
+
+    Returns:
+        A hex digest.
+    """
+    digest = hashlib.sha256()
+    _update_circuit(digest, circuit)
+    return digest.hexdigest()
+
+
+class TranspileCache:
+    """QPY-backed cache of ``qiskit.transpile`` results.
+
+    Example::
+
+        cache = TranspileCache()
+        qc_ibm = cache.transpile(qc_example, basis_gates=['cz', 'sx', 'rz'],
+                                 coupling_map=[[0, 1], [1, 2]], optimization_level=3)
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        """
+        Args:
+            cache_dir: Directory holding the QPY files. Created on first write.
+        """
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, circuit: QuantumCircuit, **options) -> str:
+        """Cache key of a circuit and a set of transpile options.
+
+        Args:
+            circuit: The circuit to be transpiled.
+            options: Keyword arguments of ``qiskit.transpile``, including ``backend``.
+
+        Returns:
+            A hex digest.
+        """
+        digest = hashlib.sha256()
+        # Another Qiskit version may transpile differently
+        digest.update(f"qiskit{qiskit_version};".encode())
+        digest.update(circuit_hash(circuit).encode())
+        for name in sorted(options):
+            value = options[name]
+            if isinstance(value, Layout):
+                # Express the layout through the circuit's qubit indices
+                value = [value[qubit] for qubit in circuit.qubits]
+            digest.update(f"{name}={_canonical(value)};".encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".qpy")
+
+    def load(self, key: str) -> Optional[QuantumCircuit]:
+        """Return the cached circuit for a key, or ``None`` if it is not cached."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as fd:
+            return qpy.load(fd)[0]
+
+    def store(self, key: str, circuit: QuantumCircuit) -> None:
+        """Store a transpiled circuit under a key."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        # Write to a temporary file first so readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as fd:
+            qpy.dump(circuit, fd)
+        os.replace(tmp_path, path)
+
+    def get(self, circuit: QuantumCircuit, **options) -> Optional[QuantumCircuit]:
+        """Return the cached transpilation of a circuit, bound to its parameters.
+
+        Args:
+            circuit: The circuit to be transpiled.
+            options: Keyword arguments of ``qiskit.transpile``.
+
+        Returns:
+            The transpiled circuit, or ``None`` on a cache miss.
+        """
+        cached = self.load(self.key(circuit, **options))
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _rebind_parameters(cached, circuit)
+
+    def put(self, circuit: QuantumCircuit, transpiled: QuantumCircuit, **options) -> None:
+        """Store the transpilation of a circuit.
+
+        Args:
+            circuit: The circuit that was transpiled.
+            transpiled: The transpiled circuit.
+            options: Keyword arguments of ``qiskit.transpile``.
+        """
+        self.store(self.key(circuit, **options), transpiled)
+
+    def transpile(
+        self, circuits: Union[QuantumCircuit, List[QuantumCircuit]], **options
+    ) -> Union[QuantumCircuit, List[QuantumCircuit]]:
+        """Transpile circuits, reusing cached results where possible.
+
+        Args:
+            circuits: A circuit or list of circuits.
+            options: Keyword arguments passed to ``qiskit.transpile``.
+
+        Returns:
+            The transpiled circuit(s).
+        """
+        single = isinstance(circuits, QuantumCircuit)
+        circuits = [circuits] if single else list(circuits)
+        out = []
+        for circuit in circuits:
+            transpiled = self.get(circuit, **options)
+            if transpiled is None:
+                transpiled = transpile(circuit, **options)
+                self.put(circuit, transpiled, **options)
+            out.append(transpiled)
+        return out[0] if single else out
+
+    def clear(self) -> None:
+        """Delete every cached circuit."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".qpy"):
+                os.remove(os.path.join(self.cache_dir, name))
+
+
+def _rebind_parameters(cached: QuantumCircuit, original: QuantumCircuit) -> QuantumCircuit:
+    """Replace the parameters of a loaded circuit with the caller's objects of the same name."""
+    by_name = {param.name: param for param in original.parameters}
+    mapping = {
+        param: by_name[param.name]
+        for param in cached.parameters
+        if param.name in by_name and by_name[param.name] != param
+    }
+    if mapping:
+        cached.assign_parameters(mapping, inplace=True)
+    return cached
+
+
+_DEFAULT_CACHE = None
+
+
+def cached_transpile(
+    circuits: Union[QuantumCircuit, List[QuantumCircuit]],
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    **options,
+) -> Union[QuantumCircuit, List[QuantumCircuit]]:
+    """Drop-in replacement for ``qiskit.transpile`` backed by a :class:`TranspileCache`.
+
+    Args:
+        circuits: A circuit or list of circuits.
+        cache_dir: Directory holding the QPY files.
+        options: Keyword arguments passed to ``qiskit.transpile``.
+
+    Returns:
+        The transpiled circuit(s).
+    """
+    global _DEFAULT_CACHE  # pylint: disable=global-statement
+    if _DEFAULT_CACHE is None or _DEFAULT_CACHE.cache_dir != cache_dir:
+        _DEFAULT_CACHE = TranspileCache(cache_dir)
+    return _DEFAULT_CACHE.transpile(circuits, **options)